@@ -10,105 +10,344 @@
 import torch
 # Check for a working environment after install
 try:
-    from diffusers import StableDiffusionPipeline, DPMSolverMultistepScheduler
+    from diffusers import StableDiffusionPipeline, StableDiffusionImg2ImgPipeline
+    from diffusers import DPMSolverMultistepScheduler, UniPCMultistepScheduler, EulerAncestralDiscreteScheduler
 except ImportError as e:
     print(f"❌ Critical Error after install: {e}")
     raise e
 
-from PIL import Image, ImageEnhance
+from PIL import Image, ImageEnhance, ImageFilter
 import base64
 import io
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from pyngrok import ngrok
 import threading
+import json
+import re
+import uuid
+import hashlib
+import math
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
 import numpy as np
 from scipy import ndimage
 from IPython.display import display, HTML # For keeping the cell alive in notebooks
+try:
+    import psutil  # preinstalled on Colab/Kaggle; only used for /health memory stats
+except ImportError:
+    psutil = None
 import time
 
 print("✅ Libraries imported")
 # --- END OF CELL 2 ---
 
 # --- CELL 3: Load Model ---
-print("Loading Realistic Vision V5.1 (this takes 2-3 minutes)...")
+# Requests name a model from MODEL_REGISTRY. Loaded pipelines are kept in an
+# LRU: the most recently used stay on the GPU within MODEL_GPU_BUDGET_GB,
+# idle ones are parked in CPU RAM within MODEL_CPU_BUDGET_GB and moved back
+# in seconds instead of being reloaded. Text encoders and VAEs with identical
+# weights are kept once and shared between models.
+MODEL_REGISTRY = {
+    'realistic_vision': "SG161222/Realistic_Vision_V5.1_noVAE",
+    'dreamshaper': "Lykon/dreamshaper-8",
+    'sd15': "stable-diffusion-v1-5/stable-diffusion-v1-5",
+    # A few-MB test model with the same architecture; noise output, CPU-fast
+    'tiny': "hf-internal-testing/tiny-stable-diffusion-pipe",
+}
+# Load testing (tools/loadtest.py): set AITEX_LOAD_TEST=1 to serve the tiny
+# model on 127.0.0.1 without an ngrok tunnel, so the whole server path runs on CPU
+LOAD_TEST = os.environ.get("AITEX_LOAD_TEST") == "1"
+DEFAULT_MODEL = 'tiny' if LOAD_TEST else 'realistic_vision'
+MODEL_GPU_BUDGET_GB = 6.0   # two SD 1.5 models in fp16, leaving room for 2048 sampling
+MODEL_CPU_BUDGET_GB = 8.0
+SHARED_COMPONENTS = ('text_encoder', 'vae')
 
-model_id = "SG161222/Realistic_Vision_V5.1_noVAE"
 # Use float16 for GPU memory efficiency
 device = "cuda" if torch.cuda.is_available() else "cpu"
+dtype = torch.float16 if device == "cuda" else torch.float32
+
+def module_bytes(module):
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+def module_fingerprint(module):
+    """Hash of a module's weights, to find components two checkpoints share"""
+    digest = hashlib.sha1()
+    for name, tensor in module.state_dict().items():
+        digest.update(name.encode())
+        digest.update(tensor.detach().cpu().reshape(-1).view(torch.uint8).numpy().tobytes())
+    return digest.hexdigest()
+
+class ModelCache:
+    def __init__(self):
+        self.pipelines = OrderedDict()   # least recently used first
+        self.on_gpu = set()
+        self.in_use = {}                 # requests currently sampling with each model
+        self.shared = {}                 # (component, fingerprint) -> module
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+
+    def _load(self, name):
+        print(f"Loading {name} ({MODEL_REGISTRY[name]}), this takes 2-3 minutes...")
+        pipeline = StableDiffusionPipeline.from_pretrained(
+            MODEL_REGISTRY[name],
+            torch_dtype=dtype,
+            safety_checker=None
+        )
+        components = dict(pipeline.components)
+        for component in SHARED_COMPONENTS:
+            key = (component, module_fingerprint(components[component]))
+            if key in self.shared:
+                print(f"  sharing {component} with an already loaded model")
+            components[component] = self.shared.setdefault(key, components[component])
+        pipeline = StableDiffusionPipeline(**components, requires_safety_checker=False)
+        # Decode large images tile by tile so 2048+ sampling/refinement fits in memory
+        pipeline.enable_vae_tiling()
+        return pipeline
+
+    def _modules(self, names):
+        """Distinct modules of the named pipelines (shared ones counted once)"""
+        modules = {}
+        for name in names:
+            for module in self.pipelines[name].components.values():
+                if isinstance(module, torch.nn.Module):
+                    modules[id(module)] = module
+        return modules
+
+    def _size_gb(self, names):
+        return sum(module_bytes(m) for m in self._modules(names).values()) / 1024**3
+
+    def _evict(self):
+        # Park least recently used models in CPU RAM, then drop the oldest
+        # parked ones; models in use by a request are never touched
+        for name in list(self.pipelines):
+            if self._size_gb(self.on_gpu) <= MODEL_GPU_BUDGET_GB:
+                break
+            if name in self.on_gpu and not self.in_use.get(name):
+                self.on_gpu.discard(name)
+                keep = self._modules(self.on_gpu)
+                for key, module in self._modules([name]).items():
+                    if key not in keep:
+                        module.to("cpu")
+                print(f"📦 Parked {name} in CPU RAM")
+        for name in list(self.pipelines):
+            parked = [n for n in self.pipelines if n not in self.on_gpu]
+            if self._size_gb(parked) <= MODEL_CPU_BUDGET_GB:
+                break
+            if name not in self.on_gpu and not self.in_use.get(name):
+                del self.pipelines[name]
+                live = self._modules(self.pipelines)
+                self.shared = {key: m for key, m in self.shared.items() if id(m) in live}
+                print(f"🗑️ Unloaded {name}")
+        if device == "cuda":
+            torch.cuda.empty_cache()
+
+    def _pin(self, name):
+        self.pipelines.move_to_end(name)
+        self.in_use[name] = self.in_use.get(name, 0) + 1
+        if name not in self.on_gpu:
+            start = time.perf_counter()
+            for module in self._modules([name]).values():
+                module.to(device)
+            self.on_gpu.add(name)
+            print(f"🔁 {name} on {device} in {time.perf_counter() - start:.1f}s")
+        self._evict()
+        return self.pipelines[name]
+
+    def acquire(self, name):
+        """Load or move a model onto the GPU and pin it there until release()."""
+        with self.lock:
+            if name in self.pipelines:
+                return self._pin(name)
+        with self.load_lock:
+            with self.lock:
+                if name in self.pipelines:  # loaded by another request meanwhile
+                    return self._pin(name)
+            # Requests for other models keep running while this one loads
+            pipeline = self._load(name)
+            with self.lock:
+                self.pipelines[name] = pipeline
+                return self._pin(name)
+
+    def release(self, name):
+        with self.lock:
+            self.in_use[name] -= 1
+            self._evict()
+
+    @contextmanager
+    def use(self, name):
+        """Sampling in this thread uses the named model inside the block"""
+        pipeline = self.acquire(name)
+        previous = getattr(active_model, 'pipeline', None)
+        active_model.pipeline = pipeline
+        try:
+            yield pipeline
+        finally:
+            active_model.pipeline = previous
+            self.release(name)
+
+    def status(self):
+        with self.lock:
+            return {name: device if name in self.on_gpu else "cpu" for name in self.pipelines}
 
-# Load pipeline
-pipe = StableDiffusionPipeline.from_pretrained(
-    model_id,
-    torch_dtype=torch.float16 if device == "cuda" else torch.float32,
-    safety_checker=None
-)
-
-# Configure the recommended DPM++ 2M Karras scheduler
-pipe.scheduler = DPMSolverMultistepScheduler.from_config(
-    pipe.scheduler.config,
-    algorithm_type="dpmsolver++",
-    final_sigmas_type="sigma_min",
-    use_karras_sigmas=True
-)
-
-pipe = pipe.to(device)
+active_model = threading.local()
+models = ModelCache()
+
+def current_pipe():
+    """The pipeline chosen with models.use() in this thread.
+
+    There is no fallback: a pipeline used outside models.use() is not pinned
+    and could be parked or unloaded by another request while sampling.
+    """
+    pipeline = getattr(active_model, 'pipeline', None)
+    if pipeline is None:
+        raise RuntimeError("No model in use on this thread; sample inside models.use()")
+    return pipeline
+
+models.acquire(DEFAULT_MODEL)
+models.release(DEFAULT_MODEL)
 print(f"✅ Model loaded on {device}")
 # --- END OF CELL 3 ---
 
 # --- CELL 4: Texture generation functions ---
-def generate_diffuse(prompt, resolution=1024):
-    """Generate base color/diffuse texture"""
-    full_prompt = f"{prompt}, high quality texture, seamless, PBR, 4k, photograph, detailed, high definition"
-    negative_prompt = "deformed, blurry, bad quality, low res, watermark, text, signature"
+# Sampler factories by name, built from the loaded model's scheduler config
+SCHEDULERS = {
+    'dpmpp_2m_karras': lambda config: DPMSolverMultistepScheduler.from_config(
+        config, algorithm_type="dpmsolver++", final_sigmas_type="sigma_min", use_karras_sigmas=True),
+    'unipc': lambda config: UniPCMultistepScheduler.from_config(config),
+    'euler_a': lambda config: EulerAncestralDiscreteScheduler.from_config(config),
+}
 
-    image = pipe(
-        full_prompt,
-        negative_prompt=negative_prompt,
-        num_inference_steps=25,
-        height=resolution,
-        width=resolution,
-    ).images[0]
+# Step budgets per map. 'balanced' is the original fixed budget. The draft and
+# final step counts are shipped starting points; the calibration cell (CELL
+# 4c) replaces them with measured ones and saves them to STEP_PROFILES_FILE.
+PROFILE_NAMES = ('draft', 'balanced', 'final')
+STEP_PROFILES = {
+    'draft': {
+        'diffuse': {'steps': 12, 'guidance': 7.0, 'scheduler': 'unipc'},
+        'roughness': {'steps': 8, 'guidance': 7.0, 'scheduler': 'unipc'},
+        'height': {'steps': 10, 'guidance': 8.0, 'scheduler': 'unipc'},
+        'metallic': {'steps': 8, 'guidance': 7.0, 'scheduler': 'unipc'},
+    },
+    'balanced': {
+        'diffuse': {'steps': 25, 'guidance': 7.5, 'scheduler': 'dpmpp_2m_karras'},
+        'roughness': {'steps': 20, 'guidance': 7.5, 'scheduler': 'dpmpp_2m_karras'},
+        'height': {'steps': 25, 'guidance': 8.0, 'scheduler': 'dpmpp_2m_karras'},
+        'metallic': {'steps': 15, 'guidance': 7.5, 'scheduler': 'dpmpp_2m_karras'},
+    },
+    'final': {
+        'diffuse': {'steps': 40, 'guidance': 7.5, 'scheduler': 'dpmpp_2m_karras'},
+        'roughness': {'steps': 30, 'guidance': 7.5, 'scheduler': 'dpmpp_2m_karras'},
+        'height': {'steps': 35, 'guidance': 8.0, 'scheduler': 'dpmpp_2m_karras'},
+        'metallic': {'steps': 25, 'guidance': 7.5, 'scheduler': 'dpmpp_2m_karras'},
+    },
+}
+DEFAULT_PROFILE = 'balanced'
+STEP_PROFILES_FILE = "step_profiles.json"
+
+if os.path.exists(STEP_PROFILES_FILE):
+    with open(STEP_PROFILES_FILE) as f:
+        for name, budget in json.load(f).items():
+            if name in STEP_PROFILES and name != DEFAULT_PROFILE:
+                STEP_PROFILES[name].update(budget)
+    print(f"✅ Calibrated step profiles loaded from {STEP_PROFILES_FILE}")
+
+def pipeline_view(pipeline_class, scheduler='dpmpp_2m_karras'):
+    """A pipeline over the loaded weights (no extra GPU memory) with its own
+    scheduler instance; schedulers keep per-run state, so concurrent requests
+    must not share one."""
+    base = current_pipe()
+    return pipeline_class(
+        **dict(base.components, scheduler=SCHEDULERS[scheduler](base.scheduler.config)),
+        requires_safety_checker=False,
+    )
+
+# Pixels generated per pipe() call when several images (UDIM tiles, atlas
+# regions) are requested at once: 4 images at 1024, 1 at 2048.
+PIPE_BATCH_PIXELS = 4 * 1024 * 1024
+
+def run_pipe(prompts, resolution, seed, settings, **kwargs):
+    """Run the pipeline once per prompt in the list, batched to fit GPU memory.
+
+    settings is one map's entry of a step profile. With a seed, image i uses
+    seed + i, so every tile is reproducible.
+    """
+    sampler = pipeline_view(StableDiffusionPipeline, settings['scheduler'])
+    per_call = max(1, PIPE_BATCH_PIXELS // (resolution * resolution))
+    images = []
+    for start in range(0, len(prompts), per_call):
+        batch = prompts[start:start + per_call]
+        generator = None
+        if seed is not None:
+            generator = [torch.Generator(device=device).manual_seed(seed + start + i) for i in range(len(batch))]
+        images += sampler(
+            batch,
+            height=resolution,
+            width=resolution,
+            num_inference_steps=settings['steps'],
+            guidance_scale=settings['guidance'],
+            generator=generator,
+            **kwargs
+        ).images
+    return images
+
+DIFFUSE_NEGATIVE_PROMPT = "deformed, blurry, bad quality, low res, watermark, text, signature"
 
-    return image
+TILEABLE_SUFFIX = ", seamless tileable texture, repeating pattern, no visible seams, tiling pattern"
 
-def generate_roughness(prompt, resolution=1024):
-    """Generate roughness map"""
-    full_prompt = f"roughness map for {prompt}, grayscale, high values for rough matte surface, seamless texture"
+def diffuse_prompt(prompt):
+    return f"{prompt}, high quality texture, seamless, PBR, 4k, photograph, detailed, high definition"
 
-    image = pipe(
-        full_prompt,
-        num_inference_steps=20,
-        height=resolution,
-        width=resolution,
-    ).images[0]
+# The generate_* functions return one image per entry of prompts; settings
+# defaults to the map's entry in the default step profile.
+def generate_diffuse(prompts, resolution=1024, seed=None, settings=None):
+    """Generate base color/diffuse textures"""
+    full_prompts = [diffuse_prompt(prompt) for prompt in prompts]
+    negative_prompt = DIFFUSE_NEGATIVE_PROMPT
+
+    return run_pipe(
+        full_prompts, resolution, seed,
+        settings or STEP_PROFILES[DEFAULT_PROFILE]['diffuse'],
+        negative_prompt=negative_prompt,
+    )
+
+def generate_roughness(prompts, resolution=1024, seed=None, settings=None):
+    """Generate roughness maps"""
+    full_prompts = [
+        f"roughness map for {prompt}, grayscale, high values for rough matte surface, seamless texture"
+        for prompt in prompts
+    ]
+
+    images = run_pipe(full_prompts, resolution, seed, settings or STEP_PROFILES[DEFAULT_PROFILE]['roughness'])
 
     # Enhance brightness to spread the values for better effect
-    image = image.convert('L')
-    enhancer = ImageEnhance.Brightness(image)
-    image = enhancer.enhance(1.5)
-    image = image.convert('RGB')
-    return image
-
-def generate_height_map(prompt, resolution=1024):
-    """Generate height/bump map"""
-    full_prompt = f"height map of {prompt}, detailed bump map, grayscale, high contrast surface relief, displacement map style"
-
-    image = pipe(
-        full_prompt,
-        num_inference_steps=25,
-        height=resolution,
-        width=resolution,
-        guidance_scale=8.0
-    ).images[0]
-
-    height_map = image.convert('L')
-    return height_map
-
-def height_to_normal(height_map, strength=3.0):
-    """Convert height map to proper normal map"""
+    result = []
+    for image in images:
+        image = image.convert('L')
+        enhancer = ImageEnhance.Brightness(image)
+        image = enhancer.enhance(1.5)
+        result.append(image.convert('RGB'))
+    return result
+
+def generate_height_map(prompts, resolution=1024, seed=None, settings=None):
+    """Generate height/bump maps"""
+    full_prompts = [
+        f"height map of {prompt}, detailed bump map, grayscale, high contrast surface relief, displacement map style"
+        for prompt in prompts
+    ]
+
+    images = run_pipe(full_prompts, resolution, seed, settings or STEP_PROFILES[DEFAULT_PROFILE]['height'])
+    return [image.convert('L') for image in images]
+
+def height_to_normal(height_map, strength=3.0, wrap=False):
+    """Convert height map to proper normal map (wrap=True keeps a tileable map tileable)"""
     height_array = np.array(height_map).astype(np.float32) / 255.0
-    sobel_x = ndimage.sobel(height_array, axis=1) * strength
-    sobel_y = ndimage.sobel(height_array, axis=0) * strength
+    mode = 'wrap' if wrap else 'reflect'
+    sobel_x = ndimage.sobel(height_array, axis=1, mode=mode) * strength
+    sobel_y = ndimage.sobel(height_array, axis=0, mode=mode) * strength
 
     normal_z = np.ones_like(height_array)
     length = np.sqrt(sobel_x**2 + sobel_y**2 + normal_z**2)
@@ -125,82 +364,699 @@ def height_to_normal(height_map, strength=3.0):
     normal_map = np.stack([r, g, b], axis=2)
     return Image.fromarray(normal_map)
 
-def generate_normal(prompt, resolution=1024):
-    height_map = generate_height_map(prompt, resolution)
-    normal_map = height_to_normal(height_map, strength=3.0)
-    return normal_map
-
-def generate_metallic(prompt, resolution=1024):
-    """Generate metallic mask"""
-    if "metal" in prompt.lower():
-        full_prompt = f"metallic mask for {prompt}, white for metal, black for non-metal, grayscale"
-        image = pipe(
-            full_prompt,
-            num_inference_steps=15,
-            height=resolution,
-            width=resolution,
+def generate_normal(prompts, resolution=1024, seed=None, settings=None):
+    height_maps = generate_height_map(prompts, resolution, seed, settings)
+    return [height_to_normal(height_map, strength=3.0) for height_map in height_maps]
+
+def is_metal_prompt(prompt):
+    """Only metal prompts get a generated metallic mask; the rest are black"""
+    return "metal" in prompt.lower()
+
+def generate_metallic(prompts, resolution=1024, seed=None, settings=None):
+    """Generate metallic masks"""
+    # Optimized: fully black images for non-metallic materials
+    images = [Image.new('RGB', (resolution, resolution), color = 'black') for _ in prompts]
+    metal = [i for i, prompt in enumerate(prompts) if is_metal_prompt(prompt)]
+    if metal:
+        full_prompts = [
+            f"metallic mask for {prompts[i]}, white for metal, black for non-metal, grayscale" for i in metal
+        ]
+        generated = run_pipe(full_prompts, resolution, seed, settings or STEP_PROFILES[DEFAULT_PROFILE]['metallic'])
+        for i, image in zip(metal, generated):
+            images[i] = image.convert('L').convert('RGB')
+    return images
+
+# Seam check for tileable maps: the difference across the wrapped edge
+# relative to the typical difference between neighbouring pixels
+# (1.0 = the wrap is as smooth as the interior).
+SEAM_THRESHOLD = 1.5
+SEAM_BLEND = 0.125  # fraction of the size, from each border, taken from the offset copy
+
+def seam_scores(img):
+    """Return [horizontal, vertical] seam error of a map when tiled"""
+    a = np.asarray(img, dtype=np.float32)
+    if a.ndim == 2:
+        a = a[..., None]
+    # One grey level of slack so quantization alone doesn't score on smooth or flat maps
+    horizontal = np.abs(a[:, 0] - a[:, -1]).mean() / (np.abs(np.diff(a, axis=1)).mean() + 1.0)
+    vertical = np.abs(a[0] - a[-1]).mean() / (np.abs(np.diff(a, axis=0)).mean() + 1.0)
+    return [round(float(horizontal), 3), round(float(vertical), 3)]
+
+def repair_seams(img, axes):
+    """Offset-and-blend repair of the wrapped seams along the given axes (1 = horizontal, 0 = vertical).
+
+    Per axis, the map is blended with a copy rolled by half its size; the
+    copy supplies the pixels near the borders, where its content is
+    continuous across the wrap, and its own seam lands in the untouched
+    centre. The axes are repaired one after the other so the corners stay clean.
+    """
+    a = np.asarray(img, dtype=np.float32)
+    for axis in axes:
+        size = a.shape[axis]
+        index = np.arange(size)
+        to_border = np.minimum(index, size - 1 - index)
+        weight = np.clip(1.0 - to_border / (SEAM_BLEND * size), 0.0, 1.0).astype(np.float32)
+        shape = [1] * a.ndim
+        shape[axis] = size
+        weight = weight.reshape(shape)
+        a = a * (1.0 - weight) + np.roll(a, size // 2, axis=axis) * weight
+    return Image.fromarray(np.clip(a + 0.5, 0, 255).astype(np.uint8))
+
+# Pixels cross-faded on each side of a border shared by two UDIM tiles
+UDIM_SEAM_BAND = 32
+MAX_UDIM_TILES = 16
+
+def blend_udim_seams(images, tiles, band=UDIM_SEAM_BAND):
+    """Cross-fade the borders of neighbouring UDIM tiles so a map continues across them.
+
+    Both sides of a shared border are pulled towards its mean over band
+    pixels. Tile t + 1 is to the right of t, tile t + 10 above it.
+    """
+    arrays = {}
+    for tile, img in zip(tiles, images):
+        array = np.asarray(img, dtype=np.float32).copy()
+        arrays[tile] = array if array.ndim == 3 else array[..., None]
+    fade_in = np.linspace(0.0, 1.0, band, dtype=np.float32)  # 1 at the border
+    fade_out = fade_in[::-1]
+
+    for tile, a in arrays.items():
+        right = arrays.get(tile + 1) if (tile - 1001) % 10 != 9 else None
+        if right is not None:
+            seam = (a[:, -1] + right[:, 0]) * 0.5
+            a[:, -band:] += fade_in[None, :, None] * (seam - a[:, -1])[:, None]
+            right[:, :band] += fade_out[None, :, None] * (seam - right[:, 0])[:, None]
+        upper = arrays.get(tile + 10)
+        if upper is not None:
+            # Rows run top-down: this tile's top row meets the upper tile's bottom row
+            seam = (a[0] + upper[-1]) * 0.5
+            a[:band] += fade_out[:, None, None] * (seam - a[0])[None]
+            upper[-band:] += fade_in[:, None, None] * (seam - upper[-1])[None]
+
+    blended = []
+    for tile, img in zip(tiles, images):
+        array = np.clip(arrays[tile], 0, 255).astype(np.uint8)
+        blended.append(Image.fromarray(array[..., 0] if img.mode == 'L' else array))
+    return blended
+
+MAX_ATLAS_REGIONS = 64
+
+def atlas_region_size(resolution, grid):
+    """Size to generate atlas regions at: the cell size, within what the model handles well"""
+    cell = resolution // grid
+    return max(512, min(1024, cell - cell % 8))
+
+def compose_atlas(images, resolution, grid, padding):
+    """Place region images on a grid x grid atlas, row-major from the top left.
+
+    Each region is scaled into its cell minus padding; the padding repeats
+    the region's edge pixels so filtering and mipmaps don't bleed between
+    regions. Unused cells stay black.
+    """
+    cell = resolution // grid
+    inner = cell - 2 * padding
+    channels = () if images[0].mode == 'L' else (3,)
+    atlas = np.zeros((resolution, resolution) + channels, dtype=np.uint8)
+    for i, img in enumerate(images):
+        region = np.asarray(img.resize((inner, inner), Image.LANCZOS))
+        pad = ((padding, padding), (padding, padding)) + ((0, 0),) * (region.ndim - 2)
+        row, col = divmod(i, grid)
+        atlas[row * cell:(row + 1) * cell, col * cell:(col + 1) * cell] = np.pad(region, pad, mode='edge')
+    return Image.fromarray(atlas)
+
+# Upscale stage: above UPSCALE_NATIVE the maps are sampled at UPSCALE_NATIVE
+# and upscaled, since denoising cost grows with the square of the size.
+# 'refine' adds a short low-strength img2img pass on the diffuse map.
+UPSCALE_MODES = ['refine', 'resample', 'off']
+UPSCALE_NATIVE = 1024
+REFINE_MAX = 2048        # refinement above this runs out of memory on a 16 GB GPU
+REFINE_STRENGTH = 0.25   # fraction of the schedule re-run; keeps the composition
+REFINE_STEPS = 20        # scheduled steps; at 0.25 strength about 5 are run
+
+def sharpen_resize(img, size, sharpen=True):
+    """Lanczos resample plus (if sharpen) a light unsharp mask to keep edges crisp"""
+    resized = img.resize((size, size), Image.LANCZOS)
+    if not sharpen or size <= img.size[0]:
+        return resized
+    return resized.filter(ImageFilter.UnsharpMask(radius=2, percent=60, threshold=2))
+
+def upscale_images(images, size, refine_prompts=None, seed=None, sharpen=True):
+    """Upscale generated images to size.
+
+    With refine_prompts (one per image) a short img2img pass at up to
+    REFINE_MAX re-synthesizes fine detail the resample cannot invent.
+    Data maps pass sharpen=False: the unsharp mask would add detail to them.
+    """
+    if refine_prompts is None:
+        return [sharpen_resize(img, size, sharpen) for img in images]
+    refine_size = min(size, REFINE_MAX)
+    img2img = pipeline_view(StableDiffusionImg2ImgPipeline)
+    result = []
+    for i, (img, prompt) in enumerate(zip(images, refine_prompts)):
+        generator = None if seed is None else torch.Generator(device=device).manual_seed(seed + i)
+        refined = img2img(
+            prompt=prompt,
+            negative_prompt=DIFFUSE_NEGATIVE_PROMPT,
+            image=sharpen_resize(img, refine_size),
+            strength=REFINE_STRENGTH,
+            num_inference_steps=REFINE_STEPS,
+            generator=generator,
         ).images[0]
-        image = image.convert('L').convert('RGB')
-        return image
-    else:
-        # Optimized: return a fully black image for non-metallic materials
-        return Image.new('RGB', (resolution, resolution), color = 'black')
+        result.append(sharpen_resize(refined, size) if refine_size != size else refined)
+    return result
 
+def pack_orm(height_map, roughness, metallic):
+    """Pack height, roughness and metallic into the R, G and B channels of one image"""
+    return Image.merge('RGB', (height_map.convert('L'), roughness.convert('L'), metallic.convert('L')))
 
-def image_to_base64(img):
+# A map whose channels all stay within UNIFORM_RANGE, or vary less than
+# UNIFORM_STD, is sent as its mean values instead of an image.
+UNIFORM_RANGE = 2.0 / 255
+UNIFORM_STD = 0.5 / 255
+
+def uniform_value(img):
+    """Return per-channel means [r, g, b] (0-1) if the image is (near) uniform, else None"""
+    pixels = np.asarray(img.convert('RGB'))
+    if np.ptp(pixels, axis=(0, 1)).max() > UNIFORM_RANGE * 255:
+        # Variance on a strided sample is enough to tell noise from content
+        sample = pixels[::4, ::4].reshape(-1, 3).astype(np.float32)
+        if sample.std(axis=0).max() > UNIFORM_STD * 255:
+            return None
+    return [round(float(v) / 255.0, 4) for v in pixels.mean(axis=(0, 1))]
+
+def image_to_base64(img, quality=85, subsampling=None):
     """Convert PIL Image to base64 string, using JPEG for smaller payload"""
     buffered = io.BytesIO()
-    img.save(buffered, format="JPEG", quality=85)
+    options = {} if subsampling is None else {'subsampling': subsampling}
+    img.save(buffered, format="JPEG", quality=quality, **options)
     img_str = base64.b64encode(buffered.getvalue()).decode()
     return img_str
 
+# Same-machine handoff (LOCAL_MODE): instead of JPEG + base64, pixels are
+# written to .npy files in the OS temp folder in Blender's layout (float32
+# RGBA, bottom row first) and only their paths are returned. The addon maps
+# them and hands the array straight to Image.pixels, so neither side encodes,
+# decodes or converts; the price is 16 bytes per pixel on disk (256 MB for
+# a 4K map). The client deletes the files once read; folders older than
+# HANDOFF_TTL are swept in case a client never came back (or, on Windows,
+# still had them mapped).
+# Only offered when the server is started with AITEX_LOCAL_HANDOFF=1, which
+# also skips the ngrok tunnel and listens on 127.0.0.1 only. The peer address
+# can't decide it: ngrok forwards every tunnelled request from 127.0.0.1.
+LOCAL_HANDOFF = os.environ.get("AITEX_LOCAL_HANDOFF") == "1"
+HANDOFF_DIR = os.path.join(tempfile.gettempdir(), "aitex_handoff")
+HANDOFF_TTL = 600  # seconds
+
+def sweep_handoffs():
+    if not os.path.isdir(HANDOFF_DIR):
+        return
+    cutoff = time.time() - HANDOFF_TTL
+    for name in os.listdir(HANDOFF_DIR):
+        folder = os.path.join(HANDOFF_DIR, name)
+        try:
+            if os.path.getmtime(folder) < cutoff:
+                shutil.rmtree(folder, ignore_errors=True)
+        except OSError:
+            pass
+
+def write_handoff(folder, key, img):
+    """Write an image's pixels in Blender's layout for the client and return the response entry"""
+    path = os.path.join(folder, f"{key}.npy")
+    rgba = np.asarray(img.convert('RGBA'))[::-1]
+    np.save(path, np.multiply(rgba, np.float32(1.0 / 255.0), dtype=np.float32))
+    return {'handoff': path}
+
 print("✅ Texture generation functions ready")
 # --- END OF CELL 4 ---
 
+# --- CELL 4b: Upscale benchmark (optional) ---
+# Compares direct high-resolution sampling with the upscale stage on one
+# diffuse map: wall time, peak GPU memory and sharpness (variance of the
+# Laplacian of the luminance; higher = more fine detail).
+RUN_UPSCALE_BENCHMARK = False
+
+def sharpness(img):
+    luminance = np.asarray(img.convert('L'), dtype=np.float32) / 255.0
+    return float(ndimage.laplace(luminance).var())
+
+def run_upscale_benchmark(prompt="weathered oak wood planks", resolution=2048, seed=1234):
+    rows = []
+    for mode in UPSCALE_MODES[::-1]:
+        if device == "cuda":
+            torch.cuda.empty_cache()
+            torch.cuda.reset_peak_memory_stats()
+        start = time.perf_counter()
+        try:
+            if mode == 'off':
+                img = generate_diffuse([prompt], resolution, seed)[0]
+            else:
+                base = generate_diffuse([prompt], UPSCALE_NATIVE, seed)
+                refine_prompts = [diffuse_prompt(prompt)] if mode == 'refine' else None
+                img = upscale_images(base, resolution, refine_prompts, seed)[0]
+        except torch.cuda.OutOfMemoryError:
+            rows.append((mode, None, None, None))
+            continue
+        elapsed = time.perf_counter() - start
+        peak_gb = torch.cuda.max_memory_allocated() / 1024**3 if device == "cuda" else 0.0
+        rows.append((mode, elapsed, peak_gb, sharpness(img)))
+
+    print(f"Upscale benchmark: '{prompt}' at {resolution}px (base {UPSCALE_NATIVE}px)")
+    print(f"{'mode':<10}{'time (s)':>10}{'peak GPU (GB)':>15}{'sharpness':>12}")
+    for mode, elapsed, peak_gb, sharp in rows:
+        if elapsed is None:
+            print(f"{mode:<10}{'out of memory':>37}")
+        else:
+            print(f"{mode:<10}{elapsed:>10.1f}{peak_gb:>15.2f}{sharp:>12.5f}")
+    return rows
+
+if RUN_UPSCALE_BENCHMARK:
+    with models.use(DEFAULT_MODEL):
+        run_upscale_benchmark()
+# --- END OF CELL 4b ---
+
+# --- CELL 4c: Step budget calibration (optional) ---
+# For each map, sweeps step counts over a sample of the addon's presets and
+# compares them (mean SSIM) with a CALIBRATION_REFERENCE_STEPS render with
+# the same seed. Each profile in CALIBRATION_TOLERANCES gets the cheapest
+# count within its tolerance, sampled with that profile's own guidance and
+# scheduler. The profiles are saved to STEP_PROFILES_FILE,
+# where CELL 4 loads them on the next start, and take effect immediately.
+RUN_STEP_CALIBRATION = False
+CALIBRATION_PROMPTS = [
+    "rusty worn metal surface with scratches, orange rust, blue oxidation, weathering",
+    "oak wood planks with prominent grain, knots, and natural variations",
+    "white marble with elegant gray veins and polished surface",
+    "rough concrete surface with aggregate, pitting, and subtle cracks",
+    "woven fabric texture with detailed fiber pattern and slight roughness",
+    "carbon fiber weave pattern with distinctive twill texture and glossy epoxy",
+]
+# Non-metals get a constant black metallic map, which matches the reference at
+# any step count, so the metallic budget is calibrated on metal presets only
+CALIBRATION_METAL_PROMPTS = [
+    "rusty worn metal surface with scratches, orange rust, blue oxidation, weathering",
+    "hammered copper surface with verdigris patina, dents and texture",
+    "brushed aluminum metal with linear grain pattern and scratches",
+    "rough cast iron surface with pitted texture and dark finish",
+]
+CALIBRATION_STEPS = [6, 8, 10, 12, 15, 20, 25, 30, 40]
+CALIBRATION_REFERENCE_STEPS = 50
+CALIBRATION_TOLERANCES = {'draft': 0.80, 'final': 0.95}
+CALIBRATION_SIZE = 512
+
+MAP_GENERATORS = {
+    'diffuse': generate_diffuse,
+    'roughness': generate_roughness,
+    'height': generate_height_map,
+    'metallic': generate_metallic,
+}
+
+def ssim(a, b):
+    """Mean structural similarity of two images' luminance (Gaussian window)"""
+    x = np.asarray(a.convert('L'), dtype=np.float64) / 255.0
+    y = np.asarray(b.convert('L'), dtype=np.float64) / 255.0
+    blur = lambda img: ndimage.gaussian_filter(img, 1.5)
+    mu_x, mu_y = blur(x), blur(y)
+    var_x = blur(x * x) - mu_x * mu_x
+    var_y = blur(y * y) - mu_y * mu_y
+    cov = blur(x * y) - mu_x * mu_y
+    c1, c2 = 0.01 ** 2, 0.03 ** 2
+    score = ((2 * mu_x * mu_y + c1) * (2 * cov + c2)) / ((mu_x ** 2 + mu_y ** 2 + c1) * (var_x + var_y + c2))
+    return float(score.mean())
+
+def calibrate_step_budgets(prompts=CALIBRATION_PROMPTS, metal_prompts=CALIBRATION_METAL_PROMPTS, seed=1234):
+    """Cheapest step count per map and profile within CALIBRATION_TOLERANCES of the reference.
+
+    The reference uses the default profile's settings. Each profile is swept
+    with its own guidance and scheduler; only its step counts change.
+    """
+    profiles = {name: {} for name in CALIBRATION_TOLERANCES}
+    print(f"{'map':<10}{'profile':<10}{'steps':>6}{'ssim':>8}{'time (s)':>10}")
+    for name, generate in MAP_GENERATORS.items():
+        sample = metal_prompts if name == 'metallic' else prompts
+        settings = dict(STEP_PROFILES[DEFAULT_PROFILE][name], steps=CALIBRATION_REFERENCE_STEPS)
+        reference = generate(sample, CALIBRATION_SIZE, seed, settings)
+        for profile, tolerance in CALIBRATION_TOLERANCES.items():
+            settings = STEP_PROFILES[profile][name]
+            profiles[profile][name] = dict(settings, steps=CALIBRATION_REFERENCE_STEPS)
+            for steps in sorted(CALIBRATION_STEPS):
+                start = time.perf_counter()
+                images = generate(sample, CALIBRATION_SIZE, seed, dict(settings, steps=steps))
+                elapsed = time.perf_counter() - start
+                score = float(np.mean([ssim(img, ref) for img, ref in zip(images, reference)]))
+                print(f"{name:<10}{profile:<10}{steps:>6}{score:>8.3f}{elapsed:>10.1f}")
+                if score >= tolerance:
+                    profiles[profile][name]['steps'] = steps
+                    break
+    with open(STEP_PROFILES_FILE, 'w') as f:
+        json.dump(profiles, f, indent=4)
+    STEP_PROFILES.update(profiles)
+    print(f"Calibrated profiles (saved to {STEP_PROFILES_FILE}):")
+    print(json.dumps(profiles, indent=4))
+    return profiles
+
+if RUN_STEP_CALIBRATION:
+    with models.use(DEFAULT_MODEL):
+        calibrate_step_budgets()
+# --- END OF CELL 4c ---
+
 # --- CELL 5 & 6: Flask and Ngrok Server ---
 
 app = Flask(__name__)
 
+# Requests currently queued or being served; reported by /health so clients with
+# several backends can send work to the least-loaded one.
+active_requests = 0
+active_requests_lock = threading.Lock()
+
+# Finished response bodies by job id, so a client whose tunnel dropped can
+# fetch (or resume) the result from /result/<job_id> instead of regenerating.
+RESULT_CACHE_SIZE = 8
+results = OrderedDict()
+pending_jobs = set()
+results_lock = threading.Lock()
+
+def store_result(job_id, body):
+    with results_lock:
+        pending_jobs.discard(job_id)
+        results[job_id] = body
+        results.move_to_end(job_id)
+        while len(results) > RESULT_CACHE_SIZE:
+            results.popitem(last=False)
+
+# Admission control: GENERATION_SLOTS jobs sample at once and waiting ones
+# are served interactive first, then batch, then prebake (FIFO within a
+# class). Each class has a bounded queue; when it is full, or the wait would
+# exceed MAX_QUEUE_WAIT, the request gets a 429 with a Retry-After estimated
+# from recent job durations instead of waiting until the client times out.
+PRIORITY_CLASSES = ['interactive', 'batch', 'prebake']
+QUEUE_LIMITS = {'interactive': 4, 'batch': 8, 'prebake': 16}
+GENERATION_SLOTS = 1
+MAX_QUEUE_WAIT = 300     # seconds; the client gives up after 600
+JOB_SECONDS_SMOOTHING = 0.3
+
+class AdmissionQueue:
+    def __init__(self, slots):
+        self.slots = slots
+        self.running = 0
+        self.queues = {name: [] for name in PRIORITY_CLASSES}
+        self.job_seconds = 60.0  # moving average of successful jobs
+        self.cond = threading.Condition()
+
+    def _ahead(self, priority):
+        rank = PRIORITY_CLASSES.index(priority)
+        return self.running + sum(len(self.queues[name]) for name in PRIORITY_CLASSES[:rank + 1])
+
+    def estimated_wait(self, priority):
+        return max(0, self._ahead(priority) - self.slots + 1) * self.job_seconds / self.slots
+
+    def enter(self, priority):
+        """Block until this request may generate.
+
+        Returns None once admitted, or the Retry-After in seconds when the
+        class's queue is full.
+        """
+        rank = PRIORITY_CLASSES.index(priority)
+        with self.cond:
+            wait = self.estimated_wait(priority)
+            if len(self.queues[priority]) >= QUEUE_LIMITS[priority] or wait > MAX_QUEUE_WAIT:
+                return math.ceil(max(wait - MAX_QUEUE_WAIT, self.job_seconds / self.slots))
+            ticket = object()
+            queue = self.queues[priority]
+            queue.append(ticket)
+            while (self.running >= self.slots or queue[0] is not ticket
+                   or any(self.queues[name] for name in PRIORITY_CLASSES[:rank])):
+                self.cond.wait()
+            queue.pop(0)
+            self.running += 1
+            self.cond.notify_all()
+            return None
+
+    def leave(self, elapsed=None):
+        """Free the slot; elapsed (successful jobs only) updates the estimate."""
+        with self.cond:
+            self.running -= 1
+            if elapsed is not None:
+                self.job_seconds += JOB_SECONDS_SMOOTHING * (elapsed - self.job_seconds)
+            self.cond.notify_all()
+
+    def status(self):
+        with self.cond:
+            return {
+                'running': self.running,
+                'queued': {name: len(queue) for name, queue in self.queues.items()},
+                'job_seconds': round(self.job_seconds, 1),
+            }
+
+admission = AdmissionQueue(GENERATION_SLOTS)
+
+def lap(timings, stage, start):
+    """Record the seconds since start as a stage timing and return the current time"""
+    now = time.perf_counter()
+    timings[stage] = round(now - start, 3)
+    return now
+
 @app.route('/generate', methods=['POST'])
 def generate_textures():
+    global active_requests
+    data = request.json or {}
+    model = data.get('model', DEFAULT_MODEL)
+    priority = data.get('priority', 'interactive')
+    if model not in MODEL_REGISTRY:
+        return jsonify({'error': f"Model must be one of {', '.join(MODEL_REGISTRY)}."}), 400
+    if priority not in PRIORITY_CLASSES:
+        return jsonify({'error': f"Priority must be one of {', '.join(PRIORITY_CLASSES)}."}), 400
+    # The job id is registered on arrival, so a client whose POST dropped can
+    # tell from /result whether to wait for it or send it again; a repeated
+    # POST never starts the job twice
+    job_id = str(data.get('job_id') or '')
+    if job_id:
+        with results_lock:
+            body = results.get(job_id)
+            running = job_id in pending_jobs
+            if body is None and not running:
+                pending_jobs.add(job_id)
+        if body is not None:
+            return Response(body, mimetype='application/json')
+        if running:
+            return jsonify({'error': 'Job is already running; fetch it from /result.', 'job_id': job_id}), 409
+    with active_requests_lock:
+        active_requests += 1
+    # Per-stage server timings, returned to the client for its trace
+    timings = {}
+    try:
+        queued = time.perf_counter()
+        retry_after = admission.enter(priority)
+        lap(timings, 'queue', queued)
+        if retry_after is not None:
+            print(f"⏳ {priority} queue full, asked client to retry in {retry_after}s")
+            response = jsonify({'error': f'Backend busy, retry in {retry_after}s.', 'retry_after': retry_after})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
+        start = time.perf_counter()
+        succeeded = False
+        try:
+            with models.use(model):
+                lap(timings, 'model', start)
+                result = _generate_textures(timings)
+            # Error responses come back as (body, status) tuples
+            succeeded = not isinstance(result, tuple)
+            return result
+        except Exception as e:
+            # Generation errors are handled in _generate_textures; this is the model load
+            print(f"❌ Could not load model {model}: {e}")
+            return jsonify({'error': f"Could not load model '{model}': {e}"}), 500
+        finally:
+            admission.leave(time.perf_counter() - start if succeeded else None)
+    finally:
+        if job_id:
+            # Finished jobs already moved to results (see store_result)
+            with results_lock:
+                pending_jobs.discard(job_id)
+        with active_requests_lock:
+            active_requests -= 1
+
+def _generate_textures(timings):
     try:
         data = request.json
+        job_id = str(data.get('job_id') or uuid.uuid4().hex)
+        trace_id = str(data.get('trace_id') or job_id)
         prompt = data.get('prompt', 'rusty metal surface')
         resolution = data.get('resolution', 1024)
         tileable = data.get('tileable', False)
+        packing = data.get('packing', 'separate')
+        upscale = data.get('upscale', 'refine')
+        profile = data.get('profile', DEFAULT_PROFILE)
+        udim_tiles = data.get('udim_tiles')
+        local_handoff = LOCAL_HANDOFF and data.get('transport') == 'local'
+        atlas_prompts = data.get('atlas_prompts')
+        seed = data.get('seed')
 
-        if resolution not in [512, 768, 1024, 2048]:
-             return jsonify({'error': 'Resolution must be 512, 768, 1024 or 2048 for this model.'}), 400
-
+        if profile not in PROFILE_NAMES:
+             return jsonify({'error': f"Profile must be one of {', '.join(PROFILE_NAMES)}."}), 400
+        if upscale not in UPSCALE_MODES:
+             return jsonify({'error': f"Upscale must be one of {', '.join(UPSCALE_MODES)}."}), 400
+        if resolution not in [512, 768, 1024, 2048, 4096, 8192] or (resolution > 2048 and upscale == 'off'):
+             return jsonify({'error': 'Resolution must be 512, 768, 1024 or 2048 for this model (4096 or 8192 with upscaling).'}), 400
+        if packing not in ['separate', 'orm']:
+             return jsonify({'error': "Packing must be 'separate' or 'orm'."}), 400
+        if udim_tiles is not None:
+            if (not isinstance(udim_tiles, list) or not 0 < len(udim_tiles) <= MAX_UDIM_TILES
+                    or not all(isinstance(t, int) and 1001 <= t <= 1100 for t in udim_tiles)):
+                return jsonify({'error': f'udim_tiles must list 1-{MAX_UDIM_TILES} tile numbers (1001-1100).'}), 400
+            udim_tiles = sorted(set(udim_tiles))
+            # Every tile is seeded from one shared seed so the set stays coherent
+            if seed is None:
+                seed = int(np.random.randint(0, 2**31 - 1 - len(udim_tiles)))
+        tiles = udim_tiles or [None]
+        prompts = [prompt] * len(tiles)
+        generation_size = resolution
+        if atlas_prompts is not None:
+            # One region per prompt, all generated in shared batched passes
+            atlas_grid = data.get('atlas_grid')
+            atlas_padding = data.get('atlas_padding', 8)
+            if udim_tiles:
+                return jsonify({'error': 'Atlas mode cannot be combined with UDIM tiles.'}), 400
+            if (not isinstance(atlas_prompts, list) or not 0 < len(atlas_prompts) <= MAX_ATLAS_REGIONS
+                    or not all(isinstance(p, str) and p for p in atlas_prompts)):
+                return jsonify({'error': f'atlas_prompts must list 1-{MAX_ATLAS_REGIONS} prompts.'}), 400
+            if not isinstance(atlas_grid, int) or atlas_grid * atlas_grid < len(atlas_prompts):
+                return jsonify({'error': 'atlas_grid is too small for the number of prompts.'}), 400
+            if not isinstance(atlas_padding, int) or not 0 <= atlas_padding < resolution // atlas_grid // 2:
+                return jsonify({'error': 'atlas_padding must leave room for each region.'}), 400
+            prompts = atlas_prompts
+            generation_size = atlas_region_size(resolution, atlas_grid)
         if tileable:
-            prompt = f"{prompt}, seamless tileable texture, repeating pattern, no visible seams, tiling pattern"
+            prompt += TILEABLE_SUFFIX
+            prompts = [p + TILEABLE_SUFFIX for p in prompts]
+        count = len(prompts)
+        # Sample at the native size and upscale afterwards (see upscale_images)
+        sample_size = generation_size
+        if upscale != 'off' and generation_size > UPSCALE_NATIVE:
+            sample_size = UPSCALE_NATIVE
 
-        print(f"Generating textures for: {prompt} at {resolution}x{resolution} (tileable: {tileable})")
+        print(f"[trace {trace_id[:8]}] Generating textures for: {prompt} at {resolution}x{resolution} (tileable: {tileable}, images per map: {count}, profile: {profile})")
 
+        # Each step produces one image per tile or atlas region (a single one otherwise)
+        budget = STEP_PROFILES[profile]
+        t = time.perf_counter()
         print("📝 [1/4] Generating diffuse (color) map...")
-        diffuse = generate_diffuse(prompt, resolution)
+        diffuse = generate_diffuse(prompts, sample_size, seed, budget['diffuse'])
+        t = lap(timings, 'diffuse', t)
 
         print("📝 [2/4] Generating roughness map...")
-        roughness = generate_roughness(prompt, resolution)
+        roughness = generate_roughness(prompts, sample_size, seed, budget['roughness'])
+        t = lap(timings, 'roughness', t)
 
         print("📝 [3/4] Generating normal (bump) map...")
-        normal = generate_normal(prompt, resolution)
+        height_maps = generate_height_map(prompts, sample_size, seed, budget['height'])
+        t = lap(timings, 'height', t)
 
         print("📝 [4/4] Generating metallic map...")
-        metallic = generate_metallic(prompt, resolution)
+        metallic = generate_metallic(prompts, sample_size, seed, budget['metallic'])
+        t = lap(timings, 'metallic', t)
+
+        if sample_size != generation_size:
+            # Only the diffuse map is refined; data maps are resampled so no
+            # detail is invented in them (no unsharp mask either). Normals are
+            # derived from the upscaled heights.
+            print(f"📝 Upscaling {sample_size}px -> {generation_size}px ({upscale})...")
+            refine_prompts = [diffuse_prompt(p) for p in prompts] if upscale == 'refine' else None
+            diffuse = upscale_images(diffuse, generation_size, refine_prompts, seed)
+            roughness, height_maps, metallic = (
+                upscale_images(images, generation_size, sharpen=False)
+                for images in (roughness, height_maps, metallic)
+            )
+            t = lap(timings, 'upscale', t)
 
-        response = {
-            'diffuse': image_to_base64(diffuse),
-            'roughness': image_to_base64(roughness),
-            'normal': image_to_base64(normal),
-            'metallic': image_to_base64(metallic),
+        # Tileable single maps: measure the wrapped seams and repair the whole
+        # set the same way when any map is over the threshold
+        wrap = tileable and not udim_tiles and atlas_prompts is None
+        seam_report = None
+        if wrap:
+            data_maps = {'diffuse': diffuse, 'roughness': roughness, 'height': height_maps, 'metallic': metallic}
+            scores = {name: seam_scores(images[0]) for name, images in data_maps.items()}
+            axes = [axis for axis, i in ((1, 0), (0, 1)) if max(score[i] for score in scores.values()) > SEAM_THRESHOLD]
+            seam_report = {'before': scores, 'repaired_axes': ['horizontal' if axis == 1 else 'vertical' for axis in axes]}
+            if axes:
+                print(f"📝 Repairing seams ({', '.join(seam_report['repaired_axes'])})...")
+                diffuse, roughness, height_maps, metallic = (
+                    [repair_seams(images[0], axes)] for images in (diffuse, roughness, height_maps, metallic)
+                )
+                seam_report['after'] = {
+                    name: seam_scores(images[0])
+                    for name, images in zip(data_maps, (diffuse, roughness, height_maps, metallic))
+                }
+            t = lap(timings, 'seams', t)
+
+        if udim_tiles:
+            # Blend heights before deriving normals so the normals match too
+            diffuse, roughness, height_maps, metallic = (
+                blend_udim_seams(images, udim_tiles) for images in (diffuse, roughness, height_maps, metallic)
+            )
+            t = lap(timings, 'udim_blend', t)
+        normal = [height_to_normal(height_map, strength=3.0, wrap=wrap) for height_map in height_maps]
+        t = lap(timings, 'normals', t)
+
+        if atlas_prompts is not None:
+            # Normals come from each region's own heights, so borders stay clean
+            diffuse, roughness, height_maps, metallic, normal = (
+                [compose_atlas(images, resolution, atlas_grid, atlas_padding)]
+                for images in (diffuse, roughness, height_maps, metallic, normal)
+            )
+            t = lap(timings, 'atlas', t)
+
+        maps = {'diffuse': diffuse, 'normal': normal}
+        encode_options = {}
+        if packing == 'orm':
+            maps['orm'] = [pack_orm(*channels) for channels in zip(height_maps, roughness, metallic)]
+            # No chroma subsampling: neighbouring pixels' channels must not bleed
+            encode_options['orm'] = {'quality': 95, 'subsampling': 0}
+        else:
+            maps['roughness'] = roughness
+            maps['metallic'] = metallic
+
+        # Uniform maps (e.g. metallic on non-metals) travel as values, not images;
+        # with UDIMs only when every tile has the same value.
+        # Tile images are sent as '<map>.<tile>' (e.g. 'diffuse.1002').
+        response = {'constants': {}}
+        handoff_folder = None
+        if local_handoff:
+            sweep_handoffs()
+            handoff_folder = os.path.join(HANDOFF_DIR, job_id)
+            os.makedirs(handoff_folder, exist_ok=True)
+        for name, images in maps.items():
+            values = [uniform_value(img) for img in images]
+            if all(value is not None for value in values) and np.ptp(values, axis=0).max() <= UNIFORM_RANGE:
+                response['constants'][name] = [round(float(v), 4) for v in np.mean(values, axis=0)]
+                continue
+            for tile, img in zip(tiles, images):
+                key = name if tile is None else f"{name}.{tile}"
+                if handoff_folder:
+                    response[key] = write_handoff(handoff_folder, key, img)
+                else:
+                    response[key] = image_to_base64(img, **encode_options.get(name, {}))
+        lap(timings, 'encode', t)
+        response.update({
+            'udim_tiles': udim_tiles,
+            'seam_scores': seam_report,
+            'seed': seed,
+            'packing': packing,
+            'transport': 'local' if handoff_folder else 'http',
+            'profile': profile,
+            'model': data.get('model', DEFAULT_MODEL),
+            'upscale': upscale if sample_size != generation_size else 'off',
             'prompt': prompt,
             'resolution': resolution,
-            'tileable': tileable
-        }
+            'tileable': tileable,
+            'job_id': job_id,
+            'trace_id': trace_id,
+            'timings': timings,
+        })
 
-        print("✅ Textures generated successfully")
-        return jsonify(response)
+        body = json.dumps(response).encode()
+        store_result(job_id, body)
+        breakdown = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in timings.items())
+        print(f"✅ [trace {trace_id[:8]}] Textures generated successfully ({breakdown})")
+        return Response(body, mimetype='application/json')
 
     except Exception as e:
         error_msg = str(e)
@@ -210,9 +1066,44 @@ def generate_textures():
              return jsonify({'error': 'CUDA Out of Memory. Try a smaller resolution (e.g., 512).'}), 507
         return jsonify({'error': error_msg}), 500
 
+@app.route('/result/<job_id>', methods=['GET'])
+def get_result(job_id):
+    """Return a finished result; honours 'Range: bytes=N-' so downloads can resume."""
+    with results_lock:
+        body = results.get(job_id)
+        pending = job_id in pending_jobs
+    if body is None:
+        if pending:
+            return jsonify({'status': 'pending'}), 202
+        return jsonify({'error': 'Unknown or expired job id'}), 404
+
+    match = re.match(r'bytes=(\d+)-', request.headers.get('Range', ''))
+    if match and int(match.group(1)) < len(body):
+        start = int(match.group(1))
+        partial = Response(body[start:], status=206, mimetype='application/json')
+        partial.headers['Content-Range'] = f'bytes {start}-{len(body) - 1}/{len(body)}'
+        return partial
+    return Response(body, mimetype='application/json')
+
+def memory_stats():
+    """Process RAM and GPU memory in MB (None where unavailable)"""
+    return {
+        'rss_mb': round(psutil.Process().memory_info().rss / 1024**2, 1) if psutil else None,
+        'gpu_mb': round(torch.cuda.memory_allocated() / 1024**2, 1) if device == "cuda" else None,
+    }
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'ok', 'device': device})
+    return jsonify({
+        'status': 'ok',
+        'device': device,
+        'queue_depth': active_requests,
+        'admission': admission.status(),
+        'profiles': list(PROFILE_NAMES),
+        'models': list(MODEL_REGISTRY),
+        'loaded_models': models.status(),
+        'memory': memory_stats(),
+    })
 
 print("✅ Flask app created")
 
@@ -221,16 +1112,26 @@ print("✅ Flask app created")
 # WARNING: Exposing your auth token publicly is a security risk.
 NGROK_AUTH_TOKEN = "enter your token "
 
-try:
-    ngrok.set_auth_token(NGROK_AUTH_TOKEN)
-    public_url = ngrok.connect(5000)
-    print(f"\n{'='*60}\n🌐 PUBLIC URL (copy this to Blender addon):\n{'='*60}\n{public_url}\n{'='*60}\n")
-except Exception as e:
-    print(f"❌ Ngrok setup failed. Ensure your auth token is correct and Ngrok is not blocked: {e}")
-    public_url = "N/A" # Set to N/A if ngrok fails
+# Load tests and local-handoff servers are reachable from this machine only
+LOCAL_ONLY = LOAD_TEST or LOCAL_HANDOFF
+
+if LOAD_TEST:
+    print("🧪 Load test mode: no tunnel, serving http://127.0.0.1:5000 with the tiny model")
+    public_url = "N/A"
+elif LOCAL_HANDOFF:
+    print("🏠 Local mode: no tunnel, serving http://127.0.0.1:5000 with raw pixel handoff")
+    public_url = "N/A"
+else:
+    try:
+        ngrok.set_auth_token(NGROK_AUTH_TOKEN)
+        public_url = ngrok.connect(5000)
+        print(f"\n{'='*60}\n🌐 PUBLIC URL (copy this to Blender addon):\n{'='*60}\n{public_url}\n{'='*60}\n")
+    except Exception as e:
+        print(f"❌ Ngrok setup failed. Ensure your auth token is correct and Ngrok is not blocked: {e}")
+        public_url = "N/A" # Set to N/A if ngrok fails
 
 def run_flask():
-    app.run(host='0.0.0.0', port=5000, threaded=True, use_reloader=False)
+    app.run(host='127.0.0.1' if LOCAL_ONLY else '0.0.0.0', port=5000, threaded=True, use_reloader=False)
 
 flask_thread = threading.Thread(target=run_flask)
 flask_thread.daemon = True
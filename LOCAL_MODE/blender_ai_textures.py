@@ -13,92 +13,1116 @@ bl_info = {
 }
 
 import bpy
-from bpy.props import StringProperty, EnumProperty, BoolProperty, FloatProperty, PointerProperty
-from bpy.types import Panel, Operator, PropertyGroup
+from bpy.app.handlers import persistent
+from bpy.props import (
+    StringProperty, EnumProperty, BoolProperty, FloatProperty, IntProperty, PointerProperty,
+    CollectionProperty,
+)
+from bpy.types import Panel, Operator, PropertyGroup, UIList
 import requests
 import base64
 import io
 from PIL import Image
+import numpy as np
 import os
+import shutil
 import tempfile
 import threading
+import hashlib
 import json
+import random
+import re
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # ============================================================================
-# Helpers
+# AI Material Registry
 # ============================================================================
-def get_ai_material(props):
-    """Return the last generated material or first AI_ material."""
-    mat_name = props.last_generated_material or None
-    if mat_name:
-        mat = bpy.data.materials.get(mat_name)
-        if mat and mat.use_nodes:
-            return mat
+# Panels redraw constantly, so AI material lookups must not scan
+# bpy.data.materials. The registry is built once and dropped on undo/redo,
+# file load and when materials are added or removed; a removed datablock
+# also forces a rebuild. Node edits and slider drags keep it.
+_material_registry = None
+
+
+def is_ai_material(mat):
+    """True for materials created by this addon (tagged, or named AI_ by older versions)."""
+    return mat.get("aitex_generation_id") is not None or mat.name.startswith("AI_")
+
+
+@persistent
+def invalidate_material_registry(*args):
+    """undo/redo/load handler: drop the cached AI material lookups."""
+    global _material_registry
+    _material_registry = None
+
+
+@persistent
+def on_material_depsgraph_update(scene, depsgraph):
+    """depsgraph_update_post handler: drop cached lookups when materials are added or removed."""
+    if _material_registry is not None and _material_registry["count"] != len(bpy.data.materials):
+        invalidate_material_registry()
+
+
+def _get_material_registry():
+    global _material_registry
+    registry = _material_registry
+    if registry is not None and registry["count"] == len(bpy.data.materials):
+        try:
+            # Touch one cached datablock: raises if undo freed them
+            for mat in registry["by_name"].values():
+                mat.name
+                break
+            return registry
+        except ReferenceError:
+            pass
+
+    by_name = {}
+    by_generation = {}
     for mat in bpy.data.materials:
-        if mat.use_nodes and mat.name.startswith("AI_"):
+        if mat.use_nodes and is_ai_material(mat):
+            by_name[mat.name] = mat
+            generation_id = mat.get("aitex_generation_id")
+            if generation_id is not None:
+                by_generation[generation_id] = mat
+    _material_registry = registry = {
+        "count": len(bpy.data.materials),
+        "by_name": by_name,
+        "by_generation": by_generation,
+    }
+    return registry
+
+
+def get_registered_ai_materials():
+    """Return every AI material in the file."""
+    return list(_get_material_registry()["by_name"].values())
+
+
+def find_ai_material(name=None, generation_id=None):
+    """Look up an AI material by name or generation id."""
+    registry = _get_material_registry()
+    if generation_id is not None:
+        return registry["by_generation"].get(generation_id)
+    mat = registry["by_name"].get(name)
+    if mat is not None and mat.name != name:
+        # Renamed since the registry was built
+        invalidate_material_registry()
+        mat = _get_material_registry()["by_name"].get(name)
+    return mat
+
+
+def get_object_ai_material(obj):
+    """Return the first AI material in an object's material slots, or None."""
+    if obj is None:
+        return None
+    for slot in obj.material_slots:
+        mat = slot.material
+        if mat is not None and mat.use_nodes and is_ai_material(mat):
             return mat
     return None
 
 
+# ============================================================================
+# Helpers
+# ============================================================================
+def get_ai_material(props, obj=None):
+    """Return obj's AI material, else the last generated one, else the first AI material."""
+    mat = get_object_ai_material(obj)
+    if mat is not None:
+        return mat
+    if props.last_generated_material:
+        mat = find_ai_material(props.last_generated_material)
+        if mat is not None:
+            return mat
+    return next(iter(_get_material_registry()["by_name"].values()), None)
+
+
+def get_ai_materials(context, scope):
+    """Return AI materials for a scope: 'LAST', 'SELECTED' objects or 'ALL'."""
+    props = context.scene.ai_texture_props
+    if scope == 'LAST':
+        mat = get_ai_material(props)
+        return [mat] if mat else []
+
+    if scope == 'SELECTED':
+        materials = []
+        for obj in context.selected_objects:
+            for slot in obj.material_slots:
+                mat = slot.material
+                if mat and mat not in materials and mat.use_nodes and is_ai_material(mat):
+                    materials.append(mat)
+        return materials
+    return get_registered_ai_materials()
+
+
+# ============================================================================
+# Shared Node Groups
+# ============================================================================
+# Generated materials are built from two cached node groups shared by every
+# AI material: "AI PBR Mapping" (UV -> Mapping, Scale exposed as one socket)
+# and "AI PBR" (normal map, optional height bump and Principled BSDF).
+# A material only holds its image nodes plus one instance of each group.
+# Texture images can't be group parameters, so the two are separate nodes.
+PBR_GROUP_NAME = "AI PBR"
+MAPPING_GROUP_NAME = "AI PBR Mapping"
+
+# Map type -> "AI PBR" group input it feeds
+PBR_MAP_INPUTS = {
+    'diffuse': "Base Color",
+    'roughness': "Roughness",
+    'metallic': "Metallic",
+    'normal': "Normal Color",
+}
+
+# Channel-packed map type -> {Separate Color output: "AI PBR" group input}.
+# Red of the ORM map carries the height for game engines; in Blender the
+# bump keeps using the diffuse luminance, so it is left unwired.
+PACKED_MAP_INPUTS = {
+    'orm': {"Green": "Roughness", "Blue": "Metallic"},
+}
+
+MAP_TYPES = tuple(PBR_MAP_INPUTS) + tuple(PACKED_MAP_INPUTS)
+
+
+def _new_group_socket(group, name, in_out, socket_type, default=None, min_value=None, max_value=None):
+    socket = group.interface.new_socket(name, in_out=in_out, socket_type=socket_type)
+    if default is not None:
+        socket.default_value = default
+    if min_value is not None:
+        socket.min_value = min_value
+    if max_value is not None:
+        socket.max_value = max_value
+    return socket
+
+
+def get_mapping_node_group():
+    """Return the shared mapping node group, building it on first use."""
+    group = bpy.data.node_groups.get(MAPPING_GROUP_NAME)
+    if group is not None:
+        return group
+
+    group = bpy.data.node_groups.new(MAPPING_GROUP_NAME, 'ShaderNodeTree')
+    _new_group_socket(group, "Scale", 'INPUT', 'NodeSocketVector', default=(1.0, 1.0, 1.0))
+    _new_group_socket(group, "Vector", 'OUTPUT', 'NodeSocketVector')
+
+    nodes = group.nodes
+    links = group.links
+    group_in = nodes.new('NodeGroupInput')
+    group_in.location = (-400, -150)
+    group_out = nodes.new('NodeGroupOutput')
+    group_out.location = (200, 0)
+    texcoord = nodes.new('ShaderNodeTexCoord')
+    texcoord.location = (-400, 100)
+    mapping = nodes.new('ShaderNodeMapping')
+    mapping.location = (-100, 0)
+
+    links.new(texcoord.outputs["UV"], mapping.inputs["Vector"])
+    links.new(group_in.outputs["Scale"], mapping.inputs["Scale"])
+    links.new(mapping.outputs["Vector"], group_out.inputs["Vector"])
+    return group
+
+
+def get_pbr_node_group():
+    """Return the shared PBR shading node group, building it on first use."""
+    group = bpy.data.node_groups.get(PBR_GROUP_NAME)
+    if group is not None:
+        return group
+
+    group = bpy.data.node_groups.new(PBR_GROUP_NAME, 'ShaderNodeTree')
+    _new_group_socket(group, "Base Color", 'INPUT', 'NodeSocketColor', default=(0.8, 0.8, 0.8, 1.0))
+    _new_group_socket(group, "Roughness", 'INPUT', 'NodeSocketFloat', default=0.5, min_value=0.0, max_value=1.0)
+    _new_group_socket(group, "Metallic", 'INPUT', 'NodeSocketFloat', default=0.0, min_value=0.0, max_value=1.0)
+    _new_group_socket(group, "Normal Color", 'INPUT', 'NodeSocketColor', default=(0.5, 0.5, 1.0, 1.0))
+    _new_group_socket(group, "Normal Strength", 'INPUT', 'NodeSocketFloat', default=1.5, min_value=0.0)
+    _new_group_socket(group, "Height Strength", 'INPUT', 'NodeSocketFloat', default=0.0, min_value=0.0)
+    _new_group_socket(group, "BSDF", 'OUTPUT', 'NodeSocketShader')
+
+    nodes = group.nodes
+    links = group.links
+    group_in = nodes.new('NodeGroupInput')
+    group_in.location = (-800, 0)
+    group_out = nodes.new('NodeGroupOutput')
+    group_out.location = (400, 0)
+
+    normal_map = nodes.new('ShaderNodeNormalMap')
+    normal_map.location = (-500, -300)
+    links.new(group_in.outputs["Normal Color"], normal_map.inputs["Color"])
+    links.new(group_in.outputs["Normal Strength"], normal_map.inputs["Strength"])
+
+    # Height/bump boost from the diffuse luminance (Strength 0 = passthrough)
+    rgb2bw = nodes.new('ShaderNodeRGBToBW')
+    rgb2bw.location = (-500, -150)
+    links.new(group_in.outputs["Base Color"], rgb2bw.inputs["Color"])
+    bump = nodes.new('ShaderNodeBump')
+    bump.location = (-250, -250)
+    links.new(rgb2bw.outputs["Val"], bump.inputs["Height"])
+    links.new(group_in.outputs["Height Strength"], bump.inputs["Strength"])
+    links.new(normal_map.outputs["Normal"], bump.inputs["Normal"])
+
+    bsdf = nodes.new('ShaderNodeBsdfPrincipled')
+    bsdf.location = (0, 0)
+    links.new(group_in.outputs["Base Color"], bsdf.inputs["Base Color"])
+    links.new(group_in.outputs["Roughness"], bsdf.inputs["Roughness"])
+    links.new(group_in.outputs["Metallic"], bsdf.inputs["Metallic"])
+    links.new(bump.outputs["Normal"], bsdf.inputs["Normal"])
+    links.new(bsdf.outputs["BSDF"], group_out.inputs["BSDF"])
+    return group
+
+
 def ensure_mapping_setup(mat):
-    """Ensure texture coordinate + mapping nodes exist and feed all image nodes."""
+    """Return the material's AI mapping node, adding the shared mapping group if missing.
+
+    Image nodes are only wired when the mapping node is created, so calling
+    this on every scale change is a single node lookup.
+    """
     nodes = mat.node_tree.nodes
+    mapping = nodes.get("AITEX_MAPPING")
+    if mapping is not None:
+        return mapping
+
+    mapping = nodes.new('ShaderNodeGroup')
+    mapping.node_tree = get_mapping_node_group()
+    mapping.name = "AITEX_MAPPING"
+    mapping.label = "AI Mapping"
+    mapping.location = (-700, 200)
+
     links = mat.node_tree.links
+    for node in nodes:
+        if node.type == "TEX_IMAGE" and node.inputs.get("Vector"):
+            for lnk in list(node.inputs["Vector"].links):
+                links.remove(lnk)
+            links.new(mapping.outputs["Vector"], node.inputs["Vector"])
+    return mapping
 
-    mapping = nodes.get("AITEX_MAPPING")
-    texcoord = nodes.get("AITEX_TEXCOORD")
 
-    if texcoord is None:
-        texcoord = nodes.new("ShaderNodeTexCoord")
-        texcoord.name = "AITEX_TEXCOORD"
-        texcoord.label = "AI Texture Coord"
-        texcoord.location = (-900, 200)
+def ensure_pbr_setup(mat):
+    """Return the material's "AI PBR" group node, rebuilding the tree around it if missing."""
+    nodes = mat.node_tree.nodes
+    pbr = nodes.get("AITEX_PBR")
+    if pbr is not None:
+        return pbr
 
-    if mapping is None:
-        mapping = nodes.new("ShaderNodeMapping")
-        mapping.name = "AITEX_MAPPING"
-        mapping.label = "AI Mapping"
-        mapping.location = (-700, 200)
+    nodes.clear()
+    output = nodes.new('ShaderNodeOutputMaterial')
+    output.location = (300, 0)
+    pbr = nodes.new('ShaderNodeGroup')
+    pbr.node_tree = get_pbr_node_group()
+    pbr.name = "AITEX_PBR"
+    pbr.label = "AI PBR"
+    pbr.location = (0, 0)
+    mat.node_tree.links.new(pbr.outputs["BSDF"], output.inputs["Surface"])
+    return pbr
 
-    # Ensure UV -> Mapping
-    if not mapping.inputs["Vector"].links:
-        links.new(texcoord.outputs.get("UV") or texcoord.outputs[0], mapping.inputs["Vector"])
 
-    # Feed all texture nodes from mapping
-    for node in nodes:
-        if node.type == "TEX_IMAGE":
-            if node.inputs.get("Vector"):
-                # Remove existing links to Vector to keep things consistent
-                for lnk in list(node.inputs["Vector"].links):
-                    links.remove(lnk)
-                links.new(mapping.outputs["Vector"], node.inputs["Vector"])
+def ensure_texture_node(mat, tex_type):
+    """Return the image node for a map type, creating and wiring it if missing."""
+    nodes = mat.node_tree.nodes
+    tex_node = nodes.get(f"AITEX_TEX_{tex_type}")
+    if tex_node is not None:
+        return tex_node
 
-    return mapping
+    links = mat.node_tree.links
+    pbr = nodes["AITEX_PBR"]
+    tex_node = nodes.new('ShaderNodeTexImage')
+    tex_node.name = f"AITEX_TEX_{tex_type}"
+    tex_node.location = (-500, -300 * MAP_TYPES.index(tex_type))
+    links.new(ensure_mapping_setup(mat).outputs["Vector"], tex_node.inputs["Vector"])
+
+    if tex_type in PACKED_MAP_INPUTS:
+        # One image feeds several inputs through its channels
+        separate = nodes.new('ShaderNodeSeparateColor')
+        separate.name = f"AITEX_SEP_{tex_type}"
+        separate.location = (-200, tex_node.location.y)
+        links.new(tex_node.outputs["Color"], separate.inputs["Color"])
+        for channel, group_input in PACKED_MAP_INPUTS[tex_type].items():
+            links.new(separate.outputs[channel], pbr.inputs[group_input])
+    else:
+        links.new(tex_node.outputs["Color"], pbr.inputs[PBR_MAP_INPUTS[tex_type]])
+    return tex_node
+
+
+def remove_texture_node(mat, tex_type):
+    """Remove the image node (and channel splitter) of a map type the material no longer uses."""
+    nodes = mat.node_tree.nodes
+    for node_name in (f"AITEX_TEX_{tex_type}", f"AITEX_SEP_{tex_type}"):
+        node = nodes.get(node_name)
+        if node is not None:
+            nodes.remove(node)
+
+
+def srgb_to_linear(value):
+    """Convert one sRGB-encoded channel value (0-1) to linear."""
+    if value <= 0.04045:
+        return value / 12.92
+    return ((value + 0.055) / 1.055) ** 2.4
+
+
+def set_constant_map(pbr, tex_type, value):
+    """Feed a uniform map to the "AI PBR" group as plain input values.
+
+    value holds the map's per-channel means [r, g, b] as sent by the backend.
+    """
+    if tex_type in PACKED_MAP_INPUTS:
+        for channel, group_input in PACKED_MAP_INPUTS[tex_type].items():
+            pbr.inputs[group_input].default_value = value[("Red", "Green", "Blue").index(channel)]
+        return
+    socket = pbr.inputs[PBR_MAP_INPUTS[tex_type]]
+    if socket.type == 'RGBA':
+        # Base color is sRGB encoded; socket values are linear
+        if tex_type == 'diffuse':
+            value = [srgb_to_linear(v) for v in value]
+        socket.default_value = (value[0], value[1], value[2], 1.0)
+    else:
+        socket.default_value = sum(value) / len(value)
+
+
+def is_atlas_material(mat):
+    """True for a shared atlas material, whose regions are placed by UVs."""
+    return mat is not None and mat.get("aitex_prompt") == ATLAS_PROMPT
 
 
 def apply_mapping_scale(props, mat=None):
-    """Apply mapping scale properties to the mapping node on a material."""
+    """Apply mapping scale properties to the mapping node on a material.
+
+    Atlas materials are skipped: their mapping node is shared by every
+    object in the atlas, and scaling it would move them all off their regions.
+    """
     if mat is None:
         mat = get_ai_material(props)
-    if not mat or not mat.use_nodes:
+    if not mat or not mat.use_nodes or is_atlas_material(mat):
         return
     mapping = ensure_mapping_setup(mat)
-    mapping.inputs["Scale"].default_value[0] = props.map_scale_x
-    mapping.inputs["Scale"].default_value[1] = props.map_scale_y
-    mapping.inputs["Scale"].default_value[2] = props.map_scale_z
+    mapping.inputs["Scale"].default_value = (props.map_scale_x, props.map_scale_y, props.map_scale_z)
+
+
+def update_backend_pool(self, context):
+    """Update callback: re-point the backend pool at the configured URLs."""
+    _backend_pool.configure(get_backend_urls(self))
 
 
 def update_mapping_scale(self, context):
     """Update callback when mapping scale changes."""
     props = context.scene.ai_texture_props
-    mat = get_ai_material(props)
+    mat = get_ai_material(props, context.object)
     if mat:
         apply_mapping_scale(props, mat)
 
 
+# ============================================================================
+# Pixel Ingestion
+# ============================================================================
+def image_to_pixels(img):
+    """Decode a PIL image into (width, height, flat float32 RGBA pixels).
+
+    Rows are flipped to Blender's bottom-up order so the buffer can go straight
+    into Image.pixels.foreach_set. Meant to run on the generation thread.
+    """
+    rgba = np.asarray(img.convert("RGBA"))[::-1]
+    pixels = np.multiply(rgba, np.float32(1.0 / 255.0), dtype=np.float32)
+    return img.width, img.height, pixels.ravel()
+
+
+def pixels_to_image(width, height, pixels):
+    """Inverse of image_to_pixels: an RGB PIL image from a flat float32 RGBA buffer."""
+    rgba = np.asarray(pixels).reshape(height, width, 4)[::-1, :, :3]
+    return Image.fromarray(np.round(rgba * 255.0).astype(np.uint8), "RGB")
+
+
+def load_pixel_textures(paths):
+    """Decode library PNGs ({map type: path}) into pixel buffers."""
+    textures = {}
+    for tex_type, path in paths.items():
+        with Image.open(path) as img:
+            textures[tex_type] = image_to_pixels(img)
+    return textures
+
+
+def create_image_from_pixels(name, width, height, pixels, is_data=False):
+    """Create (or replace) a Blender image filled from a float32 RGBA buffer.
+
+    No temp file and no PNG round trip: the image lives in memory and is
+    packed into the .blend on save (see pack_ai_images).
+    """
+    old_img = bpy.data.images.get(name)
+    if old_img is not None:
+        bpy.data.images.remove(old_img)
+    img = bpy.data.images.new(name, width, height, alpha=False, is_data=is_data)
+    img.pixels.foreach_set(pixels)
+    img.update()
+    return img
+
+
+def read_image_pixels(img):
+    """Return a Blender image's pixels as a flat float32 RGBA buffer."""
+    width, height = img.size
+    pixels = np.empty(width * height * img.channels, dtype=np.float32)
+    img.pixels.foreach_get(pixels)
+    if img.channels != 4:
+        # Expand to RGBA so every caller can assume 4 channels
+        channels = pixels.reshape(-1, img.channels)
+        rgba = np.ones((channels.shape[0], 4), dtype=np.float32)
+        if img.channels >= 3:
+            rgba[:, :3] = channels[:, :3]
+        else:
+            # Grayscale (+ alpha)
+            rgba[:, :3] = channels[:, :1]
+            if img.channels == 2:
+                rgba[:, 3] = channels[:, 1]
+        pixels = rgba.ravel()
+    return pixels
+
+
+def resize_pixels(pixels, width, height, new_width, new_height, resample=Image.LANCZOS):
+    """Resample a flat float32 RGBA buffer in memory.
+
+    Each channel is resized as a 32-bit float PIL image, so precision is kept
+    and the filtering runs in C rather than a per-pixel Python loop.
+    """
+    rgba = pixels.reshape(height, width, 4)
+    resized = np.empty((new_height, new_width, 4), dtype=np.float32)
+    for c in range(4):
+        channel = Image.fromarray(np.ascontiguousarray(rgba[:, :, c]))
+        resized[:, :, c] = np.asarray(channel.resize((new_width, new_height), resample))
+    return resized.ravel()
+
+
+# ============================================================================
+# UDIM Tiles
+# ============================================================================
+# A UDIM request generates one map set per UV tile the target mesh uses.
+# Tile maps are keyed '<map type>.<tile>' (e.g. 'diffuse.1002') by the
+# backend and the texture library, which also makes the library PNGs follow
+# Blender's '<name>.<UDIM>.png' naming.
+
+
+def get_udim_tiles(obj):
+    """Return the sorted UDIM tile numbers covered by a mesh's active UV map."""
+    if obj is None or obj.type != 'MESH':
+        return []
+    mesh = obj.data
+    uv_layer = mesh.uv_layers.active
+    if uv_layer is None or not mesh.polygons:
+        return []
+
+    uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+    uv_layer.data.foreach_get("uv", uvs)
+    starts = np.empty(len(mesh.polygons), dtype=np.int64)
+    totals = np.empty(len(mesh.polygons), dtype=np.int64)
+    mesh.polygons.foreach_get("loop_start", starts)
+    mesh.polygons.foreach_get("loop_total", totals)
+
+    # Face centres, so UVs lying exactly on a tile border don't count the next tile
+    centers = np.add.reduceat(uvs.reshape(-1, 2), starts, axis=0) / totals[:, None]
+    u = np.floor(centers[:, 0]).astype(np.int64)
+    v = np.floor(centers[:, 1]).astype(np.int64)
+    valid = (u >= 0) & (u < 10) & (v >= 0) & (v < 10)
+    return [int(tile) for tile in np.unique(1001 + u[valid] + 10 * v[valid])]
+
+
+def split_udim_maps(maps):
+    """Split {map key: value} into plain maps and {map type: {tile: value}} for tile keys."""
+    plain = {}
+    tiled = {}
+    for key, value in maps.items():
+        tex_type, _, tile = key.partition(".")
+        if tile.isdigit():
+            tiled.setdefault(tex_type, {})[int(tile)] = value
+        else:
+            plain[key] = value
+    return plain, tiled
+
+
+def load_library_textures(paths):
+    """Decode a library entry's maps ({map key: PNG path}) into (textures, lods).
+
+    UDIM tiles stay as {tile: PNG path}; Blender reads those files itself.
+    """
+    paths, tiled = split_udim_maps(paths)
+    textures = load_pixel_textures(paths)
+    lods = build_lod_chains(textures)
+    textures.update(tiled)
+    return textures, lods
+
+
+def iter_udim_image(img_name, tile_paths, is_data=False):
+    """Load tile PNGs ({tile: path}) as one tiled Blender image, packed into the .blend.
+
+    Generator like iter_texture_images. Blender has no per-tile pixel
+    access, so the tiles are read from the library files.
+    """
+    old_img = bpy.data.images.get(img_name)
+    if old_img is not None:
+        bpy.data.images.remove(old_img)
+    tiles = sorted(tile_paths)
+    img = bpy.data.images.load(tile_paths[tiles[0]], check_existing=False)
+    img.name = img_name
+    # Switching to tiled detects the sibling '<name>.<tile>.png' files
+    img.source = 'TILED'
+    for tile in tiles:
+        if img.tiles.get(tile) is None:
+            img.tiles.new(tile_number=tile)
+    img.colorspace_settings.is_data = is_data
+    yield
+
+    # The library may evict the files later; keep the pixels with the .blend
+    img.pack()
+    yield
+    return img
+
+
+# ============================================================================
+# Texture Atlas
+# ============================================================================
+# Atlas mode packs the maps of many small objects into one shared material.
+# Region i sits at row i // grid, column i % grid of a grid x grid layout
+# (rows from the top of the image); the backend fills each cell minus
+# padding and repeats the region's edge pixels into the padding.
+ATLAS_PROMPT = "Atlas"
+ATLAS_UV_NAME = "AI Atlas"
+ATLAS_MAX_REGIONS = 64
+
+
+def atlas_grid(count):
+    """Return the number of rows/columns of a square atlas holding count regions."""
+    return max(1, int(np.ceil(np.sqrt(count))))
+
+
+def atlas_region_uv(index, grid, resolution, padding):
+    """Return the (u0, v0, u1, v1) UV rectangle of an atlas region, padding excluded."""
+    cell = resolution // grid
+    row, col = divmod(index, grid)
+    u0 = (col * cell + padding) / resolution
+    u1 = ((col + 1) * cell - padding) / resolution
+    # Image rows run top-down, V runs bottom-up
+    v1 = 1.0 - (row * cell + padding) / resolution
+    v0 = 1.0 - ((row + 1) * cell - padding) / resolution
+    return u0, v0, u1, v1
+
+
+def repack_uvs_to_region(obj, rect, slot_index=None):
+    """Fit an object's UVs into an atlas region on a separate "AI Atlas" UV map.
+
+    The original UV map is kept; the atlas map is a copy made active for
+    display and render. With slot_index only the faces of that material
+    slot are moved. Aspect ratio is preserved. Returns False if the mesh
+    has no UVs or no free UV map slot.
+    """
+    mesh = obj.data
+    layer = mesh.uv_layers.get(ATLAS_UV_NAME)
+    if layer is None:
+        if mesh.uv_layers.active is None:
+            return False
+        # do_init copies the active UV map
+        layer = mesh.uv_layers.new(name=ATLAS_UV_NAME, do_init=True)
+        if layer is None:
+            return False
+
+    uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+    layer.data.foreach_get("uv", uvs)
+    uvs = uvs.reshape(-1, 2)
+
+    mask = np.ones(len(uvs), dtype=bool)
+    if slot_index is not None and len(obj.material_slots) > 1:
+        material_indices = np.empty(len(mesh.polygons), dtype=np.int32)
+        totals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("material_index", material_indices)
+        mesh.polygons.foreach_get("loop_total", totals)
+        mask = np.repeat(material_indices == slot_index, totals)
+    if not mask.any():
+        return True
+
+    selected = uvs[mask]
+    low = selected.min(axis=0)
+    extent = float((selected.max(axis=0) - low).max()) or 1.0
+    u0, v0, u1, v1 = rect
+    uvs[mask] = np.array([u0, v0], dtype=np.float32) + (selected - low) / extent * (u1 - u0)
+
+    layer.data.foreach_set("uv", uvs.ravel())
+    mesh.uv_layers.active = layer
+    layer.active_render = True
+    mesh.update()
+    return True
+
+
+# ============================================================================
+# Texture LODs
+# ============================================================================
+# Every generated map is kept as a full-resolution master image plus a chain of
+# smaller levels named "<master>@<size>". Switching resolution only repoints
+# image nodes at another level; resampling happens once, from the master.
+LOD_SIZES = (256, 512, 1024, 2048, 4096, 8192)
+LOD_MIN_SIZE = 256
+
+_render_lod_restore = {}  # material name -> {node name: image name}
+
+
+def downsample_half(width, height, pixels):
+    """Halve a flat float32 RGBA buffer with a vectorized 2x2 box filter."""
+    half_w, half_h = width // 2, height // 2
+    rgba = pixels.reshape(height, width, 4)[:half_h * 2, :half_w * 2]
+    half = rgba.reshape(half_h, 2, half_w, 2, 4).mean(axis=(1, 3), dtype=np.float32)
+    return half_w, half_h, half.ravel()
+
+
+def build_lod_chains(textures):
+    """Return {map type: [(width, height, pixels), ...]} of halved levels per map."""
+    lods = {}
+    for tex_type, (width, height, pixels) in textures.items():
+        chain = []
+        while width // 2 >= LOD_MIN_SIZE and height // 2 >= LOD_MIN_SIZE:
+            width, height, pixels = downsample_half(width, height, pixels)
+            chain.append((width, height, pixels))
+        lods[tex_type] = chain
+    return lods
+
+
+def get_lod_image(master_name, size):
+    """Return the smallest level of a LOD chain that covers size (or the largest level)."""
+    master = bpy.data.images.get(master_name)
+    if master is None:
+        return None
+    levels = {master.size[0]: master}
+    for level_size in LOD_SIZES:
+        level = bpy.data.images.get(f"{master_name}@{level_size}")
+        if level is not None:
+            levels[level_size] = level
+    covering = [level_size for level_size in levels if level_size >= size]
+    return levels[min(covering)] if covering else levels[max(levels)]
+
+
+def set_material_lod(mat, size):
+    """Point every LOD-managed image node of a material at the level for size."""
+    for node in mat.node_tree.nodes:
+        if node.type != 'TEX_IMAGE' or node.image is None:
+            continue
+        master_name = node.image.get("aitex_master")
+        if not master_name:
+            continue
+        level = get_lod_image(master_name, size)
+        if level is not None and node.image != level:
+            node.image = level
+
+
+def update_viewport_lod(self, context):
+    """Update callback: switch AI materials to the LOD for the chosen resolution."""
+    props = context.scene.ai_texture_props
+    for mat in get_ai_materials(context, props.resize_scope):
+        set_material_lod(mat, int(props.resize_resolution))
+
+
+@persistent
+def use_render_lods(scene, *args):
+    """render_pre handler: render AI materials from their full-resolution level."""
+    props = getattr(scene, "ai_texture_props", None)
+    if props is None or not props.render_full_resolution:
+        return
+    _render_lod_restore.clear()
+    for mat in get_registered_ai_materials():
+        _render_lod_restore[mat.name] = {
+            node.name: node.image.name
+            for node in mat.node_tree.nodes
+            if node.type == 'TEX_IMAGE' and node.image and node.image.get("aitex_master")
+        }
+        set_material_lod(mat, LOD_SIZES[-1] * 2)
+
+
+@persistent
+def restore_viewport_lods(scene, *args):
+    """render_post/render_cancel handler: put the viewport levels back."""
+    for mat_name, node_images in _render_lod_restore.items():
+        mat = bpy.data.materials.get(mat_name)
+        if mat is None or not mat.use_nodes:
+            continue
+        for node_name, img_name in node_images.items():
+            node = mat.node_tree.nodes.get(node_name)
+            img = bpy.data.images.get(img_name)
+            if node is not None and img is not None:
+                node.image = img
+    _render_lod_restore.clear()
+
+
+def is_lod_level(img):
+    """True for a LOD level smaller than its master (rebuilt on load, never packed)."""
+    master = bpy.data.images.get(img.get("aitex_master") or "")
+    return master is not None and master != img and img.size[0] < master.size[0]
+
+
+@persistent
+def pack_ai_images(*args):
+    """save_pre handler: pack in-memory AI images so they are stored in the .blend.
+
+    Downsampled LOD levels are left out; rebuild_lod_levels refills them from
+    the packed master on load. Upscaled levels have no cheap source and are packed.
+    """
+    for img in bpy.data.images:
+        if img.name.startswith("AI_") and img.packed_file is None and img.is_dirty and not is_lod_level(img):
+            img.pack()
+
+
+def iter_rebuild_lod_levels():
+    """Refill every unpacked LOD level from its master, one master per step."""
+    for master in list(bpy.data.images):
+        if master.get("aitex_master") != master.name or master.packed_file is None:
+            continue
+        width, height = master.size
+        chain = build_lod_chains({"master": (width, height, read_image_pixels(master))})["master"]
+        for level_width, level_height, pixels in chain:
+            level = bpy.data.images.get(f"{master.name}@{level_width}")
+            if level is None or level.packed_file is not None:
+                continue
+            # Filled in place: material nodes keep pointing at the level
+            if tuple(level.size) != (level_width, level_height):
+                level.scale(level_width, level_height)
+            level.pixels.foreach_set(pixels)
+            level.update()
+        yield
+    return None
+
+
+@persistent
+def rebuild_lod_levels(*args):
+    """load_post handler: rebuild the unpacked LOD levels in time slices."""
+    def on_done(error):
+        if error is not None:
+            print(f"⚠️ Could not rebuild texture LODs: {error}")
+
+    schedule_apply(iter_rebuild_lod_levels(), on_done)
+
+
+# ============================================================================
+# Texture Library
+# ============================================================================
+LIBRARY_INDEX = "index.json"
+LIBRARY_THUMB_SIZE = 128
+
+_library_lock = threading.Lock()
+_library_index_cache = {}  # index path -> (mtime, index)
+_library_previews = None
+_library_enum_items = []  # Blender needs enum item strings kept alive
+
+# The panel draws continuously, so it must not touch the disk. It reads a
+# listing that is rebuilt only after an index write (generation, library
+# apply, clear) bumps the version, or when the library settings change.
+_libraries = {}  # (library_dir, library_max_mb, blend file) -> TextureLibrary
+_library_version = 0  # bumped by every index write in this session
+_library_view = None  # {"key", "entries", "total_bytes"} for the panel
+
+
+def get_library_dir(props):
+    """Return the texture library folder, creating it if needed."""
+    if props.library_dir:
+        root = bpy.path.abspath(props.library_dir)
+    else:
+        root = os.path.join(bpy.utils.user_resource('DATAFILES', path="ai_textures"), "library")
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def get_library(props):
+    """Return the TextureLibrary configured from the addon properties (cached)."""
+    # The blend file path is part of the key: a relative library_dir depends on it
+    key = (props.library_dir, props.library_max_mb, bpy.data.filepath)
+    library = _libraries.get(key)
+    if library is None:
+        library = TextureLibrary(get_library_dir(props), props.library_max_mb * 1024 * 1024)
+        _libraries.clear()
+        _libraries[key] = library
+    return library
+
+
+def refresh_library_view():
+    """Rebuild the panel's library listing on its next use."""
+    global _library_version
+    _library_version += 1
+
+
+def get_library_view(props):
+    """Return the cached library listing, rebuilding it only after a change."""
+    global _library_view
+    library = get_library(props)
+    key = (library.root, _library_version)
+    if _library_view is None or _library_view["key"] != key:
+        entries = library.entries()
+        _library_enum_items[:] = library_enum_items(library, entries)
+        _library_view = {
+            "key": key,
+            "entries": entries,
+            "total_bytes": sum(entry["size_bytes"] for _, entry in entries),
+        }
+    return _library_view
+
+
+class TextureLibrary:
+    """On-disk store of generated map sets, keyed on the full request parameters.
+
+    Every entry lives in its own folder with one PNG per map plus a small
+    thumbnail. index.json records sizes and last use so the library can be
+    trimmed least-recently-used first once it grows past its disk budget.
+    Safe to use from the generation thread.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, LIBRARY_INDEX)
+
+    @staticmethod
+    def make_key(params):
+        """Stable key for a request parameter dict."""
+        blob = json.dumps(params, sort_keys=True).encode("utf-8")
+        return hashlib.sha1(blob).hexdigest()
+
+    def entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def _load_index(self):
+        try:
+            mtime = os.path.getmtime(self.index_path)
+        except OSError:
+            return {}
+        cached = _library_index_cache.get(self.index_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        _library_index_cache[self.index_path] = (mtime, index)
+        return index
+
+    def _save_index(self, index):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+        _library_index_cache[self.index_path] = (os.path.getmtime(self.index_path), index)
+        refresh_library_view()
+
+    def _entry_paths(self, key, entry):
+        folder = self.entry_dir(key)
+        return {tex_type: os.path.join(folder, f"{tex_type}.png") for tex_type in entry["maps"]}
+
+    def get(self, params):
+        """Return {map type: PNG path} for a cached request, or None on a miss.
+
+        Maps stored as constants have no file; see get_constants.
+        """
+        key = self.make_key(params)
+        with _library_lock:
+            index = dict(self._load_index())
+            entry = index.get(key)
+            if entry is None:
+                return None
+            paths = self._entry_paths(key, entry)
+            if not all(os.path.exists(p) for p in paths.values()):
+                # Files were removed behind our back; forget the entry
+                index.pop(key)
+                self._save_index(index)
+                return None
+            index[key] = dict(entry, last_used=time.time())
+            self._save_index(index)
+            return paths
+
+    def get_by_key(self, key):
+        """Return (params, paths) for an index key, or (None, None)."""
+        entry = self._load_index().get(key)
+        if entry is None:
+            return None, None
+        return entry["params"], self._entry_paths(key, entry)
+
+    def get_constants(self, key):
+        """Return the {map type: [r, g, b]} uniform maps recorded for an index key."""
+        entry = self._load_index().get(key)
+        if entry is None:
+            return {}
+        return dict(entry.get("constants", {}))
+
+    def put(self, params, textures, constants=None):
+        """Store PIL images (and uniform map values) for a request and return {map type: PNG path}.
+
+        Pixel buffers ((width, height, pixels), from a local handoff) are
+        converted to images here, off the apply path.
+        """
+        textures = {
+            tex_type: pixels_to_image(*img) if isinstance(img, tuple) else img
+            for tex_type, img in textures.items()
+        }
+        key = self.make_key(params)
+        folder = self.entry_dir(key)
+        os.makedirs(folder, exist_ok=True)
+
+        paths = {}
+        size_bytes = 0
+        for tex_type, img in textures.items():
+            path = os.path.join(folder, f"{tex_type}.png")
+            img.save(path)
+            paths[tex_type] = path
+            size_bytes += os.path.getsize(path)
+
+        thumb_source = next(
+            (img for key, img in sorted(textures.items()) if key.partition(".")[0] == "diffuse"), None
+        )
+        if thumb_source is None:
+            thumb_source = next(iter(textures.values()), None)
+        if thumb_source is not None:
+            thumb = thumb_source.convert("RGB")
+            thumb.thumbnail((LIBRARY_THUMB_SIZE, LIBRARY_THUMB_SIZE))
+            thumb_path = os.path.join(folder, "thumb.png")
+            thumb.save(thumb_path)
+            size_bytes += os.path.getsize(thumb_path)
+
+        now = time.time()
+        with _library_lock:
+            index = dict(self._load_index())
+            index[key] = {
+                "params": params,
+                "maps": sorted(paths),
+                "constants": dict(constants or {}),
+                "size_bytes": size_bytes,
+                "created": now,
+                "last_used": now,
+            }
+            self._evict(index, keep=key)
+            self._save_index(index)
+        return paths
+
+    def put_in_background(self, params, textures, constants=None):
+        """put() on a daemon thread; the entry shows up once its files are written."""
+        def save():
+            try:
+                self.put(params, textures, constants)
+            except Exception as e:
+                print(f"⚠️ Could not save textures to the library: {e}")
+
+        threading.Thread(target=save, daemon=True).start()
+
+    def _evict(self, index, keep=None):
+        """Drop least recently used entries until the library fits its budget."""
+        total = sum(entry["size_bytes"] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= index.pop(key)["size_bytes"]
+            shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+
+    def entries(self):
+        """Return (key, entry) pairs, most recently used first."""
+        index = self._load_index()
+        return sorted(index.items(), key=lambda item: item[1]["last_used"], reverse=True)
+
+    def total_bytes(self):
+        return sum(entry["size_bytes"] for entry in self._load_index().values())
+
+    def clear(self):
+        with _library_lock:
+            for key in self._load_index():
+                shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+            self._save_index({})
+
+
+def library_enum_items(library, entries):
+    """Build the library browser's enum items, with thumbnails as icons."""
+    items = []
+    for i, (key, entry) in enumerate(entries):
+        icon_id = 0
+        thumb_path = os.path.join(library.entry_dir(key), "thumb.png")
+        if _library_previews is not None and os.path.exists(thumb_path):
+            preview = _library_previews.get(key) or _library_previews.load(key, thumb_path, 'IMAGE')
+            icon_id = preview.icon_id
+        params = entry["params"]
+        label = params.get("prompt", key)[:40]
+        description = f"{params.get('resolution', '?')}px, {'tileable' if params.get('tileable') else 'not tileable'}"
+        if params.get("udim_tiles"):
+            description += f", {len(params['udim_tiles'])} UDIM tiles"
+        items.append((key, label, description, icon_id, i))
+    return items
+
+
+def library_entry_items(self, context):
+    """Enum items callback for the library browser (see get_library_view)."""
+    get_library_view(context.scene.ai_texture_props)
+    return _library_enum_items
+
+
 # ============================================================================
 # Properties
 # ============================================================================
+MATERIAL_TYPE_ITEMS = [
+    ('CUSTOM', "Custom", "Use custom prompt"),
+    # Metals
+    ('METAL_RUSTED', "Rusted Metal", "Rusty worn metal surface"),
+    ('METAL_COPPER', "Copper", "Hammered copper with patina"),
+    ('METAL_BRASS', "Brass", "Polished brass surface"),
+    ('METAL_ALUMINUM', "Aluminum", "Brushed aluminum metal"),
+    ('METAL_GOLD', "Gold", "Gold metal surface"),
+    ('METAL_CHROME', "Chrome", "Shiny chrome metal"),
+    ('METAL_STEEL', "Brushed Steel", "Brushed stainless steel"),
+    ('METAL_IRON', "Cast Iron", "Rough cast iron"),
+    # Woods
+    ('WOOD_OAK', "Oak Wood", "Oak wood with grain"),
+    ('WOOD_PINE', "Pine Wood", "Pine wood planks"),
+    ('WOOD_MAHOGANY', "Mahogany", "Rich mahogany wood"),
+    ('WOOD_BAMBOO', "Bamboo", "Bamboo texture"),
+    ('WOOD_RECLAIMED', "Reclaimed Wood", "Old weathered wood"),
+    # Stones
+    ('STONE_GRANITE', "Granite", "Polished granite stone"),
+    ('STONE_MARBLE', "Marble", "White marble with veins"),
+    ('STONE_SANDSTONE', "Sandstone", "Rough sandstone blocks"),
+    ('STONE_COBBLE', "Cobblestone", "Cobblestone pavement"),
+    ('STONE_ROUGH', "Rough Stone", "Rough stone wall"),
+    # Modern/Tech
+    ('CARBON_FIBER', "Carbon Fiber", "Carbon fiber weave"),
+    ('CONCRETE', "Concrete", "Rough concrete surface"),
+    ('LEATHER', "Leather", "Worn leather texture"),
+    ('FABRIC', "Fabric", "Woven fabric texture"),
+    ('PLASTIC', "Plastic", "Smooth plastic surface"),
+    ('RUBBER', "Rubber", "Textured rubber surface"),
+]
+
+
+class AITextureBatchItem(PropertyGroup):
+    """One object/material slot in the batch generation queue"""
+
+    target_object: PointerProperty(
+        name="Object",
+        type=bpy.types.Object,
+        description="Object to texture",
+        poll=lambda self, obj: obj.type == 'MESH'
+    )
+
+    slot_index: IntProperty(
+        name="Slot",
+        description="Material slot to fill",
+        default=0,
+        min=0
+    )
+
+    material_type: EnumProperty(
+        name="Material Type",
+        description="Type of material preset",
+        items=MATERIAL_TYPE_ITEMS,
+        default='CUSTOM'
+    )
+
+    prompt: StringProperty(
+        name="Texture Prompt",
+        description="Describe the texture you want to generate",
+        default="rusty metal surface",
+        maxlen=500
+    )
+
+    status: StringProperty(
+        name="Status",
+        description="Queue status of this item",
+        default="Queued"
+    )
+
+
 class AITextureProperties(PropertyGroup):
     """Properties for AI Texture Generator"""
     
@@ -124,6 +1148,31 @@ class AITextureProperties(PropertyGroup):
         maxlen=1024
     )
     
+    backend_type: EnumProperty(
+        name="Engine",
+        description="What generates the textures",
+        items=[
+            ('AI', "AI Backend", "Stable Diffusion on the backend(s) below"),
+            ('PROCEDURAL', "Procedural (Offline)", "Instant tileable maps from built-in noise patterns, "
+                                                   "matched to the preset; no backend needed"),
+        ],
+        default='AI'
+    )
+
+    procedural_placeholder: BoolProperty(
+        name="Procedural Preview",
+        description="Apply a quick procedural version of the material while the AI job runs",
+        default=True
+    )
+
+    extra_backend_urls: StringProperty(
+        name="Additional Backends",
+        description="More backend URLs, comma-separated. Each job goes to the least-loaded healthy backend",
+        default="",
+        maxlen=4096,
+        update=update_backend_pool
+    )
+    
     resolution: EnumProperty(
         name="Resolution",
         description="Texture resolution in pixels",
@@ -140,37 +1189,7 @@ class AITextureProperties(PropertyGroup):
     material_type: EnumProperty(
         name="Material Type",
         description="Type of material preset",
-        items=[
-            ('CUSTOM', "Custom", "Use custom prompt"),
-            # Metals
-            ('METAL_RUSTED', "Rusted Metal", "Rusty worn metal surface"),
-            ('METAL_COPPER', "Copper", "Hammered copper with patina"),
-            ('METAL_BRASS', "Brass", "Polished brass surface"),
-            ('METAL_ALUMINUM', "Aluminum", "Brushed aluminum metal"),
-            ('METAL_GOLD', "Gold", "Gold metal surface"),
-            ('METAL_CHROME', "Chrome", "Shiny chrome metal"),
-            ('METAL_STEEL', "Brushed Steel", "Brushed stainless steel"),
-            ('METAL_IRON', "Cast Iron", "Rough cast iron"),
-            # Woods
-            ('WOOD_OAK', "Oak Wood", "Oak wood with grain"),
-            ('WOOD_PINE', "Pine Wood", "Pine wood planks"),
-            ('WOOD_MAHOGANY', "Mahogany", "Rich mahogany wood"),
-            ('WOOD_BAMBOO', "Bamboo", "Bamboo texture"),
-            ('WOOD_RECLAIMED', "Reclaimed Wood", "Old weathered wood"),
-            # Stones
-            ('STONE_GRANITE', "Granite", "Polished granite stone"),
-            ('STONE_MARBLE', "Marble", "White marble with veins"),
-            ('STONE_SANDSTONE', "Sandstone", "Rough sandstone blocks"),
-            ('STONE_COBBLE', "Cobblestone", "Cobblestone pavement"),
-            ('STONE_ROUGH', "Rough Stone", "Rough stone wall"),
-            # Modern/Tech
-            ('CARBON_FIBER', "Carbon Fiber", "Carbon fiber weave"),
-            ('CONCRETE', "Concrete", "Rough concrete surface"),
-            ('LEATHER', "Leather", "Worn leather texture"),
-            ('FABRIC', "Fabric", "Woven fabric texture"),
-            ('PLASTIC', "Plastic", "Smooth plastic surface"),
-            ('RUBBER', "Rubber", "Textured rubber surface"),
-        ],
+        items=MATERIAL_TYPE_ITEMS,
         default='CUSTOM'
     )
     
@@ -203,12 +1222,70 @@ class AITextureProperties(PropertyGroup):
         default=False
     )
 
-    normal_strength: FloatProperty(
-        name="Normal Strength",
-        description="Strength of the generated normal map when applied to the material",
-        default=1.5,
-        min=0.1,
-        max=20.0,
+    use_udim: BoolProperty(
+        name="UDIM Tiles",
+        description="Generate one map set per UDIM tile used by the target's UV map "
+                    "(seam-blended, shared seed) and apply them as tiled images",
+        default=False
+    )
+
+    model_name: EnumProperty(
+        name="Model",
+        description="Checkpoint the backend samples with (models it already holds switch in seconds)",
+        items=[
+            ('REALISTIC_VISION', "Realistic Vision 5.1", "Photoreal materials (default)"),
+            ('DREAMSHAPER', "DreamShaper 8", "Stylized and painterly materials"),
+            ('SD15', "Stable Diffusion 1.5", "The base model"),
+        ],
+        default='REALISTIC_VISION'
+    )
+
+    show_last_trace: BoolProperty(
+        name="Show Timing",
+        description="Show where the time of the last generation went",
+        default=False
+    )
+
+    quality_profile: EnumProperty(
+        name="Quality",
+        description="Steps, guidance and sampler the backend uses per map",
+        items=[
+            ('DRAFT', "Draft", "Fewer steps with a fast sampler, for quick look-development"),
+            ('BALANCED', "Balanced", "The standard step budget"),
+            ('FINAL', "Final", "More steps, close to a high-step reference, for final renders"),
+        ],
+        default='BALANCED'
+    )
+
+    upscale_mode: EnumProperty(
+        name="Upscale",
+        description="How the backend reaches resolutions above 1024",
+        items=[
+            ('REFINE', "Upscale + Refine", "Sample at 1024, upscale and re-detail the color map "
+                                           "with a short img2img pass (fast, fits in memory)"),
+            ('RESAMPLE', "Upscale Only", "Sample at 1024 and upscale with a sharpened resample (fastest)"),
+            ('DIRECT', "Direct", "Sample at the full resolution, up to 2048 (slow, may run out of memory)"),
+        ],
+        default='REFINE'
+    )
+
+    texture_packing: EnumProperty(
+        name="Map Packing",
+        description="How the backend delivers the roughness and metallic maps",
+        items=[
+            ('SEPARATE', "Separate Maps", "One grayscale image per map"),
+            ('ORM', "Packed ORM", "Height, roughness and metallic packed into the R, G and B "
+                                  "channels of one image (game engine layout)"),
+        ],
+        default='SEPARATE'
+    )
+
+    normal_strength: FloatProperty(
+        name="Normal Strength",
+        description="Strength of the generated normal map when applied to the material",
+        default=1.5,
+        min=0.1,
+        max=20.0,
         soft_max=10.0
     )
 
@@ -230,7 +1307,7 @@ class AITextureProperties(PropertyGroup):
     # Texture resize properties
     resize_resolution: EnumProperty(
         name="Resize To",
-        description="New resolution for resizing textures",
+        description="Texture resolution; switches to a precomputed level when one exists, otherwise resamples from the full-resolution master",
         items=[
             ('256', "256px", "Very low resolution"),
             ('512', "512px", "Low resolution"),
@@ -239,9 +1316,42 @@ class AITextureProperties(PropertyGroup):
             ('4096', "4096px (4K)", "Very high resolution"),
             ('8192', "8192px (8K)", "Maximum resolution"),
         ],
-        default='1024'
+        default='1024',
+        update=update_viewport_lod
+    )
+
+    render_full_resolution: BoolProperty(
+        name="Render at Full Resolution",
+        description="Swap AI materials to their full-resolution level while rendering",
+        default=True
     )
     
+    resize_scope: EnumProperty(
+        name="Resize Scope",
+        description="Which AI materials to resize",
+        items=[
+            ('LAST', "Last Generated", "Only the last generated material"),
+            ('SELECTED', "Selected Objects", "AI materials on the selected objects"),
+            ('ALL', "All AI Materials", "Every AI_ material in the file"),
+        ],
+        default='LAST'
+    )
+
+    is_resizing: BoolProperty(
+        name="Is Resizing",
+        description="Whether a background resize is running",
+        default=False
+    )
+
+    resize_progress: FloatProperty(
+        name="Resize Progress",
+        description="Background resize progress (0.0 to 1.0)",
+        default=0.0,
+        min=0.0,
+        max=1.0,
+        subtype='PERCENTAGE'
+    )
+
     resize_filter: EnumProperty(
         name="Resize Filter",
         description="Filter algorithm for resizing",
@@ -287,6 +1397,1091 @@ class AITextureProperties(PropertyGroup):
         update=update_mapping_scale
     )
 
+    # Texture library
+    reuse_library: BoolProperty(
+        name="Reuse Library Results",
+        description="Load identical earlier requests from the texture library instead of generating again",
+        default=True
+    )
+
+    library_dir: StringProperty(
+        name="Library Folder",
+        description="Folder for the generated texture library (empty = Blender user data folder)",
+        default="",
+        subtype='DIR_PATH'
+    )
+
+    library_max_mb: IntProperty(
+        name="Library Size (MB)",
+        description="Disk budget for the texture library; least recently used entries are removed first",
+        default=2048,
+        min=64
+    )
+
+    library_entry: EnumProperty(
+        name="Library Entry",
+        description="Previously generated texture sets",
+        items=library_entry_items
+    )
+
+    # Batch generation queue
+    batch_items: CollectionProperty(type=AITextureBatchItem)
+
+    batch_index: IntProperty(
+        name="Active Batch Item",
+        default=0
+    )
+
+    batch_per_slot: BoolProperty(
+        name="One Job per Slot",
+        description="Queue every material slot of the selected objects instead of only the first",
+        default=False
+    )
+
+    batch_concurrency: IntProperty(
+        name="Requests in Flight",
+        description="How many batch requests are sent to the backend at the same time",
+        default=3,
+        min=1,
+        max=16
+    )
+
+    atlas_padding: IntProperty(
+        name="Atlas Padding",
+        description="Pixels around each atlas region filled with its edge colour, "
+                    "so filtering and mipmaps don't bleed between objects",
+        default=8,
+        min=0,
+        max=64
+    )
+
+    is_batch_running: BoolProperty(
+        name="Is Batch Running",
+        description="Whether batch generation is in progress",
+        default=False
+    )
+
+    batch_progress: FloatProperty(
+        name="Batch Progress",
+        description="Batch generation progress (0.0 to 1.0)",
+        default=0.0,
+        min=0.0,
+        max=1.0,
+        subtype='PERCENTAGE'
+    )
+
+
+# ============================================================================
+# Backend Client
+# ============================================================================
+PRESET_PROMPTS = {
+    # Metals
+    'METAL_RUSTED': "rusty worn metal surface with scratches, orange rust, blue oxidation, weathering",
+    'METAL_COPPER': "hammered copper surface with verdigris patina, dents and texture",
+    'METAL_BRASS': "polished brass metal surface with slight tarnish and reflections",
+    'METAL_ALUMINUM': "brushed aluminum metal with linear grain pattern and scratches",
+    'METAL_GOLD': "pure gold metal surface with subtle scratches and high reflectivity",
+    'METAL_CHROME': "polished chrome metal with mirror-like reflections",
+    'METAL_STEEL': "brushed stainless steel with directional grain and fingerprints",
+    'METAL_IRON': "rough cast iron surface with pitted texture and dark finish",
+
+    # Woods
+    'WOOD_OAK': "oak wood planks with prominent grain, knots, and natural variations",
+    'WOOD_PINE': "pine wood surface with visible grain lines and knots",
+    'WOOD_MAHOGANY': "rich dark mahogany wood with fine grain and polished finish",
+    'WOOD_BAMBOO': "bamboo texture with distinctive nodes and natural segmentation",
+    'WOOD_RECLAIMED': "old weathered reclaimed wood with cracks, nail holes, and aged patina",
+
+    # Stones
+    'STONE_GRANITE': "polished granite stone with speckled pattern and crystalline structure",
+    'STONE_MARBLE': "white marble with elegant gray veins and polished surface",
+    'STONE_SANDSTONE': "rough sandstone blocks with layered sediment and weathering",
+    'STONE_COBBLE': "dry cobblestone pavement with rectangular gray stones, individual brick pattern, matte finish, mortar gaps between stones, realistic outdoor paving",
+    'STONE_ROUGH': "rough stone wall surface with cracks, texture, and natural irregularities",
+
+    # Modern/Tech
+    'CARBON_FIBER': "carbon fiber weave pattern with distinctive twill texture and glossy epoxy",
+    'CONCRETE': "rough concrete surface with aggregate, pitting, and subtle cracks",
+    'LEATHER': "worn leather texture with creases, wrinkles, and natural grain",
+    'FABRIC': "woven fabric texture with detailed fiber pattern and slight roughness",
+    'PLASTIC': "smooth molded plastic surface with subtle imperfections",
+    'RUBBER': "textured rubber surface with grip pattern and matte finish",
+}
+
+
+def get_preset_prompt(material_type):
+    """Get preset prompt based on material type"""
+    return PRESET_PROMPTS.get(material_type, "")
+
+
+def _no_report(progress, status):
+    pass
+
+
+# ============================================================================
+# Procedural Generator
+# ============================================================================
+# Offline engine for the presets: tileable maps built from vectorized NumPy
+# noise and pattern functions, well under a second at 1K. Used when the
+# backend type is Procedural and as a quick placeholder while an AI job runs.
+PROCEDURAL_MAX_SIZE = 2048  # larger requests are generated at this size
+PROCEDURAL_PREVIEW_SIZE = 512
+
+# Material type -> pattern, sRGB colours and roughness/metallic ranges. Each
+# pattern returns a mix value (blends the two ends of every range) and a
+# height (drives the normal map), both 0-1.
+PROCEDURAL_RECIPES = {
+    'METAL_RUSTED': dict(pattern='rust', colors=((0.50, 0.51, 0.53), (0.42, 0.20, 0.07)),
+                         roughness=(0.35, 0.9), metallic=(1.0, 0.0)),
+    'METAL_COPPER': dict(pattern='hammered', colors=((0.78, 0.42, 0.26), (0.45, 0.62, 0.52)),
+                         roughness=(0.3, 0.6), metallic=(1.0, 1.0)),
+    'METAL_BRASS': dict(pattern='polished', colors=((0.80, 0.66, 0.36), (0.62, 0.50, 0.28)),
+                        roughness=(0.15, 0.3), metallic=(1.0, 1.0)),
+    'METAL_ALUMINUM': dict(pattern='brushed', colors=((0.80, 0.81, 0.83), (0.66, 0.67, 0.70)),
+                           roughness=(0.25, 0.45), metallic=(1.0, 1.0)),
+    'METAL_GOLD': dict(pattern='polished', colors=((1.0, 0.78, 0.34), (0.86, 0.64, 0.25)),
+                       roughness=(0.1, 0.25), metallic=(1.0, 1.0)),
+    'METAL_CHROME': dict(pattern='polished', colors=((0.92, 0.92, 0.94), (0.82, 0.82, 0.85)),
+                         roughness=(0.03, 0.1), metallic=(1.0, 1.0)),
+    'METAL_STEEL': dict(pattern='brushed', colors=((0.72, 0.73, 0.75), (0.56, 0.57, 0.60)),
+                        roughness=(0.25, 0.5), metallic=(1.0, 1.0)),
+    'METAL_IRON': dict(pattern='rough', colors=((0.30, 0.30, 0.31), (0.18, 0.18, 0.19)),
+                       roughness=(0.55, 0.85), metallic=(1.0, 1.0)),
+    'WOOD_OAK': dict(pattern='wood', colors=((0.72, 0.53, 0.33), (0.45, 0.30, 0.17)),
+                     roughness=(0.5, 0.75), metallic=(0.0, 0.0)),
+    'WOOD_PINE': dict(pattern='wood', colors=((0.86, 0.70, 0.48), (0.62, 0.44, 0.25)),
+                      roughness=(0.55, 0.75), metallic=(0.0, 0.0)),
+    'WOOD_MAHOGANY': dict(pattern='wood', colors=((0.48, 0.22, 0.13), (0.28, 0.11, 0.07)),
+                          roughness=(0.3, 0.5), metallic=(0.0, 0.0)),
+    'WOOD_BAMBOO': dict(pattern='bamboo', colors=((0.84, 0.74, 0.48), (0.60, 0.50, 0.28)),
+                        roughness=(0.4, 0.6), metallic=(0.0, 0.0)),
+    'WOOD_RECLAIMED': dict(pattern='wood', colors=((0.56, 0.50, 0.43), (0.30, 0.26, 0.22)),
+                           roughness=(0.7, 0.95), metallic=(0.0, 0.0)),
+    'STONE_GRANITE': dict(pattern='speckle', colors=((0.62, 0.60, 0.58), (0.16, 0.15, 0.15)),
+                          roughness=(0.2, 0.35), metallic=(0.0, 0.0)),
+    'STONE_MARBLE': dict(pattern='marble', colors=((0.93, 0.92, 0.90), (0.45, 0.45, 0.47)),
+                         roughness=(0.1, 0.25), metallic=(0.0, 0.0)),
+    'STONE_SANDSTONE': dict(pattern='layers', colors=((0.84, 0.70, 0.50), (0.66, 0.50, 0.33)),
+                            roughness=(0.75, 0.95), metallic=(0.0, 0.0)),
+    'STONE_COBBLE': dict(pattern='cells', colors=((0.55, 0.54, 0.52), (0.25, 0.24, 0.23)),
+                         roughness=(0.65, 0.95), metallic=(0.0, 0.0)),
+    'STONE_ROUGH': dict(pattern='rough', colors=((0.56, 0.54, 0.51), (0.33, 0.32, 0.30)),
+                        roughness=(0.75, 0.95), metallic=(0.0, 0.0)),
+    'CARBON_FIBER': dict(pattern='weave', colors=((0.16, 0.16, 0.17), (0.04, 0.04, 0.05)),
+                         roughness=(0.15, 0.3), metallic=(0.0, 0.0)),
+    'CONCRETE': dict(pattern='rough', colors=((0.62, 0.61, 0.58), (0.45, 0.44, 0.42)),
+                     roughness=(0.8, 0.95), metallic=(0.0, 0.0)),
+    'LEATHER': dict(pattern='leather', colors=((0.42, 0.26, 0.16), (0.24, 0.14, 0.09)),
+                    roughness=(0.45, 0.7), metallic=(0.0, 0.0)),
+    'FABRIC': dict(pattern='weave', colors=((0.36, 0.40, 0.52), (0.20, 0.23, 0.32)),
+                   roughness=(0.8, 0.95), metallic=(0.0, 0.0)),
+    'PLASTIC': dict(pattern='polished', colors=((0.80, 0.80, 0.80), (0.72, 0.72, 0.72)),
+                    roughness=(0.3, 0.4), metallic=(0.0, 0.0)),
+    'RUBBER': dict(pattern='grip', colors=((0.12, 0.12, 0.12), (0.06, 0.06, 0.06)),
+                   roughness=(0.8, 0.95), metallic=(0.0, 0.0)),
+}
+
+# Custom prompts pick a recipe by keyword, most specific first
+PROCEDURAL_KEYWORDS = (
+    ("rust", 'METAL_RUSTED'), ("copper", 'METAL_COPPER'), ("brass", 'METAL_BRASS'),
+    ("alumin", 'METAL_ALUMINUM'), ("gold", 'METAL_GOLD'), ("chrome", 'METAL_CHROME'),
+    ("iron", 'METAL_IRON'), ("steel", 'METAL_STEEL'), ("metal", 'METAL_STEEL'),
+    ("bamboo", 'WOOD_BAMBOO'), ("mahogany", 'WOOD_MAHOGANY'), ("pine", 'WOOD_PINE'),
+    ("reclaimed", 'WOOD_RECLAIMED'), ("wood", 'WOOD_OAK'), ("plank", 'WOOD_OAK'),
+    ("granite", 'STONE_GRANITE'), ("marble", 'STONE_MARBLE'), ("sandstone", 'STONE_SANDSTONE'),
+    ("cobble", 'STONE_COBBLE'), ("brick", 'STONE_COBBLE'), ("tile", 'STONE_COBBLE'),
+    ("carbon", 'CARBON_FIBER'), ("concrete", 'CONCRETE'), ("leather", 'LEATHER'),
+    ("fabric", 'FABRIC'), ("cloth", 'FABRIC'), ("plastic", 'PLASTIC'), ("rubber", 'RUBBER'),
+)
+
+
+def get_procedural_recipe(prompt):
+    """Return the procedural recipe for a preset prompt, or the closest one for a custom prompt."""
+    for material_type, preset_prompt in PRESET_PROMPTS.items():
+        if prompt == preset_prompt:
+            return PROCEDURAL_RECIPES[material_type]
+    text = prompt.lower()
+    for keyword, material_type in PROCEDURAL_KEYWORDS:
+        if keyword in text:
+            return PROCEDURAL_RECIPES[material_type]
+    return PROCEDURAL_RECIPES['STONE_ROUGH']
+
+
+def _lerp_axis(values, index0, index1, fraction, axis):
+    """Blend two gathered lattice slices along one axis."""
+    a = np.take(values, index0, axis=axis)
+    b = np.take(values, index1, axis=axis)
+    shape = [1, 1]
+    shape[axis] = -1
+    return a + (b - a) * fraction.reshape(shape)
+
+
+def _noise(size, period_x, period_y, rng):
+    """Smooth value noise over a period_x x period_y lattice that wraps at the borders."""
+    lattice = rng.random((period_y, period_x), dtype=np.float32)
+    result = lattice
+    for axis, period in ((0, period_y), (1, period_x)):
+        coords = np.arange(size, dtype=np.float32) * (period / size)
+        index0 = coords.astype(np.int64)
+        fraction = coords - index0
+        fraction = fraction * fraction * (3.0 - 2.0 * fraction)  # smoothstep
+        result = _lerp_axis(result, index0 % period, (index0 + 1) % period, fraction, axis)
+    return result
+
+
+def _fbm(size, period, rng, octaves=5, stretch=1):
+    """Fractal sum of noise octaves (0-1); stretch > 1 elongates features along X."""
+    total = np.zeros((size, size), dtype=np.float32)
+    amplitude = 1.0
+    norm = 0.0
+    for octave in range(octaves):
+        p = min(period << octave, size)
+        total += amplitude * _noise(size, max(1, p // stretch), p, rng)
+        norm += amplitude
+        amplitude *= 0.5
+    return total / norm
+
+
+def _cells(size, count, rng):
+    """Tileable Voronoi over a count x count jittered grid: (F1, F2 distances, cell id)."""
+    points = rng.random((2, count, count), dtype=np.float32)
+    coords = np.arange(size, dtype=np.float32) * np.float32(count / size)
+    cell = coords.astype(np.int32)
+    local = coords - cell
+    # Squared distances until the end; sqrt only for the two results
+    f1 = np.full((size, size), np.inf, dtype=np.float32)
+    f2 = np.full((size, size), np.inf, dtype=np.float32)
+    winner = np.zeros((size, size), dtype=np.int8)  # neighbour index of the nearest point
+    for k, (dy, dx) in enumerate((dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)):
+        ny = (cell + dy) % count
+        nx = (cell + dx) % count
+        # Row gather then column gather: much cheaper than 2D fancy indexing
+        offset_x = points[0][ny][:, nx] + (dx - local)[None, :]
+        offset_y = points[1][ny][:, nx] + (dy - local)[:, None]
+        distance = offset_x * offset_x + offset_y * offset_y
+        closer = distance < f1
+        np.minimum(f2, np.where(closer, f1, distance), out=f2)
+        np.copyto(winner, k, where=closer)
+        np.minimum(f1, distance, out=f1)
+    ids = ((cell[:, None] + winner // 3 - 1) % count) * count + (cell[None, :] + winner % 3 - 1) % count
+    return np.sqrt(f1), np.sqrt(f2), ids
+
+
+def _normalize(values):
+    low = values.min()
+    span = values.max() - low
+    return (values - low) / span if span > 0 else np.zeros_like(values)
+
+
+def _pattern(name, size, rng):
+    """Return (mix, height) arrays for a named pattern."""
+    u = (np.arange(size, dtype=np.float32) / size)[None, :]
+    v = (np.arange(size, dtype=np.float32) / size)[:, None]
+    detail = _fbm(size, 8, rng, octaves=4)
+
+    if name == 'wood':
+        planks = 4
+        plank = np.floor(u * planks).astype(np.int64)
+        offsets = rng.random(planks, dtype=np.float32)[plank]
+        warp = _fbm(size, 2, rng, octaves=3, stretch=1)
+        rings = np.mod(v * 3 + offsets * 5 + warp * 1.5, 1.0)
+        grain = _fbm(size, 16, rng, octaves=3, stretch=8)
+        mix = np.clip(rings ** 3 * 0.7 + grain * 0.3, 0, 1)
+        gap = np.mod(u * planks, 1.0)
+        height = 1.0 - mix * 0.3 - (np.minimum(gap, 1 - gap) < 0.006) * 0.7
+    elif name == 'bamboo':
+        stalks = 6
+        across = np.mod(u * stalks, 1.0)
+        nodes = np.abs(np.mod(v * 3 + np.floor(u * stalks) * 0.37, 1.0) - 0.5) > 0.48
+        mix = np.clip(0.6 * np.abs(across - 0.5) * 2 + 0.4 * _fbm(size, 16, rng, 3, 8) + nodes * 0.5, 0, 1)
+        height = np.sin(across * np.pi) * (1 - nodes * 0.4)
+    elif name == 'marble':
+        turbulence = _fbm(size, 4, rng, octaves=6)
+        veins = np.abs(np.sin((u + v + turbulence * 2.0) * np.pi * 2))
+        mix = 1.0 - veins ** 0.15 + detail * 0.1
+        height = detail * 0.2
+    elif name == 'speckle':
+        grains = _noise(size, size // 4, size // 4, rng)
+        mix = np.clip((grains > 0.62) * 0.9 + (grains < 0.2) * 0.5 + detail * 0.2, 0, 1)
+        height = grains * 0.3
+    elif name == 'layers':
+        warp = _fbm(size, 4, rng, octaves=4)
+        bands = np.sin((v * 12 + warp * 2) * np.pi * 2) * 0.5 + 0.5
+        mix = np.clip(bands * 0.6 + detail * 0.4, 0, 1)
+        height = bands * 0.5 + _fbm(size, 32, rng, 3) * 0.5
+    elif name == 'cells':
+        f1, f2, ids = _cells(size, 6, rng)
+        mortar = np.clip((f2 - f1) / 0.12, 0, 1)
+        tint = rng.random(36, dtype=np.float32)[ids]
+        mix = np.clip(1.0 - mortar * (0.7 + 0.3 * tint) + detail * 0.2, 0, 1)
+        height = mortar ** 0.5 * (0.8 + 0.2 * detail)
+    elif name == 'rough':
+        pits = _noise(size, size // 8, size // 8, rng) < 0.08
+        mix = np.clip(detail * 0.8 + pits * 0.6, 0, 1)
+        height = detail - pits * 0.3
+    elif name == 'brushed':
+        streaks = _fbm(size, 64, rng, octaves=3, stretch=64)
+        mix = streaks * 0.8 + detail * 0.2
+        height = streaks * 0.3
+    elif name == 'hammered':
+        f1, _, _ = _cells(size, 10, rng)
+        dents = np.clip(f1 / 0.7, 0, 1)
+        mix = np.clip(_fbm(size, 2, rng, 4) ** 2 * 1.6 - 0.3, 0, 1)  # patina patches
+        height = 1.0 - dents ** 2
+    elif name == 'rust':
+        rust = np.clip((_fbm(size, 4, rng, octaves=6) - 0.45) * 5, 0, 1)
+        mix = np.clip(rust + detail * 0.1, 0, 1)
+        height = rust * 0.4 + _fbm(size, 64, rng, 3) * rust * 0.6
+    elif name == 'weave':
+        threads = 24
+        warp_threads = np.sin(u * threads * np.pi * 2) * 0.5 + 0.5
+        weft_threads = np.sin(v * threads * np.pi * 2) * 0.5 + 0.5
+        over = (np.floor(u * threads) + np.floor(v * threads)) % 2 == 0
+        height = np.where(over, warp_threads, weft_threads)
+        mix = np.clip(1.0 - height * 0.8 + detail * 0.2, 0, 1)
+    elif name == 'leather':
+        f1, f2, _ = _cells(size, 24, rng)
+        creases = np.clip((f2 - f1) / 0.15, 0, 1)
+        mix = np.clip(1.0 - creases + detail * 0.3, 0, 1)
+        height = creases * 0.7 + detail * 0.3
+    elif name == 'grip':
+        dots = 16
+        du = np.mod(u * dots, 1.0) - 0.5
+        dv = np.mod(v * dots, 1.0) - 0.5
+        bumps = np.clip(1.0 - np.sqrt(du ** 2 + dv ** 2) / 0.3, 0, 1)
+        mix = np.clip(bumps * 0.5 + detail * 0.3, 0, 1)
+        height = np.sqrt(bumps)
+    else:  # 'polished'
+        mix = detail
+        height = detail * 0.05
+
+    mix = np.broadcast_to(mix, (size, size)).astype(np.float32)
+    height = _normalize(np.broadcast_to(height, (size, size)).astype(np.float32))
+    return mix, height
+
+
+def _procedural_normal(height, strength=4.0):
+    """Tangent-space normal map (OpenGL, 0-1 encoded) from a wrapping height field."""
+    scale = strength * height.shape[0] / 512.0
+    dx = (np.roll(height, -1, axis=1) - np.roll(height, 1, axis=1)) * (0.5 * scale)
+    dy = (np.roll(height, 1, axis=0) - np.roll(height, -1, axis=0)) * (0.5 * scale)  # rows run top-down
+    length = np.sqrt(dx * dx + dy * dy + 1.0)
+    return np.stack([-dx / length, -dy / length, 1.0 / length], axis=-1) * 0.5 + 0.5
+
+
+def _procedural_pixels(rgb):
+    """Pack an (h, w, 3) 0-1 array into the (width, height, RGBA pixels) form Blender takes."""
+    height, width = rgb.shape[:2]
+    rgba = np.ones((height, width, 4), dtype=np.float32)
+    rgba[..., :3] = rgb
+    return width, height, rgba[::-1].ravel()
+
+
+def generate_procedural(prompt, resolution):
+    """Generate tileable maps for a prompt locally.
+
+    Returns (textures, constants) like a backend result: pixel buffers per
+    map type, and metallic as a constant when the recipe keeps it uniform.
+    """
+    recipe = get_procedural_recipe(prompt)
+    size = min(resolution, PROCEDURAL_MAX_SIZE)
+    # Same prompt, same maps
+    rng = np.random.default_rng(int(hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8], 16))
+    mix, height = _pattern(recipe['pattern'], size, rng)
+    mix3 = mix[..., None]
+
+    color_a, color_b = (np.array(color, dtype=np.float32) for color in recipe['colors'])
+    diffuse = color_a + (color_b - color_a) * mix3
+    rough_a, rough_b = recipe['roughness']
+    roughness = np.repeat(rough_a + (rough_b - rough_a) * mix3, 3, axis=-1)
+    textures = {
+        'diffuse': _procedural_pixels(np.clip(diffuse, 0, 1)),
+        'roughness': _procedural_pixels(np.clip(roughness, 0, 1)),
+        'normal': _procedural_pixels(_procedural_normal(height)),
+    }
+    constants = {}
+    metal_a, metal_b = recipe['metallic']
+    if metal_a == metal_b:
+        constants['metallic'] = [metal_a] * 3
+    else:
+        textures['metallic'] = _procedural_pixels(np.repeat(metal_a + (metal_b - metal_a) * mix3, 3, axis=-1))
+    return textures, constants
+
+
+# ============================================================================
+# Request Tracing
+# ============================================================================
+# Each generation carries a trace: the backend's per-stage timings (queue,
+# model, each map, encode) plus the client's own (tunnel, download, parse,
+# decode, library, apply). The newest trace is shown in the main panel and
+# every one is appended to traces.jsonl in the library folder.
+TRACE_LOG_NAME = "traces.jsonl"
+
+_last_trace = None
+
+
+def new_trace(params, log_dir):
+    """Start a trace for a request; stages are filled in as it runs."""
+    return {
+        "trace_id": None,  # set per backend request in generate_via_backend
+        "started": time.time(),
+        "params": params,  # lets tools/loadtest.py replay the request
+        "source": None,
+        "backend": None,
+        "server": {},
+        "client": {},
+        "log_path": os.path.join(log_dir, TRACE_LOG_NAME),
+    }
+
+
+def record_stage(trace, stage, start):
+    """Store the seconds since start (a perf_counter value) as a client stage."""
+    if trace is not None:
+        trace["client"][stage] = round(time.perf_counter() - start, 3)
+
+
+def trace_rows(trace):
+    """Return (label, seconds) rows: server stages first, then client stages."""
+    rows = [(f"server {stage}", seconds) for stage, seconds in trace["server"].items()]
+    return rows + list(trace["client"].items())
+
+
+def finish_trace(trace, error=None):
+    """Publish a finished trace to the panel and append it to the log."""
+    global _last_trace
+    trace["total"] = round(time.time() - trace["started"], 3)
+    if error is not None:
+        trace["error"] = str(error)
+    log_path = trace.pop("log_path", None)
+    _last_trace = trace
+    breakdown = ", ".join(f"{label} {seconds:.2f}s" for label, seconds in trace_rows(trace))
+    print(f"🔎 Trace {(trace['trace_id'] or '-')[:8]} ({trace['source']}): {trace['total']:.1f}s - {breakdown}")
+    if log_path:
+        try:
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(trace) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not write trace log: {e}")
+
+
+# ============================================================================
+# HTTP Transport
+# ============================================================================
+# One keep-alive session is shared by every request so ngrok tunnels are not
+# re-handshaked per call. Results are streamed with progress and, if the
+# connection drops, resumed by job id from the backend's /result endpoint
+# instead of regenerating.
+GENERATE_TIMEOUT = 600  # seconds
+CONNECT_TIMEOUT = 10
+DOWNLOAD_CHUNK = 256 * 1024
+RESUME_ATTEMPTS = 5
+SUBMIT_ATTEMPTS = 3  # POSTs of a job the backend never received
+RESULT_POLL_INTERVAL = 2.0
+
+_http_session = None
+_http_session_lock = threading.Lock()
+_plain_http_hosts = set()  # hosts whose HTTPS handshake failed; use HTTP for them
+# A backend on this machine hands maps over as raw pixel files instead of
+# base64 JPEGs in the response body (no encode/decode on either side).
+# Handoff paths are only accepted for requests sent to a loopback URL, and
+# only inside the backend's handoff folder.
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+HANDOFF_ROOT = os.path.join(tempfile.gettempdir(), "aitex_handoff")
+
+
+def get_http_session():
+    """Return the shared pooled keep-alive session."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=16)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+        return _http_session
+
+
+def close_http_session():
+    global _http_session
+    with _http_session_lock:
+        if _http_session is not None:
+            _http_session.close()
+            _http_session = None
+
+
+def http_request(method, url, **kwargs):
+    """Send a request on the shared session.
+
+    HTTPS is tried first; only a host whose SSL handshake fails (as some
+    ngrok setups do with Blender's bundled Python) is downgraded to HTTP,
+    and that choice is remembered.
+    """
+    host = url.split("//", 1)[-1].split("/", 1)[0]
+    if url.startswith("https://") and host in _plain_http_hosts:
+        url = "http://" + url[len("https://"):]
+    try:
+        return get_http_session().request(method, url, **kwargs)
+    except requests.exceptions.SSLError:
+        if not url.startswith("https://"):
+            raise
+        print(f"ℹ️ SSL handshake with {host} failed - falling back to HTTP")
+        _plain_http_hosts.add(host)
+        return get_http_session().request(method, "http://" + url[len("https://"):], **kwargs)
+
+
+def is_loopback_url(url):
+    host = url.split("//", 1)[-1].split("/", 1)[0]
+    if not host.startswith("["):
+        host = host.split(":", 1)[0]
+    else:
+        host = host.split("]", 1)[0] + "]"
+    return host in LOOPBACK_HOSTS
+
+
+def read_handoff(path):
+    """Map a pixel file the local backend wrote and return (width, height, pixels).
+
+    The file already holds float32 RGBA rows in Blender's bottom-up order,
+    so the memory-mapped array goes to Image.pixels.foreach_set as it is:
+    no decode and no copy here. Raises BackendError for a path outside
+    HANDOFF_ROOT (the response names the file, and it is deleted) or for an
+    array in another layout.
+    """
+    root = os.path.realpath(HANDOFF_ROOT)
+    path = os.path.realpath(path)
+    if os.path.commonpath([root, path]) != root or path == root or not path.endswith(".npy"):
+        raise BackendError(f"Backend handed over a file outside {root}: {path}")
+    pixels = np.load(path, mmap_mode='r', allow_pickle=False)
+    if pixels.dtype != np.float32 or pixels.ndim != 3 or pixels.shape[2] != 4:
+        raise BackendError(f"Unexpected handoff layout {pixels.dtype} {pixels.shape}: {path}")
+    height, width = pixels.shape[:2]
+    try:
+        # POSIX keeps the mapping valid after unlinking; Windows refuses while
+        # it is mapped, and the backend sweeps the file later
+        os.remove(path)
+        folder = os.path.dirname(path)
+        if folder != root:
+            os.rmdir(folder)
+    except OSError:
+        pass
+    return width, height, pixels.reshape(-1)
+
+
+def _report_download(report, received, total):
+    mb = 1024 * 1024
+    if total:
+        report(0.7 + 0.15 * received / total, f"Receiving textures... {received / mb:.1f}/{total / mb:.1f} MB")
+    else:
+        report(None, f"Receiving textures... {received / mb:.1f} MB")
+
+
+def _open_result(backend_url, job_id, offset, report):
+    """GET /result/<job_id> from offset, waiting while the job is still running.
+
+    Returns (response, total size, restart) where restart means the server
+    ignored the range and is sending the whole body again.
+    """
+    deadline = time.monotonic() + GENERATE_TIMEOUT
+    while True:
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            response = http_request(
+                "GET", f"{backend_url}/result/{job_id}", headers=headers, stream=True,
+                timeout=(CONNECT_TIMEOUT, GENERATE_TIMEOUT)
+            )
+        except requests.RequestException as e:
+            raise BackendError(f"Connection failed: {str(e)}", retryable=True)
+
+        if response.status_code == 202 and time.monotonic() < deadline:
+            response.close()
+            report(None, "Waiting for backend to finish...")
+            time.sleep(RESULT_POLL_INTERVAL)
+            continue
+        if response.status_code == 206:
+            match = re.match(r"bytes \d+-\d+/(\d+)", response.headers.get("Content-Range", ""))
+            return response, int(match.group(1)) if match else 0, False
+        if response.status_code == 200:
+            return response, int(response.headers.get("Content-Length") or 0), True
+        response.close()
+        raise BackendError(
+            f"Could not resume result: {response.status_code}",
+            status_code=response.status_code, retryable=True,
+        )
+
+
+def _backend_has_job(backend_url, job_id):
+    """True once the backend has registered job_id (waiting, running or finished)."""
+    try:
+        response = http_request(
+            "GET", f"{backend_url}/result/{job_id}", stream=True,
+            timeout=(CONNECT_TIMEOUT, CONNECT_TIMEOUT)
+        )
+    except requests.RequestException:
+        return False
+    response.close()
+    return response.status_code in (200, 202, 206)
+
+
+def download_result(backend_url, job_id, response, report):
+    """Stream a result body, resuming by job id if the connection drops."""
+    buffer = bytearray()
+    total = int(response.headers.get("Content-Length") or 0)
+    attempts = 0
+    while True:
+        try:
+            for chunk in response.iter_content(DOWNLOAD_CHUNK):
+                buffer.extend(chunk)
+                _report_download(report, len(buffer), total)
+            if total and len(buffer) < total:
+                raise requests.ConnectionError("connection closed before the result was complete")
+            response.close()
+            return bytes(buffer)
+        except requests.RequestException as e:
+            response.close()
+            attempts += 1
+            if attempts > RESUME_ATTEMPTS:
+                raise BackendError(f"Download failed: {str(e)}", retryable=True)
+            report(None, f"Connection dropped, resuming at {len(buffer) / (1024 * 1024):.1f} MB...")
+            time.sleep(min(2 ** attempts, 10))
+            response, total, restart = _open_result(backend_url, job_id, len(buffer), report)
+            if restart:
+                buffer.clear()
+
+
+class BackendError(Exception):
+    """Backend request failure; retryable ones may succeed on another backend.
+
+    retry_after is set when the backend is busy (429) and asked to be retried later.
+    """
+
+    def __init__(self, message, status_code=None, retryable=False, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def build_request_params(props, prompt, obj=None):
+    """Return the backend request parameters for a prompt (also the library key source).
+
+    obj is the target object; with UDIM mode on, its UV tiles are requested.
+    """
+    params = {
+        "prompt": prompt,
+        "resolution": int(props.resolution),
+        "tileable": props.make_tileable,
+    }
+    # Only non-default options are added, so existing library entries keep their keys
+    if props.backend_type == 'PROCEDURAL':
+        # Procedural maps are tileable and need no UDIMs or packing
+        params["engine"] = "procedural"
+        return params
+    if props.texture_packing != 'SEPARATE':
+        params["packing"] = props.texture_packing.lower()
+    if props.model_name != 'REALISTIC_VISION':
+        params["model"] = props.model_name.lower()
+    if props.quality_profile != 'BALANCED':
+        params["profile"] = props.quality_profile.lower()
+    if props.upscale_mode != 'REFINE':
+        params["upscale"] = {'RESAMPLE': "resample", 'DIRECT': "off"}[props.upscale_mode]
+    if props.use_udim:
+        tiles = get_udim_tiles(obj)
+        if tiles:
+            params["udim_tiles"] = tiles
+    return params
+
+
+def build_atlas_params(props, prompts):
+    """Return request parameters for one atlas holding a region per prompt."""
+    params = build_request_params(props, ATLAS_PROMPT)
+    params.update({
+        "tileable": False,
+        "atlas_prompts": list(prompts),
+        "atlas_grid": atlas_grid(len(prompts)),
+        "atlas_padding": props.atlas_padding,
+    })
+    return params
+
+
+def generate_via_backend(backend_url, params, report=_no_report, priority="interactive", trace=None):
+    """Send request to backend and get textures back"""
+    # Returns ({map type: PIL image}, {map type: [r, g, b]} for uniform maps)
+    # and fills trace (see new_trace) with the server and transfer timings
+
+    report(0.2, "Sending request to backend...")
+
+    # Prepare request; the job id lets us fetch the result again if the link drops
+    job_id = uuid.uuid4().hex
+    trace_id = uuid.uuid4().hex
+    payload = dict(params, job_id=job_id, priority=priority, trace_id=trace_id)
+    local = is_loopback_url(backend_url)
+    if local:
+        payload["transport"] = "local"
+
+    report(0.3, "Generating textures with AI...")
+
+    start = time.perf_counter()
+    for attempt in range(1, SUBMIT_ATTEMPTS + 1):
+        try:
+            response = http_request(
+                "POST", f"{backend_url}/generate", json=payload, stream=True,
+                timeout=(CONNECT_TIMEOUT, GENERATE_TIMEOUT)
+            )
+        except requests.exceptions.ConnectTimeout as e:
+            raise BackendError(f"Connection failed: {str(e)}", retryable=True)
+        except requests.RequestException as e:
+            # The backend registers the job id on arrival: if it knows the job,
+            # the tunnel dropped while it keeps generating; if not, the job
+            # never arrived and is sent again (a repeat never runs it twice)
+            if _backend_has_job(backend_url, job_id):
+                print(f"⚠️ Lost connection during generation ({e}), waiting for result {job_id}")
+                response, _, _ = _open_result(backend_url, job_id, 0, report)
+                break
+            if attempt == SUBMIT_ATTEMPTS:
+                raise BackendError(f"Connection failed: {str(e)}", retryable=True)
+            print(f"⚠️ Request not received by the backend ({e}), sending it again")
+            time.sleep(min(2 ** attempt, 10))
+            continue
+        if response.status_code == 409:
+            # Already running from an earlier POST whose response was lost
+            response.close()
+            response, _, _ = _open_result(backend_url, job_id, 0, report)
+        break
+
+    if response.status_code == 429:
+        # Queue full: the backend estimates when a place will be free
+        response.close()
+        try:
+            retry_after = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            retry_after = None
+        raise BackendError("Backend busy", status_code=429, retryable=True, retry_after=retry_after)
+
+    if response.status_code != 200:
+        response.close()
+        raise BackendError(
+            f"Backend API error: {response.status_code}",
+            status_code=response.status_code,
+            retryable=response.status_code >= 500,
+        )
+
+    waited = time.perf_counter() - start
+
+    report(0.7, "Receiving generated textures...")
+
+    # Parse response
+    start = time.perf_counter()
+    body = download_result(backend_url, job_id, response, report)
+    downloaded = time.perf_counter() - start
+    start = time.perf_counter()
+    data = json.loads(body)
+    parsed = time.perf_counter() - start
+
+    report(0.85, "Decoding texture images...")
+    start = time.perf_counter()
+
+    # Decode base64 images; local handoffs arrive as pixel buffers
+    textures = {}
+    for key, value in data.items():
+        # '<map type>' or, for UDIM tiles, '<map type>.<tile>'
+        tex_type, _, tile = key.partition(".")
+        if tex_type in MAP_TYPES and (not tile or tile.isdigit()):
+            if isinstance(value, dict):
+                if not local:
+                    raise BackendError("Backend sent a local file handoff for a remote request")
+                textures[key] = read_handoff(value["handoff"])
+                continue
+            img_data = base64.b64decode(value)
+            img = Image.open(io.BytesIO(img_data))
+            textures[key] = img
+
+    if trace is not None:
+        # Time to the first byte beyond the server's own work is the tunnel
+        server = {stage: float(seconds) for stage, seconds in data.get("timings", {}).items()}
+        trace.update(trace_id=trace_id, backend=backend_url, server=server)
+        trace["client"].update(
+            tunnel=round(max(0.0, waited - sum(server.values())), 3),
+            download=round(downloaded, 3),
+            parse=round(parsed, 3),
+        )
+        record_stage(trace, "decode", start)
+
+    seams = data.get("seam_scores")
+    if seams:
+        repaired = ", ".join(seams.get("repaired_axes", [])) or "none needed"
+        worst = max(max(score) for score in seams.get("after", seams["before"]).values())
+        print(f"🧵 Seam repair: {repaired}; worst seam score {worst:.2f}")
+
+    # Uniform maps come back as channel values instead of images
+    constants = {
+        tex_type: [float(v) for v in value]
+        for tex_type, value in data.get("constants", {}).items()
+        if tex_type in MAP_TYPES
+    }
+
+    report(0.95, "Preparing to apply textures...")
+
+    return textures, constants
+
+
+# ============================================================================
+# Backend Pool
+# ============================================================================
+BACKEND_PROBE_INTERVAL = 10.0  # seconds between /health probes
+BACKEND_PROBE_TIMEOUT = 5.0
+LATENCY_SMOOTHING = 0.3  # weight of the newest sample in the moving averages
+BUSY_BACKOFF_BASE = 5.0  # seconds; used when a busy backend sends no Retry-After
+BUSY_BACKOFF_MAX = 120.0
+
+
+def get_backend_urls(props):
+    """Return the primary backend URL followed by any additional ones."""
+    urls = [props.backend_url] + props.extra_backend_urls.replace(";", ",").split(",")
+    result = []
+    for url in urls:
+        url = url.strip().rstrip("/")
+        if url and url not in result:
+            result.append(url)
+    return result
+
+
+class BackendPool:
+    """Health-probed set of backends that hands each job to the least-loaded one.
+
+    A daemon thread polls every backend's /health for status and queue
+    depth. generate() picks the healthy backend with the fewest queued plus
+    in-flight jobs and retries on another backend after a connection error
+    or 5xx response. When every backend is busy (429) it waits as asked by
+    Retry-After and tries them all again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._urls = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _new_stats(self):
+        return {
+            "healthy": None,  # None = not probed yet
+            "queue_depth": 0,
+            "in_flight": 0,
+            "probe_ms": None,
+            "generate_s": None,
+            "jobs": 0,
+            "failures": 0,
+            "last_error": "",
+        }
+
+    def configure(self, urls):
+        """Set the backend list and make sure the prober is running."""
+        with self._lock:
+            self._urls = list(urls)
+            for url in self._urls:
+                self._stats.setdefault(url, self._new_stats())
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._probe_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self):
+        """Return [(url, stats copy)] for the configured backends."""
+        with self._lock:
+            return [(url, dict(self._stats[url])) for url in self._urls]
+
+    def _probe_loop(self):
+        while not self._stop.is_set():
+            with self._lock:
+                urls = list(self._urls)
+            for url in urls:
+                self.probe(url)
+            self._stop.wait(BACKEND_PROBE_INTERVAL)
+
+    def probe(self, url):
+        start = time.perf_counter()
+        try:
+            response = http_request("GET", f"{url}/health", timeout=BACKEND_PROBE_TIMEOUT)
+            response.raise_for_status()
+            data = response.json()
+            healthy, queue_depth, error = data.get("status") == "ok", int(data.get("queue_depth", 0)), ""
+        except (requests.RequestException, ValueError) as e:
+            healthy, queue_depth, error = False, 0, str(e)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        with self._lock:
+            stats = self._stats.setdefault(url, self._new_stats())
+            stats["healthy"] = healthy
+            stats["queue_depth"] = queue_depth
+            stats["last_error"] = error
+            if healthy:
+                stats["probe_ms"] = _smooth(stats["probe_ms"], elapsed_ms)
+
+    def _acquire(self, urls, exclude):
+        with self._lock:
+            candidates = [url for url in urls if url not in exclude]
+            if not candidates:
+                return None
+            for url in candidates:
+                self._stats.setdefault(url, self._new_stats())
+            # Known-bad backends only when nothing else is left
+            usable = [url for url in candidates if self._stats[url]["healthy"] is not False] or candidates
+
+            def load(url):
+                stats = self._stats[url]
+                return (stats["queue_depth"] + stats["in_flight"], stats["probe_ms"] or 0.0)
+
+            url = min(usable, key=load)
+            self._stats[url]["in_flight"] += 1
+            return url
+
+    def _release(self, url, elapsed=None, error=None):
+        with self._lock:
+            stats = self._stats[url]
+            stats["in_flight"] -= 1
+            if error is None:
+                stats["jobs"] += 1
+                stats["generate_s"] = _smooth(stats["generate_s"], elapsed)
+            elif error.status_code == 429:
+                # Busy, not broken: it stays eligible once its queue drains
+                stats["last_error"] = str(error)
+            else:
+                stats["failures"] += 1
+                stats["last_error"] = str(error)
+                if error.retryable:
+                    stats["healthy"] = False
+
+    def generate(self, urls, params, report=_no_report, priority="interactive", trace=None):
+        """Generate on the least-loaded backend, failing over on retryable errors."""
+        tried = []
+        busy = []  # Retry-After of each backend that answered 429 this round
+        backoffs = 0
+        deadline = time.monotonic() + GENERATE_TIMEOUT
+        last_error = None
+        while True:
+            url = self._acquire(urls, tried)
+            if url is None:
+                if not busy:
+                    raise last_error or BackendError("No backend configured")
+                # Everyone is busy: wait as asked (exponential backoff when no
+                # Retry-After was given), with jitter so clients do not return together
+                asked = [seconds for seconds in busy if seconds is not None]
+                delay = min(asked) if asked else BUSY_BACKOFF_BASE * 2 ** backoffs
+                delay = min(delay, BUSY_BACKOFF_MAX) * random.uniform(1.0, 1.2)
+                if time.monotonic() + delay > deadline:
+                    raise last_error
+                report(None, f"Backend busy, retrying in {delay:.0f}s...")
+                time.sleep(delay)
+                if trace is not None:
+                    trace["client"]["backoff"] = round(trace["client"].get("backoff", 0.0) + delay, 3)
+                tried, busy = [], []
+                backoffs += 1
+                continue
+            tried.append(url)
+            if len(urls) > 1:
+                report(None, f"Using backend {len(tried)}/{len(urls)}: {url}")
+            start = time.perf_counter()
+            try:
+                result = generate_via_backend(url, params, report, priority, trace)
+            except BackendError as e:
+                self._release(url, error=e)
+                if not e.retryable:
+                    raise
+                last_error = e
+                if e.status_code == 429:
+                    busy.append(e.retry_after)
+                    print(f"⏳ Backend {url} is busy")
+                else:
+                    print(f"⚠️ Backend {url} failed ({e}), trying another")
+                continue
+            self._release(url, elapsed=time.perf_counter() - start)
+            return result
+
+
+def _smooth(previous, sample):
+    if previous is None:
+        return sample
+    return previous + LATENCY_SMOOTHING * (sample - previous)
+
+
+_backend_pool = BackendPool()
+
+
+def fetch_textures(backend_urls, params, library, reuse_library, report=_no_report, priority="interactive",
+                   trace=None):
+    """Get decoded textures and LOD chains for a request, from the library or the backend.
+
+    Runs entirely off the main thread; returns (textures, lods, constants)
+    ready for apply_to_material. priority is the backend queue class
+    ("interactive", "batch" or "prebake"); trace (see new_trace) collects
+    the timings.
+    """
+    start = time.perf_counter()
+    if params.get("engine") == "procedural":
+        # Cheaper to regenerate than to store, so the library is skipped
+        report(0.5, "Generating procedural textures...")
+        textures, constants = generate_procedural(params["prompt"], params["resolution"])
+        lods = build_lod_chains(textures)
+        if trace is not None:
+            trace["source"] = "procedural"
+        record_stage(trace, "procedural", start)
+        report(1.0, "Complete!")
+        return textures, lods, constants
+
+    if reuse_library:
+        report(None, "Checking texture library...")
+        paths = library.get(params)
+        if paths is not None:
+            report(None, "Decoding library textures...")
+            textures, lods = load_library_textures(paths)
+            constants = library.get_constants(TextureLibrary.make_key(params))
+            if trace is not None:
+                trace["source"] = "library"
+            record_stage(trace, "library_load", start)
+            report(1.0, "Loaded from library!")
+            return textures, lods, constants
+
+    report(0.1, "Connecting to backend...")
+    if trace is not None:
+        trace["source"] = "backend"
+
+    # Call Backend API (least-loaded backend, with failover)
+    images, constants = _backend_pool.generate(backend_urls, params, report, priority, trace)
+
+    plain, tiled = split_udim_maps(images)
+    if tiled:
+        # Blender loads UDIM tiles from the library files, so those must be written first
+        report(None, "Saving to texture library...")
+        start = time.perf_counter()
+        _, tiled = split_udim_maps(library.put(params, images, constants))
+        record_stage(trace, "library_save", start)
+    else:
+        # Applying needs only the pixels; the PNG encode runs alongside. Decode
+        # first so the two threads never load the same lazy JPEG at once.
+        for img in images.values():
+            if not isinstance(img, tuple):
+                img.load()
+        library.put_in_background(params, images, constants)
+    images = plain
+
+    # Decode once here so the main thread only has to copy pixels (local
+    # handoffs are pixel buffers already)
+    report(None, "Decoding texture images...")
+    start = time.perf_counter()
+    textures = {
+        tex_type: img if isinstance(img, tuple) else image_to_pixels(img)
+        for tex_type, img in images.items()
+    }
+    lods = build_lod_chains(textures)
+    textures.update(tiled)
+    record_stage(trace, "pixels", start)
+
+    report(1.0, "Complete!")
+    return textures, lods, constants
+
 
 # ============================================================================
 # Operators
@@ -302,62 +2497,134 @@ class AITEX_OT_GenerateTextures(Operator):
     _progress = 0.0
     _status = "Initializing..."
     _textures = None
+    _lods = None
+    _constants = None
     _error = None
     _prompt = ""
+    _library_key = ""
+    _applying = False
+    _apply_result = None
+    _use_placeholder = False
+    _placeholder = None
+    _placeholder_applying = False
+    _placeholder_shown = False
+    _abandoned = False
+    _trace = None
     
     def modal(self, context, event):
         if event.type == 'TIMER':
             # Update progress display
             context.area.tag_redraw()
+
+            # Show the procedural preview while the AI job runs (dropped if
+            # the real textures beat it)
+            placeholder, self._placeholder = self._placeholder, None
+            if placeholder is not None and self._thread.is_alive():
+                textures, constants = placeholder
+                self._placeholder_applying = True
+                schedule_apply(
+                    iter_apply_steps(context, textures, self._prompt, self._library_key, constants=constants),
+                    self._on_placeholder_applied
+                )
             
-            # Check if generation is complete
-            if self._thread and not self._thread.is_alive():
-                # Generation finished
-                context.window_manager.event_timer_remove(self._timer)
-                props = context.scene.ai_texture_props
-                props.is_generating = False
-                
+            # Textures are being applied in time slices (see schedule_apply)
+            if self._applying:
+                if self._apply_result is None:
+                    return {'PASS_THROUGH'}
+                self._finish(context)
+                error = self._apply_result[0]
+                if error is not None:
+                    self.report({'ERROR'}, f"Error applying: {str(error)}")
+                    return {'CANCELLED'}
+                self.report({'INFO'}, "✅ Textures generated and applied!")
+                return {'FINISHED'}
+
+            # Check if generation is complete (once the preview is in place)
+            if self._thread and not self._thread.is_alive() and not self._placeholder_applying:
                 if self._error:
+                    self._finish(context)
+                    self._abandon_placeholder()
                     self.report({'ERROR'}, f"Error: {self._error}")
                     return {'CANCELLED'}
                 
-                if self._textures:
-                    try:
-                        # Apply textures to material
-                        self.apply_to_material(context, self._textures, self._prompt)
-                        self.report({'INFO'}, "✅ Textures generated and applied!")
-                        return {'FINISHED'}
-                    except Exception as e:
-                        self.report({'ERROR'}, f"Error applying: {str(e)}")
-                        return {'CANCELLED'}
+                if self._textures is not None:
+                    # Apply textures to material a slice at a time
+                    self._applying = True
+                    self._status = "Applying textures..."
+                    context.scene.ai_texture_props.generation_status = self._status
+                    schedule_apply(
+                        iter_apply_steps(
+                            context, self._textures, self._prompt, self._library_key, self._lods,
+                            constants=self._constants
+                        ),
+                        self._on_applied,
+                        self._trace
+                    )
+                    return {'PASS_THROUGH'}
                 
+                self._finish(context)
                 return {'CANCELLED'}
             
             # Update status display
             props = context.scene.ai_texture_props
             props.generation_progress = self._progress
             props.generation_status = self._status
+            context.workspace.status_text_set(f"AI Textures: {self._progress * 100:.0f}% - {self._status}")
             
             # Force UI redraw
             for area in context.screen.areas:
                 if area.type == 'NODE_EDITOR':
                     area.tag_redraw()
         
-        elif event.type in {'ESC'}:
+        elif event.type in {'ESC'} and not self._applying:
             # Cancel generation
-            context.window_manager.event_timer_remove(self._timer)
-            props = context.scene.ai_texture_props
-            props.is_generating = False
+            self._finish(context)
+            self._abandon_placeholder()
             self.report({'WARNING'}, "Generation cancelled")
             return {'CANCELLED'}
         
-        return {'RUNNING_MODAL'}
+        # Leave the viewport and other editors usable meanwhile
+        return {'PASS_THROUGH'}
+
+    def _on_applied(self, error):
+        self._apply_result = (error,)
+
+    def _on_placeholder_applied(self, error):
+        self._placeholder_applying = False
+        if error is not None:
+            print(f"⚠️ Procedural preview failed: {error}")
+            return
+        self._placeholder_shown = True
+        if self._abandoned:
+            # Cancelled while the preview was being applied
+            self._abandon_placeholder()
+
+    def _abandon_placeholder(self):
+        """The job failed or was cancelled: the preview must not pass for its result.
+
+        The material keeps the preview but loses its generation id, so
+        lookups by id (and a later run of the same request) don't take it
+        for finished textures; aitex_placeholder marks it.
+        """
+        self._abandoned = True
+        if not self._placeholder_shown:
+            return
+        mat = bpy.data.materials.get(ai_material_name(self._prompt, self._library_key))
+        if mat is not None and "aitex_generation_id" in mat:
+            del mat["aitex_generation_id"]
+            mat["aitex_placeholder"] = True
+            invalidate_material_registry()
+
+    def _finish(self, context):
+        context.window_manager.event_timer_remove(self._timer)
+        context.workspace.status_text_set(None)
+        context.scene.ai_texture_props.is_generating = False
     
     def execute(self, context):
         props = context.scene.ai_texture_props
         
         # Check if Backend URL is set
-        if not props.backend_url:
+        if props.backend_type == 'AI' and not props.backend_url:
             self.report({'ERROR'}, "Please set your Backend URL!")
             return {'CANCELLED'}
 
@@ -369,21 +2636,42 @@ class AITEX_OT_GenerateTextures(Operator):
         # Get prompt
         self._prompt = props.prompt
         if props.material_type != 'CUSTOM':
-            self._prompt = self.get_preset_prompt(props.material_type)
+            self._prompt = get_preset_prompt(props.material_type)
         
+        if props.use_udim and not get_udim_tiles(props.target_object):
+            self.report({'ERROR'}, "UDIM mode needs a mesh with UVs in tiles 1001-1100!")
+            return {'CANCELLED'}
+
+        # Requests with identical parameters share one library entry
+        params = build_request_params(props, self._prompt, props.target_object)
+        self._library_key = TextureLibrary.make_key(params)
+
         # Reset progress
         self._progress = 0.0
         self._status = "Starting generation..."
         self._textures = None
+        self._lods = None
+        self._constants = None
         self._error = None
+        self._applying = False
+        self._apply_result = None
+        self._use_placeholder = props.backend_type == 'AI' and props.procedural_placeholder
+        self._placeholder = None
+        self._placeholder_applying = False
+        self._placeholder_shown = False
+        self._abandoned = False
+        library = get_library(props)
+        self._trace = new_trace(params, library.root)
         props.is_generating = True
         props.generation_progress = 0.0
         props.generation_status = self._status
         
+        _backend_pool.configure(get_backend_urls(props))
+
         # Start generation in background thread
         self._thread = threading.Thread(
             target=self._generate_thread,
-            args=(props.backend_url, self._prompt, int(props.resolution), props.make_tileable)
+            args=(get_backend_urls(props), params, library, props.reuse_library)
         )
         self._thread.start()
         
@@ -393,267 +2681,245 @@ class AITEX_OT_GenerateTextures(Operator):
         
         return {'RUNNING_MODAL'}
     
-    def _generate_thread(self, backend_url, prompt, resolution, make_tileable):
+    def _report(self, progress, status):
+        if progress is not None:
+            self._progress = progress
+        self._status = status
+
+    def _generate_thread(self, backend_urls, params, library, reuse_library):
         """Background thread for generation"""
         try:
-            self._status = "Connecting to backend..."
-            self._progress = 0.1
-            
-            # Call Backend API
-            self._textures = self.generate_via_backend(backend_url, prompt, resolution, make_tileable)
-            
-            self._progress = 1.0
-            self._status = "Complete!"
-            
+            # Library hits need no preview; otherwise it is built alongside the
+            # backend request instead of delaying it
+            cached = reuse_library and library.get_by_key(self._library_key)[0] is not None
+            if self._use_placeholder and not cached:
+                threading.Thread(target=self._build_placeholder, args=(params,), daemon=True).start()
+            self._textures, self._lods, self._constants = fetch_textures(
+                backend_urls, params, library, reuse_library, self._report, trace=self._trace
+            )
         except Exception as e:
+            finish_trace(self._trace, e)
             self._error = str(e)
             self._status = f"Error: {str(e)}"
-    
-    def get_preset_prompt(self, material_type):
-        """Get preset prompt based on material type"""
-        presets = {
-            # Metals
-            'METAL_RUSTED': "rusty worn metal surface with scratches, orange rust, blue oxidation, weathering",
-            'METAL_COPPER': "hammered copper surface with verdigris patina, dents and texture",
-            'METAL_BRASS': "polished brass metal surface with slight tarnish and reflections",
-            'METAL_ALUMINUM': "brushed aluminum metal with linear grain pattern and scratches",
-            'METAL_GOLD': "pure gold metal surface with subtle scratches and high reflectivity",
-            'METAL_CHROME': "polished chrome metal with mirror-like reflections",
-            'METAL_STEEL': "brushed stainless steel with directional grain and fingerprints",
-            'METAL_IRON': "rough cast iron surface with pitted texture and dark finish",
-            
-            # Woods
-            'WOOD_OAK': "oak wood planks with prominent grain, knots, and natural variations",
-            'WOOD_PINE': "pine wood surface with visible grain lines and knots",
-            'WOOD_MAHOGANY': "rich dark mahogany wood with fine grain and polished finish",
-            'WOOD_BAMBOO': "bamboo texture with distinctive nodes and natural segmentation",
-            'WOOD_RECLAIMED': "old weathered reclaimed wood with cracks, nail holes, and aged patina",
-            
-            # Stones
-            'STONE_GRANITE': "polished granite stone with speckled pattern and crystalline structure",
-            'STONE_MARBLE': "white marble with elegant gray veins and polished surface",
-            'STONE_SANDSTONE': "rough sandstone blocks with layered sediment and weathering",
-            'STONE_COBBLE': "dry cobblestone pavement with rectangular gray stones, individual brick pattern, matte finish, mortar gaps between stones, realistic outdoor paving",
-            'STONE_ROUGH': "rough stone wall surface with cracks, texture, and natural irregularities",
-            
-            # Modern/Tech
-            'CARBON_FIBER': "carbon fiber weave pattern with distinctive twill texture and glossy epoxy",
-            'CONCRETE': "rough concrete surface with aggregate, pitting, and subtle cracks",
-            'LEATHER': "worn leather texture with creases, wrinkles, and natural grain",
-            'FABRIC': "woven fabric texture with detailed fiber pattern and slight roughness",
-            'PLASTIC': "smooth molded plastic surface with subtle imperfections",
-            'RUBBER': "textured rubber surface with grip pattern and matte finish",
-        }
-        return presets.get(material_type, "")
-    
-    def generate_via_backend(self, backend_url, prompt, resolution, make_tileable):
-        """Send request to backend and get textures back"""
-        
-        self._progress = 0.2
-        self._status = "Sending request to backend..."
-        
-        # Prepare request
-        payload = {
-            "prompt": prompt,
-            "resolution": resolution,
-            "tileable": make_tileable
-        }
-        
-        self._progress = 0.3
-        self._status = "Generating textures with AI..."
-        
-        if "ngrok" in backend_url and backend_url.startswith("https://"):
-            print("ℹ️ Detected ngrok URL - Forcing HTTP to bypass SSL issues")
-            backend_url = backend_url.replace("https://", "http://")
 
+    def _build_placeholder(self, params):
+        """Synthesize the procedural preview (picked up by modal)."""
         try:
-            response = requests.post(
-                f"{backend_url}/generate",
-                json=payload,
-                timeout=600, 
+            self._placeholder = generate_procedural(
+                params["prompt"], min(params["resolution"], PROCEDURAL_PREVIEW_SIZE)
             )
         except Exception as e:
-            raise Exception(f"Connection failed: {str(e)}")
-        
-        if response.status_code != 200:
-            raise Exception(f"Backend API error: {response.status_code}")
-        
-        self._progress = 0.7
-        self._status = "Receiving generated textures..."
-        
-        # Parse response
-        data = response.json()
-        
-        self._progress = 0.85
-        self._status = "Decoding texture images..."
-        
-        # Decode base64 images
-        textures = {}
-        for tex_type in ['diffuse', 'roughness', 'normal', 'metallic']:
-            if tex_type in data:
-                img_data = base64.b64decode(data[tex_type])
-                img = Image.open(io.BytesIO(img_data))
-                textures[tex_type] = img
-        
-        self._progress = 0.95
-        self._status = "Preparing to apply textures..."
-        
-        return textures
-    
-    def apply_to_material(self, context, textures, prompt):
-        """Create material and apply textures"""
-        
-        # NEW: Get the target object from properties
-        props = context.scene.ai_texture_props
+            print(f"⚠️ Procedural preview failed: {e}")
+
+
+# ============================================================================
+# Material Setup
+# ============================================================================
+def ai_material_name(prompt, library_key):
+    """Name of the material for a library entry (one per entry, so equal prompts don't collide)."""
+    return f"AI_{prompt[:20]}_{library_key[:6]}"
+
+
+def iter_texture_images(img_name, texture, lod_chain=(), is_data=False):
+    """Create the master image for one map plus its LOD levels, yielding after each image.
+
+    Generator; its return value is the master image.
+    """
+    width, height, pixels = texture
+    master = create_image_from_pixels(img_name, width, height, pixels, is_data=is_data)
+    master["aitex_master"] = img_name
+    yield
+
+    # Drop levels left over from an earlier run, then add the new chain
+    for level_size in LOD_SIZES:
+        stale = bpy.data.images.get(f"{img_name}@{level_size}")
+        if stale is not None:
+            bpy.data.images.remove(stale)
+    for level_width, level_height, level_pixels in lod_chain:
+        level = create_image_from_pixels(
+            f"{img_name}@{level_width}", level_width, level_height, level_pixels, is_data=is_data
+        )
+        level["aitex_master"] = img_name
+        yield
+    return master
+
+
+def iter_apply_steps(context, textures, prompt, library_key, lods=None, target_obj=None, slot_index=0,
+                     constants=None):
+    """Create material and apply textures ({map type: (width, height, pixels)}) step by step
+
+    Generator that yields between small units of main-thread work (one image
+    upload, the node setup, the final assignment) so callers can spread it
+    over several timer ticks; its return value is the material.
+    lods optionally holds the precomputed smaller levels for each map
+    (see build_lod_chains). A UDIM map is {tile: PNG path} instead of
+    pixels (see split_udim_maps). Uniform maps arrive in constants
+    ({map type: [r, g, b]}) and are set as group input values instead of
+    images. The material goes into slot_index of target_obj, which defaults
+    to the Target Object property.
+    """
+    props = context.scene.ai_texture_props
+    if target_obj is None:
         target_obj = props.target_object
-        
-        if not target_obj:
-            print("No target object selected!")
-            return
 
-        # Get or create material
-        mat_name = f"AI_{prompt[:20]}"
-        mat = bpy.data.materials.get(mat_name)
-        if mat is None:
-            mat = bpy.data.materials.new(name=mat_name)
-        
-        mat.use_nodes = True
-        nodes = mat.node_tree.nodes
-        links = mat.node_tree.links
-        
-        # Clear existing nodes
-        nodes.clear()
-        
-        # Add Principled BSDF
-        bsdf = nodes.new('ShaderNodeBsdfPrincipled')
-        bsdf.location = (0, 0)
-        
-        # Add Material Output
-        output = nodes.new('ShaderNodeOutputMaterial')
-        output.location = (300, 0)
-        links.new(bsdf.outputs['BSDF'], output.inputs['Surface'])
+    if not target_obj:
+        print("No target object selected!")
+        return None
 
-        # Mapping setup
-        mapping = ensure_mapping_setup(mat)
-        
-        # Save and add texture nodes
-        y_offset = 0
-        temp_dir = tempfile.gettempdir()
+    # Get or create material (one per library entry, so equal prompts don't collide).
+    # An existing material keeps its nodes; only the images are swapped.
+    mat_name = ai_material_name(prompt, library_key)
+    mat = bpy.data.materials.get(mat_name)
+    if mat is None:
+        mat = bpy.data.materials.new(name=mat_name)
 
-        # Track references for later wiring (e.g., height boost)
-        diffuse_node = None
-        normal_node = None
-        
-        for tex_type, img in textures.items():
-            # Save image
-            img_path = os.path.join(temp_dir, f"{mat_name}_{tex_type}.png")
-            img.save(img_path)
-            
-            # Load into Blender
-            bpy_img = bpy.data.images.load(img_path, check_existing=True)
-            
-            # Create texture node
-            tex_node = nodes.new('ShaderNodeTexImage')
-            tex_node.image = bpy_img
-            tex_node.location = (-300, y_offset)
-            
-            # Connect mapping to tex node
-            if tex_node.inputs.get("Vector"):
-                links.new(mapping.outputs["Vector"], tex_node.inputs["Vector"])
-            
-            # Connect to BSDF
-            if tex_type == 'diffuse':
-                links.new(tex_node.outputs['Color'], bsdf.inputs['Base Color'])
-            elif tex_type == 'roughness':
-                tex_node.image.colorspace_settings.name = 'Non-Color' # Important for roughness
-                links.new(tex_node.outputs['Color'], bsdf.inputs['Roughness'])
-            elif tex_type == 'metallic':
-                tex_node.image.colorspace_settings.name = 'Non-Color'
-                links.new(tex_node.outputs['Color'], bsdf.inputs['Metallic'])
-            elif tex_type == 'normal':
-                tex_node.image.colorspace_settings.name = 'Non-Color'
-                # Add Normal Map node
-                normal_node = nodes.new('ShaderNodeNormalMap')
-                normal_node.location = (-150, y_offset)
-                normal_node.inputs['Strength'].default_value = props.normal_strength
-                links.new(tex_node.outputs['Color'], normal_node.inputs['Color'])
-                links.new(normal_node.outputs['Normal'], bsdf.inputs['Normal'])
-            
-            y_offset -= 300
-
-        # Optional height/bump boost using diffuse as height
-        if props.use_height_boost and diffuse_node is not None:
-            # Add RGB to BW
-            rgb2bw = nodes.new('ShaderNodeRGBToBW')
-            rgb2bw.label = "AI Height BW"
-            rgb2bw.location = (diffuse_node.location.x + 200, diffuse_node.location.y)
-            links.new(diffuse_node.outputs['Color'], rgb2bw.inputs['Color'])
-
-            # Add Bump node
-            bump_node = nodes.new('ShaderNodeBump')
-            bump_node.label = "AI Height Bump"
-            bump_node.location = (rgb2bw.location.x + 200, rgb2bw.location.y)
-            bump_node.inputs['Strength'].default_value = props.height_strength
-
-            links.new(rgb2bw.outputs['Val'], bump_node.inputs['Height'])
-
-            # If normal node exists, feed it into bump Normal input to stack effects
-            if normal_node:
-                links.new(normal_node.outputs['Normal'], bump_node.inputs['Normal'])
-                # Redirect BSDF Normal to bump output (replace prior link)
-                # Remove previous normal->bsdf link
-                for l in list(bsdf.inputs['Normal'].links):
-                    links.remove(l)
-                links.new(bump_node.outputs['Normal'], bsdf.inputs['Normal'])
-            else:
-                # No normal map; just use bump to BSDF
-                links.new(bump_node.outputs['Normal'], bsdf.inputs['Normal'])
-        
-        # Assign material to the TARGET object (not just active object)
-        if len(target_obj.data.materials) == 0:
-            target_obj.data.materials.append(mat)
+    mat.use_nodes = True
+    mat["aitex_generation_id"] = library_key
+    if "aitex_placeholder" in mat:
+        del mat["aitex_placeholder"]
+    mat["aitex_prompt"] = prompt
+    invalidate_material_registry()
+    pbr = ensure_pbr_setup(mat)
+    pbr.inputs["Normal Strength"].default_value = props.normal_strength
+    pbr.inputs["Height Strength"].default_value = props.height_strength if props.use_height_boost else 0.0
+    yield
+
+    for tex_type, texture in textures.items():
+        if isinstance(texture, dict):
+            # UDIM map: {tile: PNG path}
+            bpy_img = yield from iter_udim_image(f"{mat_name}_{tex_type}", texture, is_data=(tex_type != 'diffuse'))
         else:
-            target_obj.data.materials[0] = mat
-        
-        # Store material reference in properties for resize functionality
-        props.last_generated_material = mat.name
+            # Fill Blender images straight from the decoded buffers
+            bpy_img = yield from iter_texture_images(
+                f"{mat_name}_{tex_type}", texture, (lods or {}).get(tex_type, ()), is_data=(tex_type != 'diffuse')
+            )
+        ensure_texture_node(mat, tex_type).image = bpy_img
+
+    # Switching between separate and packed maps leaves the other layout behind,
+    # and constant maps need no image node at all
+    for tex_type in MAP_TYPES:
+        if tex_type not in textures:
+            remove_texture_node(mat, tex_type)
+    for tex_type, value in (constants or {}).items():
+        set_constant_map(pbr, tex_type, value)
+
+    # Assign material to the TARGET object (not just active object)
+    while len(target_obj.data.materials) <= slot_index:
+        target_obj.data.materials.append(None)
+    target_obj.data.materials[slot_index] = mat
+
+    # Store material reference in properties for resize functionality
+    props.last_generated_material = mat.name
+
+    # Apply mapping scale values to the mapping node
+    apply_mapping_scale(props, mat)
+
+    # Start on the generated resolution (the master), not the Resize To setting
+    sizes = [texture[0] for texture in textures.values() if not isinstance(texture, dict)]
+    if sizes:
+        set_material_lod(mat, max(sizes))
+    return mat
+
+
+def apply_to_material(context, textures, prompt, library_key, lods=None, target_obj=None, slot_index=0,
+                      constants=None):
+    """Create material and apply textures in one go (see iter_apply_steps)."""
+    start_time = time.perf_counter()
+    steps = iter_apply_steps(context, textures, prompt, library_key, lods, target_obj, slot_index, constants)
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            mat = done.value
+            break
+    if mat is not None:
+        print(f"⏱️ Applied {mat.name} in {time.perf_counter() - start_time:.3f}s")
+    return mat
+
+
+# Main-thread time one timer tick may spend applying results. A single image
+# upload can't be split, so a tick ends after the step that crosses it.
+APPLY_TICK_BUDGET = 0.010  # seconds
+
+
+def schedule_apply(steps, on_done, trace=None):
+    """Run an iter_apply_steps generator through bpy.app.timers under a per-tick budget.
+
+    The UI gets an event-loop iteration between ticks. on_done(error) is
+    called on the main thread when the generator finishes (error is None)
+    or raises. A trace gets the apply timings and is then finished.
+
+    Returns a function that cancels the apply if it is still pending; on_done
+    is not called then.
+    """
+    busy = [0.0]
+    start = time.perf_counter()
+
+    def tick():
+        tick_start = time.perf_counter()
+        try:
+            while time.perf_counter() - tick_start < APPLY_TICK_BUDGET:
+                next(steps)
+        except StopIteration as done:
+            busy[0] += time.perf_counter() - tick_start
+            if done.value is not None:
+                print(f"⏱️ Applied {done.value.name} using {busy[0]:.3f}s of main-thread time")
+            if trace is not None:
+                record_stage(trace, "apply", start)
+                trace["apply_main_thread"] = round(busy[0], 3)
+                finish_trace(trace)
+            on_done(None)
+            return None
+        except Exception as e:
+            if trace is not None:
+                finish_trace(trace, e)
+            on_done(e)
+            return None
+        busy[0] += time.perf_counter() - tick_start
+        return 0.0
+
+    def cancel():
+        if bpy.app.timers.is_registered(tick):
+            bpy.app.timers.unregister(tick)
+            steps.close()
+            if trace is not None:
+                finish_trace(trace, "Cancelled")
+
+    bpy.app.timers.register(tick, first_interval=0.0)
+    return cancel
 
-        # Apply mapping scale values to the mapping node
-        apply_mapping_scale(props, mat)
 
 # ============================================================================
 # Resize Operator
 # ============================================================================
 class AITEX_OT_ResizeTextures(Operator):
-    """Resize textures in the last generated material"""
+    """Resize textures of AI materials in the background"""
     bl_idname = "aitex.resize_textures"
     bl_label = "Resize Textures"
     bl_options = {'REGISTER', 'UNDO'}
-    
+
+    _timer = None
+    _executor = None
+    _queue = None
+    _futures = None
+    _material_names = None
+    _total = 0
+    _resized_count = 0
+    _new_resolution = 0
+    _resize_filter = None
+    _max_in_flight = 1
+
     def execute(self, context):
         props = context.scene.ai_texture_props
-        
-        # Find the material
-        mat_name = props.last_generated_material if hasattr(props, 'last_generated_material') else None
-        if not mat_name:
-            # Try to find any AI-generated material
-            for mat in bpy.data.materials:
-                if mat.use_nodes and mat.name.startswith("AI_"):
-                    mat_name = mat.name
-                    break
-        
-        if not mat_name:
+
+        materials = get_ai_materials(context, props.resize_scope)
+        if not materials:
             self.report({'ERROR'}, "No AI-generated material found! Generate textures first.")
             return {'CANCELLED'}
-        
-        mat = bpy.data.materials.get(mat_name)
-        if not mat or not mat.use_nodes:
-            self.report({'ERROR'}, f"Material '{mat_name}' not found or has no nodes!")
-            return {'CANCELLED'}
-        
+
         # Get new resolution
-        new_resolution = int(props.resize_resolution)
-        
+        self._new_resolution = int(props.resize_resolution)
+
         # Get resize filter
         filter_map = {
             'LANCZOS': Image.LANCZOS,
@@ -661,88 +2927,134 @@ class AITEX_OT_ResizeTextures(Operator):
             'BILINEAR': Image.BILINEAR,
             'NEAREST': Image.NEAREST,
         }
-        resize_filter = filter_map.get(props.resize_filter, Image.LANCZOS)
-        
-        # Find all texture image nodes
-        nodes = mat.node_tree.nodes
-        resized_count = 0
-        
-        for node in nodes:
-            if node.type == 'TEX_IMAGE' and node.image:
+        self._resize_filter = filter_map.get(props.resize_filter, Image.LANCZOS)
+
+        # Collect (source image, destination image) jobs, shared images only once.
+        # LOD-managed maps switch levels instantly; only a level above every
+        # existing one is resampled, always from the master. Other images are
+        # resized in place (destination None).
+        self._material_names = [mat.name for mat in materials]
+        jobs = []
+        for mat in materials:
+            set_material_lod(mat, self._new_resolution)
+            for node in mat.node_tree.nodes:
+                if node.type != 'TEX_IMAGE' or not node.image:
+                    continue
                 img = node.image
-                old_size = img.size
-                
-                # Skip if already at target resolution
-                if old_size[0] == new_resolution and old_size[1] == new_resolution:
+                if img.source == 'TILED':
+                    # UDIM tiles keep their generated size
                     continue
-                
-                # Resize the image
-                try:
-                    width, height = old_size
-                    
-                    # Save current image to temp file
-                    temp_dir = tempfile.gettempdir()
-                    temp_path = os.path.join(temp_dir, f"aitex_temp_{img.name}_{id(img)}.png")
-                    
-                    # Save image (use filepath if available, otherwise save_render)
-                    if img.filepath and os.path.exists(bpy.path.abspath(img.filepath)):
-                        temp_path = bpy.path.abspath(img.filepath)
-                        pil_img = Image.open(temp_path)
-                    else:
-                        # Save to temp file
-                        img.save_render(temp_path)
-                        pil_img = Image.open(temp_path)
-                    
-                    # Convert to RGB if needed (handles RGBA, L, etc.)
-                    if pil_img.mode != 'RGB':
-                        pil_img = pil_img.convert('RGB')
-                    
-                    # Resize using PIL with selected filter
-                    resized_pil = pil_img.resize((new_resolution, new_resolution), resize_filter)
-                    
-                    # Save resized image temporarily
-                    resized_temp_path = os.path.join(temp_dir, f"aitex_resized_{img.name}_{id(img)}.png")
-                    resized_pil.save(resized_temp_path, "PNG")
-                    
-                    # Update Blender image: scale first, then reload pixels
-                    img.scale(new_resolution, new_resolution)
-                    
-                    # Load resized image data
-                    resized_pil_rgba = resized_pil.convert('RGBA')
-                    resized_data = list(resized_pil_rgba.getdata())
-                    
-                    # Convert to Blender pixel format (flat array of RGBA floats)
-                    blender_pixels = []
-                    for r, g, b, a in resized_data:
-                        blender_pixels.extend([r / 255.0, g / 255.0, b / 255.0, a / 255.0])
-                    
-                    # Update image pixels
-                    img.pixels[:] = blender_pixels
-                    img.update()
-                    
-                    # Clean up temporary files
-                    try:
-                        if os.path.exists(temp_path) and temp_path.startswith(temp_dir):
-                            os.remove(temp_path)
-                        if os.path.exists(resized_temp_path):
-                            os.remove(resized_temp_path)
-                    except:
-                        pass  # Ignore cleanup errors
-                    
-                    resized_count += 1
-                    
-                except Exception as e:
-                    self.report({'WARNING'}, f"Could not resize {img.name}: {str(e)}")
-                    import traceback
-                    print(f"Resize error: {traceback.format_exc()}")
+                master_name = img.get("aitex_master")
+                if master_name:
+                    level = get_lod_image(master_name, self._new_resolution)
+                    if level is None or level.size[0] >= self._new_resolution:
+                        continue
+                    job = (master_name, f"{master_name}@{self._new_resolution}")
+                elif tuple(img.size) == (self._new_resolution, self._new_resolution):
                     continue
-        
-        if resized_count > 0:
-            self.report({'INFO'}, f"✅ Resized {resized_count} texture(s) to {new_resolution}x{new_resolution}")
-        else:
-            self.report({'INFO'}, "All textures already at target resolution")
-        
-        return {'FINISHED'}
+                else:
+                    job = (img.name, None)
+                if job not in jobs:
+                    jobs.append(job)
+
+        if not jobs:
+            self.report({'INFO'}, f"Textures switched to {self._new_resolution}x{self._new_resolution}")
+            return {'FINISHED'}
+
+        # Resampling runs in worker threads (PIL releases the GIL while filtering);
+        # pixel reads and uploads stay on the main thread in modal().
+        workers = max(1, min(4, os.cpu_count() or 1))
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._max_in_flight = workers * 2  # bounds the float buffers held in memory
+        self._queue = deque(jobs)
+        self._futures = {}
+        self._total = len(jobs)
+        self._resized_count = 0
+
+        props.is_resizing = True
+        props.resize_progress = 0.0
+
+        self._timer = context.window_manager.event_timer_add(0.05, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        props = context.scene.ai_texture_props
+
+        if event.type == 'ESC':
+            self._finish(context)
+            self.report({'WARNING'}, f"Resize cancelled after {self._resized_count}/{self._total} texture(s)")
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        # Upload finished results
+        for job, future in list(self._futures.items()):
+            if not future.done():
+                continue
+            del self._futures[job]
+            source_name, dest_name = job
+            img = bpy.data.images.get(source_name)
+            try:
+                resized = future.result()
+                if img is None:
+                    continue
+                if dest_name:
+                    level = create_image_from_pixels(
+                        dest_name, self._new_resolution, self._new_resolution, resized,
+                        is_data=img.colorspace_settings.is_data
+                    )
+                    level["aitex_master"] = source_name
+                else:
+                    img.scale(self._new_resolution, self._new_resolution)
+                    img.pixels.foreach_set(resized)
+                    img.update()
+                self._resized_count += 1
+            except Exception as e:
+                self.report({'WARNING'}, f"Could not resize {source_name}: {str(e)}")
+                import traceback
+                print(f"Resize error: {traceback.format_exc()}")
+
+        # Keep the workers fed
+        while self._queue and len(self._futures) < self._max_in_flight:
+            job = self._queue.popleft()
+            img = bpy.data.images.get(job[0])
+            if img is None:
+                continue
+            width, height = img.size
+            pixels = read_image_pixels(img)
+            self._futures[job] = self._executor.submit(
+                resize_pixels, pixels, width, height,
+                self._new_resolution, self._new_resolution, self._resize_filter
+            )
+
+        done = self._total - len(self._queue) - len(self._futures)
+        props.resize_progress = done / self._total
+        for area in context.screen.areas:
+            if area.type in {'NODE_EDITOR', 'VIEW_3D'}:
+                area.tag_redraw()
+
+        if not self._queue and not self._futures:
+            for mat_name in self._material_names:
+                mat = bpy.data.materials.get(mat_name)
+                if mat is not None and mat.use_nodes:
+                    set_material_lod(mat, self._new_resolution)
+            self._finish(context)
+            self.report(
+                {'INFO'},
+                f"✅ Resized {self._resized_count} texture(s) to {self._new_resolution}x{self._new_resolution}"
+            )
+            return {'FINISHED'}
+
+        return {'PASS_THROUGH'}
+
+    def _finish(self, context):
+        context.window_manager.event_timer_remove(self._timer)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        props = context.scene.ai_texture_props
+        props.is_resizing = False
+        props.resize_progress = 0.0
 
 
 # ============================================================================
@@ -759,7 +3071,7 @@ class AITEX_OT_ResetMappingScale(Operator):
         props.map_scale_x = 1.0
         props.map_scale_y = 1.0
         props.map_scale_z = 1.0
-        apply_mapping_scale(props)
+        apply_mapping_scale(props, get_ai_material(props, context.object))
         self.report({'INFO'}, "Mapping scale reset to 1,1,1")
         return {'FINISHED'}
 
@@ -772,16 +3084,23 @@ class AITEX_OT_ApplyNormalStrength(Operator):
 
     def execute(self, context):
         props = context.scene.ai_texture_props
-        mat = get_ai_material(props)
+        mat = get_ai_material(props, context.object)
         if not mat or not mat.use_nodes:
             self.report({'ERROR'}, "No AI material found to update.")
             return {'CANCELLED'}
 
         updated = 0
-        for node in mat.node_tree.nodes:
-            if node.type == 'NORMAL_MAP':
-                node.inputs['Strength'].default_value = props.normal_strength
-                updated += 1
+        pbr = mat.node_tree.nodes.get("AITEX_PBR")
+        if pbr is not None:
+            pbr.inputs["Normal Strength"].default_value = props.normal_strength
+            pbr.inputs["Height Strength"].default_value = props.height_strength if props.use_height_boost else 0.0
+            updated += 1
+        else:
+            # Materials generated before the shared node group
+            for node in mat.node_tree.nodes:
+                if node.type == 'NORMAL_MAP':
+                    node.inputs['Strength'].default_value = props.normal_strength
+                    updated += 1
 
         if updated == 0:
             self.report({'WARNING'}, "No Normal Map node found in AI material.")
@@ -790,6 +3109,539 @@ class AITEX_OT_ApplyNormalStrength(Operator):
         self.report({'INFO'}, f"Normal strength set to {props.normal_strength}")
         return {'FINISHED'}
 
+
+# ============================================================================
+# Batch Operators
+# ============================================================================
+class AITEX_OT_BatchAddSelected(Operator):
+    """Add the selected mesh objects to the batch queue"""
+    bl_idname = "aitex.batch_add_selected"
+    bl_label = "Add Selected"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        props = context.scene.ai_texture_props
+        queued = {(item.target_object, item.slot_index) for item in props.batch_items}
+        added = 0
+        for obj in context.selected_objects:
+            if obj.type != 'MESH':
+                continue
+            slot_count = len(obj.material_slots) if props.batch_per_slot else 1
+            for slot_index in range(max(slot_count, 1)):
+                if (obj, slot_index) in queued:
+                    continue
+                item = props.batch_items.add()
+                item.name = f"{obj.name}:{slot_index}"
+                item.target_object = obj
+                item.slot_index = slot_index
+                item.material_type = props.material_type
+                item.prompt = props.prompt
+                added += 1
+        props.batch_index = len(props.batch_items) - 1
+        self.report({'INFO'}, f"Added {added} item(s) to the batch queue")
+        return {'FINISHED'}
+
+
+class AITEX_OT_BatchRemove(Operator):
+    """Remove the active item from the batch queue"""
+    bl_idname = "aitex.batch_remove"
+    bl_label = "Remove"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        props = context.scene.ai_texture_props
+        if 0 <= props.batch_index < len(props.batch_items):
+            props.batch_items.remove(props.batch_index)
+            props.batch_index = min(props.batch_index, len(props.batch_items) - 1)
+        return {'FINISHED'}
+
+
+class AITEX_OT_BatchClear(Operator):
+    """Clear the batch queue"""
+    bl_idname = "aitex.batch_clear"
+    bl_label = "Clear Queue"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        props = context.scene.ai_texture_props
+        props.batch_items.clear()
+        props.batch_index = 0
+        return {'FINISHED'}
+
+
+class AITEX_OT_GenerateBatch(Operator):
+    """Generate textures for every queued object/slot, several requests at a time"""
+    bl_idname = "aitex.generate_batch"
+    bl_label = "Generate Batch"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    _timer = None
+    _executor = None
+    _futures = None
+    _jobs = None
+    _job_status = None
+    _traces = None
+    _applying = None
+    _total = 0
+    _done = 0
+    _failed = 0
+
+    def execute(self, context):
+        props = context.scene.ai_texture_props
+
+        if props.backend_type == 'AI' and not props.backend_url:
+            self.report({'ERROR'}, "Please set your Backend URL!")
+            return {'CANCELLED'}
+
+        items = [
+            item for item in props.batch_items
+            if item.target_object is not None and item.status != "Done"
+        ]
+        if not items:
+            self.report({'ERROR'}, "Batch queue is empty! Add objects first.")
+            return {'CANCELLED'}
+
+        library = get_library(props)
+        backend_urls = get_backend_urls(props)
+        _backend_pool.configure(backend_urls)
+        self._executor = ThreadPoolExecutor(max_workers=props.batch_concurrency)
+        # Keyed by library key: items asking for the same textures share one job
+        self._futures = {}
+        self._jobs = {}  # library key -> (params, [item names])
+        self._job_status = {}  # library key -> status text, written by workers
+        self._traces = {}
+        for item in items:
+            prompt = item.prompt
+            if item.material_type != 'CUSTOM':
+                prompt = get_preset_prompt(item.material_type)
+            params = build_request_params(props, prompt, item.target_object)
+            key = TextureLibrary.make_key(params)
+            item.status = "Queued"
+            if key in self._jobs:
+                self._jobs[key][1].append(item.name)
+                continue
+            self._jobs[key] = (params, [item.name])
+            self._traces[key] = new_trace(params, library.root)
+            self._futures[key] = self._executor.submit(
+                fetch_textures, backend_urls, params, library, props.reuse_library,
+                self._make_report(key), priority="batch", trace=self._traces[key]
+            )
+
+        self._total = len(items)
+        self._done = 0
+        self._failed = 0
+        self._applying = {}  # item name -> cancel function of its pending apply
+        props.is_batch_running = True
+        props.batch_progress = 0.0
+
+        self._timer = context.window_manager.event_timer_add(0.1, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def _make_report(self, key):
+        def report(progress, status):
+            self._job_status[key] = status
+        return report
+
+    def modal(self, context, event):
+        props = context.scene.ai_texture_props
+
+        if event.type == 'ESC':
+            self.cancel(context)
+            self.report({'WARNING'}, f"Batch cancelled after {self._done}/{self._total} item(s)")
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        # Mirror worker status into the queue (bpy data is main-thread only)
+        for key, status in list(self._job_status.items()):
+            for item_name in self._jobs[key][1]:
+                item = props.batch_items.get(item_name)
+                if item is not None and item.status != status:
+                    item.status = status
+
+        # Apply finished results while later ones are still generating
+        for key, future in list(self._futures.items()):
+            if not future.done():
+                continue
+            del self._futures[key]
+            self._job_status.pop(key, None)
+            params, item_names = self._jobs[key]
+            trace = self._traces[key]
+            try:
+                textures, lods, constants = future.result()
+            except Exception as e:
+                finish_trace(trace, e)
+                for item_name in item_names:
+                    self._mark_done(context, item_name, e)
+                continue
+            for item_name in item_names:
+                item = props.batch_items.get(item_name)
+                if item is None or item.target_object is None:
+                    self._mark_done(context, item_name, Exception("Object removed from queue"))
+                    continue
+                # Apply in time slices so the UI stays interactive while results land
+                item.status = "Applying..."
+                self._applying[item_name] = schedule_apply(
+                    iter_apply_steps(
+                        context, textures, params["prompt"], key, lods,
+                        target_obj=item.target_object, slot_index=item.slot_index, constants=constants
+                    ),
+                    lambda error, item_name=item_name: self._mark_done(bpy.context, item_name, error),
+                    trace
+                )
+                trace = None  # the first apply finishes the trace
+            if trace is not None:
+                finish_trace(trace, "Object removed from queue")
+
+        props.batch_progress = (self._done + self._failed) / self._total
+        for area in context.screen.areas:
+            if area.type in {'NODE_EDITOR', 'VIEW_3D'}:
+                area.tag_redraw()
+
+        if not self._futures and not self._applying:
+            self._finish(context)
+            if self._failed:
+                self.report({'WARNING'}, f"Batch finished: {self._done} done, {self._failed} failed")
+            else:
+                self.report({'INFO'}, f"✅ Batch finished: {self._done} material(s) applied")
+            return {'FINISHED'}
+
+        return {'PASS_THROUGH'}
+
+    def _mark_done(self, context, item_name, error):
+        self._applying.pop(item_name, None)
+        item = context.scene.ai_texture_props.batch_items.get(item_name)
+        if error is None:
+            self._done += 1
+            if item is not None:
+                item.status = "Done"
+        else:
+            self._failed += 1
+            if item is not None:
+                item.status = f"Error: {str(error)}"
+
+    def cancel(self, context):
+        """Stop the batch: drop queued jobs and applies that have not run yet."""
+        props = context.scene.ai_texture_props
+        cancelled = [name for key in self._futures for name in self._jobs[key][1]]
+        for item_name, cancel_apply in list(self._applying.items()):
+            cancel_apply()
+            cancelled.append(item_name)
+        self._applying.clear()
+        for item_name in cancelled:
+            item = props.batch_items.get(item_name)
+            if item is not None:
+                item.status = "Cancelled"
+        self._finish(context)
+
+    def _finish(self, context):
+        context.window_manager.event_timer_remove(self._timer)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        props = context.scene.ai_texture_props
+        props.is_batch_running = False
+
+
+class AITEX_OT_GenerateAtlas(Operator):
+    """Generate one shared texture atlas for every queued object/slot and repack their UVs into it"""
+    bl_idname = "aitex.generate_atlas"
+    bl_label = "Generate Atlas"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    _timer = None
+    _executor = None
+    _future = None
+    _params = None
+    _targets = None
+    _progress = 0.0
+    _status = ""
+    _apply_result = None
+    _trace = None
+
+    def execute(self, context):
+        props = context.scene.ai_texture_props
+
+        if props.backend_type == 'AI' and not props.backend_url:
+            self.report({'ERROR'}, "Please set your Backend URL!")
+            return {'CANCELLED'}
+
+        items = [
+            item for item in props.batch_items
+            if item.target_object is not None and item.status != "Done"
+        ]
+        if not items:
+            self.report({'ERROR'}, "Batch queue is empty! Add objects first.")
+            return {'CANCELLED'}
+        if props.backend_type != 'AI':
+            self.report({'ERROR'}, "Atlas generation needs the AI backend!")
+            return {'CANCELLED'}
+        if len(items) > ATLAS_MAX_REGIONS:
+            self.report({'ERROR'}, f"An atlas holds at most {ATLAS_MAX_REGIONS} items!")
+            return {'CANCELLED'}
+        grid = atlas_grid(len(items))
+        if int(props.resolution) // grid <= 2 * props.atlas_padding:
+            self.report({'ERROR'}, "Atlas regions too small; raise the resolution or lower the padding!")
+            return {'CANCELLED'}
+
+        prompts = []
+        for item in items:
+            prompt = item.prompt
+            if item.material_type != 'CUSTOM':
+                prompt = get_preset_prompt(item.material_type)
+            prompts.append(prompt)
+            item.status = "Queued"
+        self._params = build_atlas_params(props, prompts)
+        # (item name, object name, slot) per region, in region order
+        self._targets = [(item.name, item.target_object.name, item.slot_index) for item in items]
+
+        backend_urls = get_backend_urls(props)
+        _backend_pool.configure(backend_urls)
+        self._progress = 0.0
+        self._status = "Starting atlas generation..."
+        self._apply_result = None
+        library = get_library(props)
+        self._trace = new_trace(self._params, library.root)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._future = self._executor.submit(
+            fetch_textures, backend_urls, self._params, library, props.reuse_library, self._report,
+            priority="batch", trace=self._trace
+        )
+        props.is_batch_running = True
+        props.batch_progress = 0.0
+
+        self._timer = context.window_manager.event_timer_add(0.1, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def _report(self, progress, status):
+        if progress is not None:
+            self._progress = progress
+        self._status = status
+
+    def modal(self, context, event):
+        props = context.scene.ai_texture_props
+
+        if event.type == 'ESC' and self._future is not None:
+            self._set_status(props, "Cancelled")
+            self._finish(context)
+            self.report({'WARNING'}, "Atlas generation cancelled")
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        for area in context.screen.areas:
+            if area.type in {'NODE_EDITOR', 'VIEW_3D'}:
+                area.tag_redraw()
+
+        # Waiting for the time-sliced apply
+        if self._future is None:
+            if self._apply_result is None:
+                return {'PASS_THROUGH'}
+            self._finish(context)
+            error = self._apply_result[0]
+            if error is not None:
+                self._set_status(props, f"Error: {str(error)}")
+                self.report({'ERROR'}, f"Error applying atlas: {str(error)}")
+                return {'CANCELLED'}
+            props.batch_progress = 1.0
+            self.report({'INFO'}, f"✅ Atlas applied to {len(self._targets)} item(s)")
+            return {'FINISHED'}
+
+        props.batch_progress = self._progress
+        self._set_status(props, self._status)
+        if not self._future.done():
+            return {'PASS_THROUGH'}
+
+        try:
+            textures, lods, constants = self._future.result()
+        except Exception as e:
+            finish_trace(self._trace, e)
+            self._set_status(props, f"Error: {str(e)}")
+            self._finish(context)
+            self.report({'ERROR'}, f"Error: {str(e)}")
+            return {'CANCELLED'}
+        self._future = None
+        self._set_status(props, "Applying...")
+        schedule_apply(self._iter_atlas_steps(context, textures, lods, constants), self._on_applied, self._trace)
+        return {'PASS_THROUGH'}
+
+    def _iter_atlas_steps(self, context, textures, lods, constants):
+        """Build the shared material once, then assign it and repack UVs per region."""
+        props = context.scene.ai_texture_props
+        grid = self._params["atlas_grid"]
+        resolution = self._params["resolution"]
+        padding = self._params["atlas_padding"]
+        targets = [
+            (item_name, bpy.data.objects.get(obj_name), slot_index)
+            for item_name, obj_name, slot_index in self._targets
+        ]
+        first = next((target for target in targets if target[1] is not None), None)
+        if first is None:
+            return None
+
+        mat = yield from iter_apply_steps(
+            context, textures, ATLAS_PROMPT, TextureLibrary.make_key(self._params), lods,
+            target_obj=first[1], slot_index=first[2], constants=constants
+        )
+        # Regions are placed by the UVs, so the shared scale stays at 1
+        ensure_mapping_setup(mat).inputs["Scale"].default_value = (1.0, 1.0, 1.0)
+
+        repacked = set()
+        for index, (item_name, obj, slot_index) in enumerate(targets):
+            item = props.batch_items.get(item_name)
+            if obj is None:
+                if item is not None:
+                    item.status = "Error: object removed"
+                continue
+            while len(obj.data.materials) <= slot_index:
+                obj.data.materials.append(None)
+            obj.data.materials[slot_index] = mat
+
+            # Linked duplicates share their UVs; the first region wins
+            key = (obj.data.name, slot_index)
+            if key in repacked:
+                status = "Done (shared mesh)"
+            elif repack_uvs_to_region(obj, atlas_region_uv(index, grid, resolution, padding), slot_index):
+                status = "Done"
+            else:
+                status = "Error: no free UV map"
+            repacked.add(key)
+            if item is not None:
+                item.status = status
+            yield
+        return mat
+
+    def _on_applied(self, error):
+        self._apply_result = (error,)
+
+    def _set_status(self, props, status):
+        for item_name, _, _ in self._targets:
+            item = props.batch_items.get(item_name)
+            if item is not None and item.status != status:
+                item.status = status
+
+    def _finish(self, context):
+        context.window_manager.event_timer_remove(self._timer)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        context.scene.ai_texture_props.is_batch_running = False
+
+
+# ============================================================================
+# Library Operators
+# ============================================================================
+class AITEX_OT_ApplyFromLibrary(Operator):
+    """Apply the selected texture library entry to the target object"""
+    bl_idname = "aitex.apply_from_library"
+    bl_label = "Apply From Library"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    _timer = None
+    _executor = None
+    _future = None
+    _params = None
+    _library_key = ""
+    _target = ""
+    _apply_result = None
+
+    def execute(self, context):
+        props = context.scene.ai_texture_props
+        if not props.target_object:
+            self.report({'ERROR'}, "Please select a Target Object first!")
+            return {'CANCELLED'}
+
+        library = get_library(props)
+        params, paths = library.get_by_key(props.library_entry)
+        if params is None:
+            self.report({'ERROR'}, "Library entry not found!")
+            return {'CANCELLED'}
+        # get() refreshes the LRU timestamp and validates the files
+        paths = library.get(params)
+        if paths is None:
+            self.report({'ERROR'}, "Library entry files are missing!")
+            return {'CANCELLED'}
+
+        self._params = params
+        self._library_key = props.library_entry
+        self._target = props.target_object.name
+        self._apply_result = None
+        # PNG decoding and LOD building run on a worker, as for generated textures;
+        # no backend URLs, so a vanished entry fails instead of regenerating
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._future = self._executor.submit(fetch_textures, [], params, library, True)
+
+        self._timer = context.window_manager.event_timer_add(0.1, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC' and self._future is not None:
+            self._finish(context)
+            self.report({'WARNING'}, "Library apply cancelled")
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        # Waiting for the time-sliced apply
+        if self._future is None:
+            if self._apply_result is None:
+                return {'PASS_THROUGH'}
+            self._finish(context)
+            error = self._apply_result[0]
+            if error is not None:
+                self.report({'ERROR'}, f"Error applying: {str(error)}")
+                return {'CANCELLED'}
+            self.report({'INFO'}, "✅ Applied textures from library")
+            return {'FINISHED'}
+
+        if not self._future.done():
+            return {'PASS_THROUGH'}
+        try:
+            textures, lods, constants = self._future.result()
+        except Exception as e:
+            self._finish(context)
+            self.report({'ERROR'}, f"Could not load library entry: {str(e)}")
+            return {'CANCELLED'}
+        self._future = None
+        target = bpy.data.objects.get(self._target)
+        if target is None:
+            self._finish(context)
+            self.report({'ERROR'}, "Target object was removed!")
+            return {'CANCELLED'}
+        schedule_apply(
+            iter_apply_steps(
+                context, textures, self._params["prompt"], self._library_key, lods,
+                target_obj=target, constants=constants
+            ),
+            self._on_applied
+        )
+        return {'PASS_THROUGH'}
+
+    def _on_applied(self, error):
+        self._apply_result = (error,)
+
+    def _finish(self, context):
+        context.window_manager.event_timer_remove(self._timer)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AITEX_OT_ClearLibrary(Operator):
+    """Delete every entry in the texture library"""
+    bl_idname = "aitex.clear_library"
+    bl_label = "Clear Library"
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_confirm(self, event)
+
+    def execute(self, context):
+        get_library(context.scene.ai_texture_props).clear()
+        if _library_previews is not None:
+            _library_previews.clear()
+        self.report({'INFO'}, "Texture library cleared")
+        return {'FINISHED'}
+
 # ============================================================================
 # UI Panel
 # ============================================================================
@@ -811,12 +3663,30 @@ class AITEX_PT_MainPanel(Panel):
         
         # Backend Setup
         box = layout.box()
+        box.prop(props, "backend_type")
+        if props.backend_type == 'PROCEDURAL':
+            box.label(text="✓ Offline: no backend needed", icon='CHECKMARK')
+        else:
+            box.prop(props, "procedural_placeholder")
         box.label(text="Backend URL:", icon='URL')
         box.prop(props, "backend_url", text="")
         if not props.backend_url:
             box.label(text="⚠️ Set Backend URL", icon='ERROR')
         else:
             box.label(text="✓ Connected", icon='CHECKMARK')
+        box.prop(props, "extra_backend_urls", text="More")
+        pool_stats = _backend_pool.snapshot()
+        if len(pool_stats) > 1 or any(stats["jobs"] or stats["failures"] for _, stats in pool_stats):
+            col = box.column(align=True)
+            for url, stats in pool_stats:
+                icon = {True: 'CHECKMARK', False: 'ERROR', None: 'QUESTION'}[stats["healthy"]]
+                probe = f"{stats['probe_ms']:.0f}ms" if stats["probe_ms"] is not None else "-"
+                gen = f"{stats['generate_s']:.1f}s" if stats["generate_s"] is not None else "-"
+                col.label(
+                    text=f"{url.split('//')[-1][:24]}  q{stats['queue_depth'] + stats['in_flight']}  "
+                         f"ping {probe}  gen {gen}  fail {stats['failures']}",
+                    icon=icon
+                )
         
         layout.separator()
         
@@ -855,9 +3725,18 @@ class AITEX_PT_MainPanel(Panel):
         
         # Resolution
         layout.prop(props, "resolution")
+        if props.backend_type == 'AI':
+            layout.prop(props, "model_name")
+            layout.prop(props, "quality_profile")
+        if int(props.resolution) > 1024 and props.backend_type == 'AI':
+            layout.prop(props, "upscale_mode")
+            if props.upscale_mode == 'DIRECT' and int(props.resolution) > 2048:
+                layout.label(text="Direct sampling stops at 2048px", icon='ERROR')
         
         # Tileable option
         layout.prop(props, "make_tileable", text="Seamless Tiling")
+        layout.prop(props, "use_udim")
+        layout.prop(props, "texture_packing")
 
         # Normal strength
         layout.prop(props, "normal_strength", slider=True)
@@ -875,8 +3754,57 @@ class AITEX_PT_MainPanel(Panel):
         row = layout.row()
         row.scale_y = 2.0
         row.operator("aitex.generate_textures", icon='PLAY')
+
+        # Timing breakdown of the newest generation (also in traces.jsonl)
+        trace = _last_trace
+        if trace is not None:
+            box = layout.box()
+            box.prop(
+                props, "show_last_trace", icon='TIME', emboss=False,
+                text=f"Last generation: {trace['total']:.1f}s ({trace['source'] or 'failed'})"
+            )
+            if props.show_last_trace:
+                col = box.column(align=True)
+                for label, seconds in trace_rows(trace):
+                    col.label(text=f"{label}: {seconds:.2f}s")
+                if trace.get("error"):
+                    col.label(text=trace["error"], icon='ERROR')
         
         layout.separator()
+
+        # Resize
+        box = layout.box()
+        box.label(text="Resize Textures:", icon='FULLSCREEN_ENTER')
+        if props.is_resizing:
+            box.prop(props, "resize_progress", slider=True, text="Progress")
+            box.label(text="Press ESC to cancel", icon='EVENT_ESC')
+        else:
+            box.prop(props, "resize_scope", text="")
+            row = box.row(align=True)
+            row.prop(props, "resize_resolution", text="")
+            row.prop(props, "resize_filter", text="")
+            box.operator("aitex.resize_textures", icon='FULLSCREEN_ENTER')
+            box.prop(props, "render_full_resolution")
+
+        layout.separator()
+
+        # Texture library
+        box = layout.box()
+        box.label(text="Texture Library:", icon='ASSET_MANAGER')
+        box.prop(props, "reuse_library")
+        library_view = get_library_view(props)
+        if library_view["entries"]:
+            box.template_icon_view(props, "library_entry", show_labels=True)
+            box.operator("aitex.apply_from_library", icon='IMPORT')
+        else:
+            box.label(text="No generated textures yet")
+        box.prop(props, "library_dir")
+        row = box.row()
+        row.prop(props, "library_max_mb")
+        row.label(text=f"{library_view['total_bytes'] / (1024 * 1024):.0f} MB used")
+        box.operator("aitex.clear_library", icon='TRASH')
+
+        layout.separator()
         
         # Info
         box = layout.box()
@@ -887,6 +3815,74 @@ class AITEX_PT_MainPanel(Panel):
         box.label(text="4. Select Object & Generate!")
 
 
+class AITEX_UL_BatchQueue(UIList):
+    """Batch queue list: object, slot, preset or prompt, status"""
+    bl_idname = "AITEX_UL_batch_queue"
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row(align=True)
+        obj_name = item.target_object.name if item.target_object else "(missing)"
+        row.label(text=f"{obj_name} [{item.slot_index}]", icon='OBJECT_DATA')
+        if item.material_type == 'CUSTOM':
+            row.prop(item, "prompt", text="", emboss=False)
+        else:
+            row.prop(item, "material_type", text="")
+        status_icon = {'Done': 'CHECKMARK', 'Queued': 'TIME'}.get(item.status, 'INFO')
+        if item.status.startswith("Error"):
+            status_icon = 'ERROR'
+        row.label(text=item.status, icon=status_icon)
+
+
+class AITEX_PT_BatchPanel(Panel):
+    """Batch generation queue"""
+    bl_label = "Batch Generation"
+    bl_idname = "AITEX_PT_batch_panel"
+    bl_space_type = 'NODE_EDITOR'
+    bl_region_type = 'UI'
+    bl_category = "AI Textures"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    @classmethod
+    def poll(cls, context):
+        return context.space_data.tree_type == 'ShaderNodeTree'
+
+    def draw(self, context):
+        layout = self.layout
+        props = context.scene.ai_texture_props
+
+        row = layout.row()
+        row.template_list(
+            "AITEX_UL_batch_queue", "", props, "batch_items", props, "batch_index", rows=4
+        )
+        col = row.column(align=True)
+        col.operator("aitex.batch_add_selected", icon='ADD', text="")
+        col.operator("aitex.batch_remove", icon='REMOVE', text="")
+        col.operator("aitex.batch_clear", icon='TRASH', text="")
+
+        # Edit the active item's preset/prompt
+        if 0 <= props.batch_index < len(props.batch_items):
+            item = props.batch_items[props.batch_index]
+            box = layout.box()
+            box.prop(item, "material_type")
+            if item.material_type == 'CUSTOM':
+                box.prop(item, "prompt", text="")
+            box.prop(item, "slot_index")
+
+        layout.prop(props, "batch_per_slot")
+        layout.prop(props, "batch_concurrency")
+        layout.prop(props, "atlas_padding")
+
+        if props.is_batch_running:
+            layout.prop(props, "batch_progress", slider=True, text="Progress")
+            layout.label(text="Press ESC to cancel", icon='EVENT_ESC')
+        else:
+            row = layout.row()
+            row.scale_y = 1.5
+            row.operator("aitex.generate_batch", icon='PLAY')
+            row = layout.row()
+            row.operator("aitex.generate_atlas", icon='UV')
+
+
 # ============================================================================
 # 3D Viewport Panel (Texture Scale)
 # ============================================================================
@@ -906,15 +3902,18 @@ class AITEX_PT_View3DScalePanel(Panel):
         layout = self.layout
         props = context.scene.ai_texture_props
 
-        mat = get_ai_material(props)
+        mat = get_ai_material(props, context.object)
         status_box = layout.box()
         status_box.label(text="Texture Scale", icon='TEXTURE')
         if mat:
             status_box.label(text=f"Material: {mat.name}", icon='MATERIAL')
         else:
             status_box.label(text="No AI material found", icon='ERROR')
+        if is_atlas_material(mat):
+            status_box.label(text="Atlas material: placed by UVs, not scaled", icon='INFO')
 
         col = layout.column(align=True)
+        col.enabled = not is_atlas_material(mat)
         col.prop(props, "map_scale_x")
         col.prop(props, "map_scale_y")
         col.prop(props, "map_scale_z")
@@ -928,24 +3927,67 @@ class AITEX_PT_View3DScalePanel(Panel):
 # Registration
 # ============================================================================
 classes = (
+    AITextureBatchItem,
     AITextureProperties,
     AITEX_OT_GenerateTextures,
     AITEX_OT_ResizeTextures,
     AITEX_PT_MainPanel,
     AITEX_OT_ResetMappingScale,
     AITEX_OT_ApplyNormalStrength,
+    AITEX_OT_ApplyFromLibrary,
+    AITEX_OT_ClearLibrary,
+    AITEX_OT_BatchAddSelected,
+    AITEX_OT_BatchRemove,
+    AITEX_OT_BatchClear,
+    AITEX_OT_GenerateBatch,
+    AITEX_OT_GenerateAtlas,
+    AITEX_UL_BatchQueue,
+    AITEX_PT_BatchPanel,
     AITEX_PT_View3DScalePanel,
 )
 
 def register():
+    global _library_previews
+    import bpy.utils.previews
+    _library_previews = bpy.utils.previews.new()
+
     for cls in classes:
         bpy.utils.register_class(cls)
     
     bpy.types.Scene.ai_texture_props = bpy.props.PointerProperty(
         type=AITextureProperties
     )
+    bpy.app.handlers.save_pre.append(pack_ai_images)
+    bpy.app.handlers.depsgraph_update_post.append(on_material_depsgraph_update)
+    for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post, bpy.app.handlers.load_post):
+        handlers.append(invalidate_material_registry)
+    bpy.app.handlers.load_post.append(rebuild_lod_levels)
+    bpy.app.handlers.render_pre.append(use_render_lods)
+    bpy.app.handlers.render_post.append(restore_viewport_lods)
+    bpy.app.handlers.render_cancel.append(restore_viewport_lods)
 
 def unregister():
+    global _library_previews
+    _backend_pool.stop()
+    close_http_session()
+    if _library_previews is not None:
+        bpy.utils.previews.remove(_library_previews)
+        _library_previews = None
+
+    for handlers, handler in (
+        (bpy.app.handlers.save_pre, pack_ai_images),
+        (bpy.app.handlers.depsgraph_update_post, on_material_depsgraph_update),
+        (bpy.app.handlers.undo_post, invalidate_material_registry),
+        (bpy.app.handlers.redo_post, invalidate_material_registry),
+        (bpy.app.handlers.load_post, invalidate_material_registry),
+        (bpy.app.handlers.load_post, rebuild_lod_levels),
+        (bpy.app.handlers.render_pre, use_render_lods),
+        (bpy.app.handlers.render_post, restore_viewport_lods),
+        (bpy.app.handlers.render_cancel, restore_viewport_lods),
+    ):
+        if handler in handlers:
+            handlers.remove(handler)
+
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
     
@@ -1,2 +1,39 @@
-# This file should be copied to LOCAL_MODE and CLOUD_MODE folders
-# For organization purposes
+# # AI Texture Generator - Local Backend
+#
+# Runs the notebook backend (googlecolabobackend.py) as a plain Python
+# script on this machine: listens on 127.0.0.1 only, no ngrok tunnel, and
+# hands finished maps to Blender as raw pixel files (AITEX_LOCAL_HANDOFF=1).
+# The notebook stays the single copy of the server code; its "!pip" shell
+# lines are skipped here because install.bat already installed everything.
+
+import os
+import sys
+
+BACKEND_FILE = "googlecolabobackend.py"
+
+
+def find_backend():
+    """Locate the notebook backend next to this file or in ../CLOUD_MODE"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    for folder in (here, os.path.join(here, os.pardir, "CLOUD_MODE")):
+        path = os.path.normpath(os.path.join(folder, BACKEND_FILE))
+        if os.path.isfile(path):
+            return path
+    sys.exit(f"❌ {BACKEND_FILE} not found. Copy it from CLOUD_MODE next to local_backend.py.")
+
+
+def load_backend_source(path):
+    """Read the notebook source, commenting out its shell ("!") lines"""
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    return "\n".join(
+        "# " + line if line.lstrip().startswith("!") else line
+        for line in lines
+    ) + "\n"
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("AITEX_LOCAL_HANDOFF", "1")
+    path = find_backend()
+    print(f"🏠 Starting local backend from {path}")
+    exec(compile(load_backend_source(path), path, "exec"), {"__name__": "__main__", "__file__": path})
@@ -40,7 +40,8 @@ echo.
 echo ====================================================================
 echo.
 
-REM Start the backend
-python local_backend.py
+REM Start the backend (local only: no tunnel, maps handed to Blender as raw pixel files)
+set AITEX_LOCAL_HANDOFF=1
+python "%~dp0local_backend.py"
 
 pause
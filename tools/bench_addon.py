@@ -0,0 +1,314 @@
+"""Benchmark the addon's main-thread hot paths outside Blender.
+
+The addon module is imported unchanged on top of a fake bpy (tools/fake_bpy),
+so this runs on any machine with the addon's Python dependencies:
+
+    python tools/bench_addon.py
+    python tools/bench_addon.py --quick --out bench.json
+
+Times map ingestion (the old temp PNG + images.load path against the
+in-memory foreach_set path) and apply_to_material per texture resolution,
+get_ai_material and
+ensure_mapping_setup per scene size, and the resize operator's execute()
+(LOD switch and upscale job collection) plus its whole modal run.
+
+The fake keeps image pixels in numpy buffers and does no drawing, so the
+numbers measure the addon's own Python/numpy cost. Blender-side work (image
+scaling, GPU uploads, depsgraph updates, redraws) is not included; compare
+runs of this script against each other, not against timings in Blender.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_PATH = os.path.join(TOOLS_DIR, "..", "CLOUD_MODE", "blender_ai_textures.py")
+sys.path.insert(0, os.path.join(TOOLS_DIR, "fake_bpy"))
+
+import bpy  # noqa: E402  (the fake, from tools/fake_bpy)
+from bpy.types import Event  # noqa: E402
+
+MAPS = ('diffuse', 'roughness', 'metallic', 'normal')
+FILLER_SIZE = 32  # texture size of materials that only make up scene size
+
+
+def load_addon():
+    spec = importlib.util.spec_from_file_location("blender_ai_textures", ADDON_PATH)
+    addon = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(addon)
+    addon.register()
+    return addon
+
+
+def random_textures(size, seed=0):
+    """{map type: (width, height, pixels)} like fetch_textures returns."""
+    rng = np.random.default_rng(seed)
+    return {
+        tex_type: (size, size, rng.random(size * size * 4, dtype=np.float32))
+        for tex_type in MAPS
+    }
+
+
+def measure(func, repeat, setup=None):
+    """Run func repeat times (setup untimed before each run); returns seconds per run."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+class Bench:
+    def __init__(self, addon, repeat):
+        self.addon = addon
+        self.repeat = repeat
+        self.results = []
+
+    def record(self, name, case, n, times):
+        result = {
+            "benchmark": name,
+            "case": case,
+            "n": n,
+            "median_ms": round(statistics.median(times) * 1000, 3),
+            "min_ms": round(min(times) * 1000, 3),
+            "runs": len(times),
+        }
+        self.results.append(result)
+        print(f"{name:<22} {case:<32} {n:>6} {result['median_ms']:>11.3f} {result['min_ms']:>11.3f}", flush=True)
+
+    # ------------------------------------------------------------------
+    # Scenes
+    # ------------------------------------------------------------------
+    def new_scene(self):
+        """Start from an empty file with the addon registered."""
+        bpy.reset()
+        self.addon.invalidate_material_registry()
+        return bpy.context
+
+    def add_object(self, name):
+        obj = bpy.data.objects.new(name, bpy.data.meshes.new(name))
+        bpy.context.selected_objects.append(obj)
+        return obj
+
+    def apply(self, textures, key, obj, lods=None):
+        # apply_to_material prints its own timing; keep the table readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.addon.apply_to_material(bpy.context, textures, f"bench {key}", key, lods, target_obj=obj)
+
+    def build_scene(self, count, size=FILLER_SIZE, lods=False):
+        """count objects, each with its own AI material of size x size maps."""
+        context = self.new_scene()
+        textures = random_textures(size)
+        chains = self.addon.build_lod_chains(textures) if lods else None
+        materials = []
+        for index in range(count):
+            obj = self.add_object(f"Object_{index}")
+            materials.append(self.apply(textures, f"{index:06d}", obj, chains))
+        return context, materials
+
+    # ------------------------------------------------------------------
+    # Benchmarks
+    # ------------------------------------------------------------------
+    def bench_ingest(self, resolutions):
+        """One map, from the decoded backend response to a packed Blender image."""
+        for size in resolutions:
+            self.new_scene()
+            # Smooth gradient plus noise, so PNG encoding does real work
+            rng = np.random.default_rng(0)
+            ramp = np.linspace(0, 200, size, dtype=np.float32)
+            rgb = ramp[None, :, None] + ramp[:, None, None] * 0.25 + rng.integers(0, 32, (size, size, 3))
+            img = Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8), "RGB")
+            repeat = max(1, self.repeat // (4 if size >= 4096 else 1))
+
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "bench_diffuse.png")
+
+                def temp_png():
+                    # Old apply path: PNG encode to a temp file, decode it again, pack
+                    img.save(path)
+                    bpy_img = bpy.data.images.load(path)
+                    bpy_img.pack()
+                    bpy.data.images.remove(bpy_img)
+
+                self.record("ingest", "temp PNG + images.load (before)", size, measure(temp_png, repeat))
+
+            decoded = []
+            self.record("ingest", "image_to_pixels (worker)", size, measure(
+                lambda: decoded.append(self.addon.image_to_pixels(img)), repeat, setup=decoded.clear,
+            ))
+            width, height, pixels = decoded[0]
+            self.record("ingest", "foreach_set (main thread)", size, measure(
+                lambda: self.addon.create_image_from_pixels("bench_diffuse", width, height, pixels), repeat,
+            ))
+
+    def bench_apply(self, resolutions):
+        for size in resolutions:
+            self.new_scene()
+            obj = self.add_object("Target")
+            textures = random_textures(size)
+            lods = self.addon.build_lod_chains(textures)  # built on the worker thread in the addon
+
+            def drop_generated():
+                # Only one set of images alive at a time, so 2048 maps fit in memory
+                for datablock in list(bpy.data.images):
+                    bpy.data.images.remove(datablock)
+                for datablock in list(bpy.data.materials):
+                    bpy.data.materials.remove(datablock)
+                obj.data.materials.clear()
+
+            self.record("apply_to_material", "new material", size, measure(
+                lambda: self.apply(textures, "new", obj, lods), self.repeat, setup=drop_generated,
+            ))
+            self.record("apply_to_material", "existing material", size, measure(
+                lambda: self.apply(textures, "again", obj, lods), self.repeat,
+            ))
+
+    def bench_get_ai_material(self, scene_sizes):
+        for count in scene_sizes:
+            context, materials = self.build_scene(count)
+            props = context.scene.ai_texture_props
+            plain = self.add_object("Plain")
+            plain.data.materials.append(bpy.data.materials.new("Plain"))
+            calls = 100
+            invalidate = self.addon.invalidate_material_registry
+
+            def lookup(obj=None):
+                for _ in range(calls):
+                    self.addon.get_ai_material(props, obj)
+
+            times = measure(lookup, self.repeat)
+            self.record("get_ai_material", "last generated (warm)", count, [t / calls for t in times])
+            times = measure(lambda: self.addon.get_ai_material(props), self.repeat, setup=invalidate)
+            self.record("get_ai_material", "last generated (cold)", count, times)
+            times = measure(lambda: lookup(bpy.data.objects["Object_0"]), self.repeat)
+            self.record("get_ai_material", "object slot", count, [t / calls for t in times])
+            times = measure(lambda: lookup(plain), self.repeat)
+            self.record("get_ai_material", "non-AI object (warm)", count, [t / calls for t in times])
+
+    def bench_mapping(self, scene_sizes):
+        for count in scene_sizes:
+            _, materials = self.build_scene(count)
+
+            def lookup_all():
+                for mat in materials:
+                    self.addon.ensure_mapping_setup(mat)
+
+            self.record("ensure_mapping_setup", "existing, every material", count,
+                        measure(lookup_all, self.repeat))
+
+            mat = materials[-1]
+
+            def drop_mapping():
+                mat.node_tree.nodes.remove(mat.node_tree.nodes["AITEX_MAPPING"])
+
+            self.record("ensure_mapping_setup", "rebuild one material", count, measure(
+                lambda: self.addon.ensure_mapping_setup(mat), self.repeat, setup=drop_mapping,
+            ))
+
+    def bench_resize(self, scene_sizes, master_size):
+        for count in scene_sizes:
+            context, _ = self.build_scene(count, master_size, lods=True)
+            props = context.scene.ai_texture_props
+            props.resize_scope = 'ALL'
+            upscale = master_size * 2
+
+            def run_execute(resolution):
+                # Assigning resize_resolution would switch LODs through its update callback
+                object.__setattr__(props, "resize_resolution", str(resolution))
+                operator = self.addon.AITEX_OT_ResizeTextures()
+                result = operator.execute(context)
+                return operator, result
+
+            def reset_levels():
+                for img in list(bpy.data.images):
+                    if img.name.endswith(f"@{upscale}"):
+                        bpy.data.images.remove(img)
+                for mat in self.addon.get_registered_ai_materials():
+                    self.addon.set_material_lod(mat, master_size)
+
+            self.record("ResizeTextures", f"execute, LOD switch {master_size // 2}", count, measure(
+                lambda: run_execute(master_size // 2), self.repeat, setup=reset_levels,
+            ))
+
+            pending = []
+
+            def collect_jobs():
+                operator, result = run_execute(upscale)
+                pending.append(operator)
+
+            def cancel_pending():
+                while pending:
+                    operator = pending.pop()
+                    if operator._executor is not None:
+                        operator._finish(context)
+                reset_levels()
+
+            self.record("ResizeTextures", f"execute, upscale {upscale}", count, measure(
+                collect_jobs, self.repeat, setup=cancel_pending,
+            ))
+            cancel_pending()
+
+            def full_resize():
+                operator, result = run_execute(upscale)
+                timer = Event('TIMER')
+                # modal() passes events through until the last upload is done
+                while result in ({'RUNNING_MODAL'}, {'PASS_THROUGH'}):
+                    time.sleep(0.001)  # stands in for the 50 ms event timer
+                    result = operator.modal(context, timer)
+
+            self.record("ResizeTextures", f"execute+modal, upscale {upscale}", count, measure(
+                full_resize, max(1, self.repeat // 5), setup=reset_levels,
+            ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", type=int, nargs="+", default=[512, 1024, 2048],
+                        help="texture sizes for apply_to_material")
+    parser.add_argument("--ingest-resolutions", type=int, nargs="+", default=[1024, 2048, 4096, 8192],
+                        help="texture sizes for map ingestion (one map at a time)")
+    parser.add_argument("--scene-sizes", type=int, nargs="+", default=[10, 100, 1000],
+                        help="AI material counts for get_ai_material and ensure_mapping_setup")
+    parser.add_argument("--resize-scene-sizes", type=int, nargs="+", default=[1, 10],
+                        help="AI material counts for the resize operator (4 maps with LODs each)")
+    parser.add_argument("--resize-master", type=int, default=512, help="master texture size in resize scenes")
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per case")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer runs, for a smoke test")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    args = parser.parse_args()
+    if args.quick:
+        args.resolutions = [512, 1024]
+        args.ingest_resolutions = [1024, 2048]
+        args.scene_sizes = [10, 100]
+        args.resize_scene_sizes = [1, 4]
+        args.repeat = 5
+
+    bench = Bench(load_addon(), args.repeat)
+    print(f"{'benchmark':<22} {'case':<32} {'n':>6} {'median ms':>11} {'min ms':>11}")
+    bench.bench_ingest(args.ingest_resolutions)
+    bench.bench_apply(args.resolutions)
+    bench.bench_get_ai_material(args.scene_sizes)
+    bench.bench_mapping(args.scene_sizes)
+    bench.bench_resize(args.resize_scene_sizes, args.resize_master)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": bench.results}, f, indent=1)
+        print(f"💾 Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""Minimal in-process stand-in for Blender's bpy, for benchmarking the addon headless.
+
+Covers the parts of bpy.data, images, node trees, properties and the window
+manager that the addon touches, closely enough that the addon module imports
+and runs unchanged. Image pixels are plain float32 numpy buffers, so timings
+cover the addon's own Python/numpy work, not Blender's internals (image
+scaling, GPU uploads, depsgraph updates and redraws are free here).
+
+Put tools/fake_bpy on sys.path before importing the addon.
+"""
+from . import app, path, props, types, utils
+
+data = types.BlendData()
+context = types.Context()
+
+
+def reset():
+    """Drop every datablock and start from an empty file."""
+    global data, context
+    data = types.BlendData()
+    context = types.Context()
+    app.timers.clear()
+
+
+__all__ = ["app", "context", "data", "path", "props", "reset", "types", "utils"]
@@ -0,0 +1,7 @@
+from . import handlers, timers
+
+version = (4, 0, 0)
+version_string = "4.0.0 (fake)"
+background = True
+
+__all__ = ["background", "handlers", "timers", "version", "version_string"]
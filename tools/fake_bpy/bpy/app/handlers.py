@@ -0,0 +1,14 @@
+"""Handler lists; nothing fires them unless a benchmark calls them itself."""
+depsgraph_update_post = []
+load_post = []
+redo_post = []
+render_cancel = []
+render_post = []
+render_pre = []
+save_pre = []
+undo_post = []
+
+
+def persistent(func):
+    func._bpy_persistent = True
+    return func
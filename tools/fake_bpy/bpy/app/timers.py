@@ -0,0 +1,32 @@
+"""bpy.app.timers without an event loop: run() stands in for Blender's main loop."""
+_timers = []
+
+
+def register(function, first_interval=0.0, persistent=False):
+    _timers.append(function)
+
+
+def unregister(function):
+    _timers.remove(function)
+
+
+def is_registered(function):
+    return function in _timers
+
+
+def clear():
+    _timers.clear()
+
+
+def run(max_ticks=None):
+    """Call the registered timers until they all return None; returns the tick count.
+
+    Intervals are ignored: every tick runs straight after the previous one.
+    """
+    ticks = 0
+    while _timers and (max_ticks is None or ticks < max_ticks):
+        for function in list(_timers):
+            if function() is None and function in _timers:
+                _timers.remove(function)
+        ticks += 1
+    return ticks
@@ -0,0 +1,8 @@
+import os
+
+
+def abspath(path, start=None):
+    """Resolve Blender's "//" blend-relative prefix against start (default: cwd)."""
+    if path.startswith("//"):
+        return os.path.join(start or os.getcwd(), path[2:])
+    return path
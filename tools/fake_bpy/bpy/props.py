@@ -0,0 +1,90 @@
+"""Property definitions: they only record their arguments; PropertyGroup applies them."""
+
+
+class _PropertyDef:
+    def __init__(self, kind, **keywords):
+        self.kind = kind
+        self.keywords = keywords
+
+    def default(self):
+        kw = self.keywords
+        if self.kind == "Collection":
+            from .types import PropCollection
+            return PropCollection(kw["type"])
+        if self.kind == "Pointer":
+            from .types import PropertyGroup
+            item_type = kw["type"]
+            if isinstance(item_type, type) and issubclass(item_type, PropertyGroup):
+                return item_type()
+            return None
+        if "default" in kw:
+            return kw["default"]
+        if self.kind == "Enum":
+            if "ENUM_FLAG" in kw.get("options", ()):
+                return set()
+            items = kw.get("items")
+            # Dynamic item callbacks need a context; Blender falls back to the first item
+            return items[0][0] if items and not callable(items) else ""
+        if self.kind.endswith("Vector"):
+            return (self._scalar_default(),) * kw.get("size", 3)
+        return self._scalar_default()
+
+    def _scalar_default(self):
+        return {"Bool": False, "Int": 0, "String": ""}.get(self.kind.replace("Vector", ""), 0.0)
+
+    def __get__(self, instance, owner):
+        # A PointerProperty assigned to an ID class (bpy.types.Scene.x = ...)
+        if instance is None:
+            return self
+        name = self._attribute_name(owner)
+        value = instance.__dict__.get(name)
+        if value is None:
+            value = instance.__dict__[name] = self.default()
+        return value
+
+    def _attribute_name(self, owner):
+        for klass in owner.__mro__:
+            for name, value in vars(klass).items():
+                if value is self:
+                    return name
+        raise AttributeError("property is not attached to a class")
+
+
+def BoolProperty(**keywords):
+    return _PropertyDef("Bool", **keywords)
+
+
+def BoolVectorProperty(**keywords):
+    return _PropertyDef("BoolVector", **keywords)
+
+
+def CollectionProperty(**keywords):
+    return _PropertyDef("Collection", **keywords)
+
+
+def EnumProperty(**keywords):
+    return _PropertyDef("Enum", **keywords)
+
+
+def FloatProperty(**keywords):
+    return _PropertyDef("Float", **keywords)
+
+
+def FloatVectorProperty(**keywords):
+    return _PropertyDef("FloatVector", **keywords)
+
+
+def IntProperty(**keywords):
+    return _PropertyDef("Int", **keywords)
+
+
+def IntVectorProperty(**keywords):
+    return _PropertyDef("IntVector", **keywords)
+
+
+def PointerProperty(**keywords):
+    return _PropertyDef("Pointer", **keywords)
+
+
+def StringProperty(**keywords):
+    return _PropertyDef("String", **keywords)
@@ -0,0 +1,734 @@
+"""Datablocks, node trees and UI base classes."""
+import os
+from types import SimpleNamespace
+
+import numpy as np
+
+
+# ============================================================================
+# UI / Registration Base Classes
+# ============================================================================
+class bpy_struct:
+    pass
+
+
+class Panel(bpy_struct):
+    pass
+
+
+class UIList(bpy_struct):
+    pass
+
+
+class Operator(bpy_struct):
+    bl_options = set()
+
+    def __init__(self):
+        self.reports = []
+
+    def report(self, type, message):
+        self.reports.append((set(type), message))
+
+
+class PropertyGroup(bpy_struct):
+    """Fills in each annotated property's default; update callbacks run on assignment."""
+
+    def __init__(self):
+        for klass in reversed(type(self).__mro__):
+            for name, prop in vars(klass).get("__annotations__", {}).items():
+                if hasattr(prop, "default"):
+                    object.__setattr__(self, name, prop.default())
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        prop = type(self).__annotations__.get(name) if hasattr(type(self), "__annotations__") else None
+        update = prop.keywords.get("update") if prop is not None else None
+        if update is not None:
+            import bpy
+            update(self, bpy.context)
+
+
+class PropCollection:
+    """CollectionProperty value."""
+
+    def __init__(self, item_type):
+        self._item_type = item_type
+        self._items = []
+
+    def add(self):
+        item = self._item_type()
+        self._items.append(item)
+        return item
+
+    def remove(self, index):
+        del self._items[index]
+
+    def clear(self):
+        self._items.clear()
+
+    def move(self, from_index, to_index):
+        self._items.insert(to_index, self._items.pop(from_index))
+
+    def get(self, name, default=None):
+        return next((item for item in self._items if getattr(item, "name", None) == name), default)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+
+# ============================================================================
+# ID Datablocks
+# ============================================================================
+def unique_name(name, taken):
+    """Blender-style "Name", "Name.001", ... (names are capped at 63 bytes)."""
+    name = name[:63]
+    if name not in taken:
+        return name
+    index = 1
+    while f"{name}.{index:03d}" in taken:
+        index += 1
+    return f"{name}.{index:03d}"
+
+
+class ID(bpy_struct):
+    """A named datablock with custom properties (id["key"])."""
+
+    def __init__(self, name):
+        self._name = name
+        self._collection = None
+        self._removed = False
+        self._custom = {}
+
+    @property
+    def name(self):
+        if self._removed:
+            raise ReferenceError(f"StructRNA of type {type(self).__name__} has been removed")
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        if self._collection is not None:
+            self._collection._rename(self, value)
+        else:
+            self._name = value
+
+    def get(self, key, default=None):
+        return self._custom.get(key, default)
+
+    def keys(self):
+        return self._custom.keys()
+
+    def __getitem__(self, key):
+        return self._custom[key]
+
+    def __setitem__(self, key, value):
+        self._custom[key] = value
+
+    def __delitem__(self, key):
+        del self._custom[key]
+
+    def __contains__(self, key):
+        return key in self._custom
+
+    def __repr__(self):
+        return f"bpy.data.{type(self).__name__.lower()}s['{self._name}']"
+
+
+class IDCollection:
+    """bpy.data.<collection>, iterated in creation order."""
+
+    def __init__(self, id_type):
+        self._id_type = id_type
+        self._items = {}
+
+    def new(self, name, *args, **kwargs):
+        datablock = self._id_type(unique_name(name, self._items), *args, **kwargs)
+        datablock._collection = self
+        self._items[datablock._name] = datablock
+        return datablock
+
+    def load(self, filepath, check_existing=False):
+        if check_existing:
+            for datablock in self._items.values():
+                if getattr(datablock, "filepath", None) == filepath:
+                    return datablock
+        return self._id_type._load(self, filepath)
+
+    def remove(self, datablock, do_unlink=True):
+        if self._items.get(datablock._name) is not datablock:
+            raise ReferenceError(f"{datablock!r} is not in this collection")
+        del self._items[datablock._name]
+        datablock._removed = True
+
+    def _rename(self, datablock, name):
+        del self._items[datablock._name]
+        datablock._name = unique_name(name, self._items)
+        self._items[datablock._name] = datablock
+
+    def get(self, name, default=None):
+        return self._items.get(name, default)
+
+    def keys(self):
+        return self._items.keys()
+
+    def values(self):
+        return list(self._items.values())
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self._items.values())[key]
+        return self._items[key]
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __iter__(self):
+        return iter(list(self._items.values()))
+
+    def __len__(self):
+        return len(self._items)
+
+
+# ============================================================================
+# Images
+# ============================================================================
+class PixelBuffer:
+    """Image.pixels: a flat float32 RGBA buffer with bpy's foreach_get/foreach_set."""
+
+    def __init__(self, length):
+        self._data = np.zeros(length, dtype=np.float32)
+
+    def foreach_set(self, seq):
+        values = np.asarray(seq, dtype=np.float32).reshape(-1)
+        if values.size != self._data.size:
+            raise RuntimeError(f"internal error setting the array: expected {self._data.size}, got {values.size}")
+        np.copyto(self._data, values)
+
+    def foreach_get(self, seq):
+        if isinstance(seq, np.ndarray):
+            seq.reshape(-1)[:] = self._data
+        else:
+            seq[:] = self._data.tolist()
+
+    def __len__(self):
+        return self._data.size
+
+    def __getitem__(self, index):
+        # Slicing Image.pixels builds Python floats, as slowly as in Blender
+        value = self._data[index]
+        return tuple(value.tolist()) if isinstance(index, slice) else float(value)
+
+    def __setitem__(self, index, value):
+        self._data[index] = value
+
+
+class ImageTiles:
+    def __init__(self):
+        self._tiles = [SimpleNamespace(number=1001, label="")]
+
+    def new(self, tile_number=1001, label=""):
+        tile = SimpleNamespace(number=tile_number, label=label)
+        self._tiles.append(tile)
+        return tile
+
+    def get(self, tile_number, default=None):
+        return next((tile for tile in self._tiles if tile.number == tile_number), default)
+
+    def __iter__(self):
+        return iter(self._tiles)
+
+    def __len__(self):
+        return len(self._tiles)
+
+
+class Image(ID):
+    def __init__(self, name, width=0, height=0, alpha=False, float_buffer=False, stereo3d=False,
+                 is_data=False, tiled=False):
+        super().__init__(name)
+        self.size = [width, height]
+        self.channels = 4
+        self.pixels = PixelBuffer(width * height * 4)
+        self.source = 'TILED' if tiled else 'GENERATED'
+        self.tiles = ImageTiles()
+        self.colorspace_settings = SimpleNamespace(is_data=is_data, name="Non-Color" if is_data else "sRGB")
+        self.alpha_mode = 'STRAIGHT'
+        self.filepath = ""
+        self.filepath_raw = ""
+        self.file_format = 'PNG'
+        self.packed_file = None
+        self.is_dirty = True
+        self.use_fake_user = False
+
+    @classmethod
+    def _load(cls, collection, filepath):
+        from PIL import Image as PILImage
+        with PILImage.open(filepath) as source:
+            rgba = np.asarray(source.convert("RGBA"))[::-1]
+        height, width = rgba.shape[:2]
+        img = collection.new(os.path.basename(filepath), width, height)
+        img.pixels.foreach_set(rgba.ravel() / np.float32(255.0))
+        img.source = 'FILE'
+        img.filepath = img.filepath_raw = filepath
+        img.is_dirty = False
+        return img
+
+    def scale(self, width, height):
+        # Blender resamples here; the addon always overwrites the pixels afterwards
+        self.size = [width, height]
+        self.pixels = PixelBuffer(width * height * self.channels)
+
+    def update(self):
+        pass
+
+    def pack(self):
+        self.packed_file = SimpleNamespace(size=len(self.pixels) * 4)
+        self.is_dirty = False
+
+    def unpack(self, method='USE_LOCAL'):
+        self.packed_file = None
+
+    def reload(self):
+        pass
+
+    def save(self):
+        self.is_dirty = False
+
+    def save_render(self, filepath, scene=None):
+        from PIL import Image as PILImage
+        width, height = self.size
+        rgba = self.pixels._data.reshape(height, width, 4)[::-1]
+        PILImage.fromarray((np.clip(rgba, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)).save(filepath)
+
+
+# ============================================================================
+# Node Trees
+# ============================================================================
+class Vector(list):
+    """Enough of mathutils.Vector for node locations and socket values."""
+
+    x = property(lambda self: self[0], lambda self, value: self.__setitem__(0, value))
+    y = property(lambda self: self[1], lambda self, value: self.__setitem__(1, value))
+    z = property(lambda self: self[2], lambda self, value: self.__setitem__(2, value))
+
+
+# bl_idname -> (node.type, [(input name, socket type, default)], [(output name, socket type)])
+NODE_TYPES = {
+    'NodeGroupInput': ('GROUP_INPUT', [], []),
+    'NodeGroupOutput': ('GROUP_OUTPUT', [], []),
+    'ShaderNodeGroup': ('GROUP', [], []),
+    'ShaderNodeOutputMaterial': ('OUTPUT_MATERIAL', [
+        ("Surface", 'SHADER', None), ("Volume", 'SHADER', None), ("Displacement", 'VECTOR', (0.0, 0.0, 0.0)),
+    ], []),
+    'ShaderNodeBsdfPrincipled': ('BSDF_PRINCIPLED', [
+        ("Base Color", 'RGBA', (0.8, 0.8, 0.8, 1.0)), ("Metallic", 'VALUE', 0.0), ("Roughness", 'VALUE', 0.5),
+        ("IOR", 'VALUE', 1.5), ("Alpha", 'VALUE', 1.0), ("Normal", 'VECTOR', (0.0, 0.0, 0.0)),
+    ], [("BSDF", 'SHADER')]),
+    'ShaderNodeTexImage': ('TEX_IMAGE', [("Vector", 'VECTOR', (0.0, 0.0, 0.0))], [("Color", 'RGBA'), ("Alpha", 'VALUE')]),
+    'ShaderNodeTexCoord': ('TEX_COORD', [], [
+        ("Generated", 'VECTOR'), ("Normal", 'VECTOR'), ("UV", 'VECTOR'), ("Object", 'VECTOR'),
+    ]),
+    'ShaderNodeMapping': ('MAPPING', [
+        ("Vector", 'VECTOR', (0.0, 0.0, 0.0)), ("Location", 'VECTOR', (0.0, 0.0, 0.0)),
+        ("Rotation", 'VECTOR', (0.0, 0.0, 0.0)), ("Scale", 'VECTOR', (1.0, 1.0, 1.0)),
+    ], [("Vector", 'VECTOR')]),
+    'ShaderNodeNormalMap': ('NORMAL_MAP', [
+        ("Strength", 'VALUE', 1.0), ("Color", 'RGBA', (0.5, 0.5, 1.0, 1.0)),
+    ], [("Normal", 'VECTOR')]),
+    'ShaderNodeRGBToBW': ('RGBTOBW', [("Color", 'RGBA', (0.5, 0.5, 0.5, 1.0))], [("Val", 'VALUE')]),
+    'ShaderNodeBump': ('BUMP', [
+        ("Strength", 'VALUE', 1.0), ("Distance", 'VALUE', 1.0), ("Height", 'VALUE', 1.0),
+        ("Normal", 'VECTOR', (0.0, 0.0, 0.0)),
+    ], [("Normal", 'VECTOR')]),
+    'ShaderNodeSeparateColor': ('SEPARATE_COLOR', [("Color", 'RGBA', (0.8, 0.8, 0.8, 1.0))], [
+        ("Red", 'VALUE'), ("Green", 'VALUE'), ("Blue", 'VALUE'),
+    ]),
+}
+
+# Interface socket_type -> node socket type
+SOCKET_TYPES = {
+    'NodeSocketColor': 'RGBA',
+    'NodeSocketFloat': 'VALUE',
+    'NodeSocketVector': 'VECTOR',
+    'NodeSocketShader': 'SHADER',
+}
+
+
+class NodeSocket(bpy_struct):
+    def __init__(self, node, name, type, default_value=None, is_output=False):
+        self.node = node
+        self.name = self.identifier = name
+        self.type = type
+        self.default_value = default_value
+        self.is_output = is_output
+
+    @property
+    def links(self):
+        # Blender also finds a socket's links by scanning the tree's links
+        attr = "from_socket" if self.is_output else "to_socket"
+        return [link for link in self.node.id_data.links if getattr(link, attr) is self]
+
+    @property
+    def is_linked(self):
+        return bool(self.links)
+
+
+class NodeSockets:
+    def __init__(self):
+        self._sockets = []
+
+    def get(self, name, default=None):
+        return next((socket for socket in self._sockets if socket.name == name), default)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._sockets[key]
+        socket = self.get(key)
+        if socket is None:
+            raise KeyError(f'bpy_prop_collection[key]: key "{key}" not found')
+        return socket
+
+    def __iter__(self):
+        return iter(self._sockets)
+
+    def __len__(self):
+        return len(self._sockets)
+
+
+class Node(bpy_struct):
+    def __init__(self, tree, bl_idname, name):
+        self.id_data = tree
+        self.bl_idname = bl_idname
+        self.type, inputs, outputs = NODE_TYPES[bl_idname]
+        self._name = name
+        self.label = ""
+        self._location = Vector((0.0, 0.0))
+        self.width = 140.0
+        self.hide = False
+        self.mute = False
+        self.image = None
+        self.interpolation = 'Linear'
+        self.extension = 'REPEAT'
+        self._node_tree = None
+        self.inputs = NodeSockets()
+        self.outputs = NodeSockets()
+        for socket_name, socket_type, default in inputs:
+            self.inputs._sockets.append(NodeSocket(self, socket_name, socket_type, default))
+        for socket_name, socket_type in outputs:
+            self.outputs._sockets.append(NodeSocket(self, socket_name, socket_type, is_output=True))
+        if self.type == 'GROUP_INPUT':
+            self._add_interface_sockets(tree, 'INPUT', self.outputs, True)
+        elif self.type == 'GROUP_OUTPUT':
+            self._add_interface_sockets(tree, 'OUTPUT', self.inputs, False)
+
+    def _add_interface_sockets(self, group, in_out, sockets, is_output):
+        for item in group.interface.items_tree:
+            if item.in_out == in_out:
+                sockets._sockets.append(NodeSocket(
+                    self, item.name, SOCKET_TYPES[item.socket_type], item.default_value, is_output
+                ))
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self.id_data.nodes._rename(self, value)
+
+    @property
+    def location(self):
+        return self._location
+
+    @location.setter
+    def location(self, value):
+        self._location = Vector(value)
+
+    @property
+    def node_tree(self):
+        return self._node_tree
+
+    @node_tree.setter
+    def node_tree(self, group):
+        # A group node's sockets mirror the group's interface
+        self._node_tree = group
+        for link in list(self.id_data.links):
+            if link.from_node is self or link.to_node is self:
+                self.id_data.links.remove(link)
+        self.inputs, self.outputs = NodeSockets(), NodeSockets()
+        if group is not None:
+            self._add_interface_sockets(group, 'INPUT', self.inputs, False)
+            self._add_interface_sockets(group, 'OUTPUT', self.outputs, True)
+
+
+class Nodes:
+    def __init__(self, tree):
+        self._tree = tree
+        self._nodes = {}
+
+    def new(self, type):
+        if type not in NODE_TYPES:
+            raise RuntimeError(f"Error: Node type {type} undefined")
+        base_name = type.replace("ShaderNode", "").replace("Node", "")
+        node = Node(self._tree, type, unique_name(base_name, self._nodes))
+        self._nodes[node._name] = node
+        return node
+
+    def remove(self, node):
+        for link in list(self._tree.links):
+            if link.from_node is node or link.to_node is node:
+                self._tree.links.remove(link)
+        del self._nodes[node._name]
+
+    def clear(self):
+        self._tree.links.clear()
+        self._nodes.clear()
+
+    def _rename(self, node, name):
+        del self._nodes[node._name]
+        node._name = unique_name(name, self._nodes)
+        self._nodes[node._name] = node
+
+    def get(self, name, default=None):
+        return self._nodes.get(name, default)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self._nodes.values())[key]
+        return self._nodes[key]
+
+    def __contains__(self, key):
+        return key in self._nodes
+
+    def __iter__(self):
+        return iter(list(self._nodes.values()))
+
+    def __len__(self):
+        return len(self._nodes)
+
+
+class NodeLink(bpy_struct):
+    def __init__(self, from_socket, to_socket):
+        self.from_socket = from_socket
+        self.to_socket = to_socket
+        self.from_node = from_socket.node
+        self.to_node = to_socket.node
+        self.is_valid = True
+
+
+class NodeLinks:
+    def __init__(self):
+        self._links = []
+
+    def new(self, input, output, verify_limits=True):
+        from_socket, to_socket = (output, input) if input.is_output is False else (input, output)
+        # An input takes a single link; the new one replaces the old
+        self._links = [link for link in self._links if link.to_socket is not to_socket]
+        link = NodeLink(from_socket, to_socket)
+        self._links.append(link)
+        return link
+
+    def remove(self, link):
+        self._links.remove(link)
+
+    def clear(self):
+        self._links.clear()
+
+    def __iter__(self):
+        return iter(list(self._links))
+
+    def __len__(self):
+        return len(self._links)
+
+
+class NodeTreeInterfaceSocket(bpy_struct):
+    def __init__(self, name, in_out, socket_type):
+        self.name = name
+        self.in_out = in_out
+        self.socket_type = socket_type
+        self.item_type = 'SOCKET'
+        self.default_value = {
+            'NodeSocketColor': (0.0, 0.0, 0.0, 1.0),
+            'NodeSocketFloat': 0.0,
+            'NodeSocketVector': (0.0, 0.0, 0.0),
+        }.get(socket_type)
+        self.min_value = None
+        self.max_value = None
+
+
+class NodeTreeInterface:
+    def __init__(self):
+        self.items_tree = []
+
+    def new_socket(self, name, description="", in_out='INPUT', socket_type='NodeSocketFloat', parent=None):
+        socket = NodeTreeInterfaceSocket(name, in_out, socket_type)
+        self.items_tree.append(socket)
+        return socket
+
+
+class NodeTree(ID):
+    def __init__(self, name, type='ShaderNodeTree'):
+        super().__init__(name)
+        self.bl_idname = type
+        self.interface = NodeTreeInterface()
+        self.links = NodeLinks()
+        self.nodes = Nodes(self)
+
+
+# ============================================================================
+# Materials, Meshes and Objects
+# ============================================================================
+class Material(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.node_tree = None
+        self.diffuse_color = (0.8, 0.8, 0.8, 1.0)
+
+    @property
+    def use_nodes(self):
+        return self.node_tree is not None
+
+    @use_nodes.setter
+    def use_nodes(self, value):
+        if value and self.node_tree is None:
+            # New node materials start with a Principled BSDF and an output, as in Blender
+            self.node_tree = NodeTree("Shader Nodetree")
+            bsdf = self.node_tree.nodes.new('ShaderNodeBsdfPrincipled')
+            output = self.node_tree.nodes.new('ShaderNodeOutputMaterial')
+            self.node_tree.links.new(bsdf.outputs["BSDF"], output.inputs["Surface"])
+
+
+class Mesh(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.materials = []
+
+
+class MaterialSlot(bpy_struct):
+    def __init__(self, obj, index):
+        self._obj = obj
+        self._index = index
+        self.link = 'DATA'
+
+    @property
+    def material(self):
+        return self._obj.data.materials[self._index]
+
+    @material.setter
+    def material(self, material):
+        self._obj.data.materials[self._index] = material
+
+    @property
+    def name(self):
+        material = self.material
+        return material.name if material is not None else ""
+
+
+class Object(ID):
+    def __init__(self, name, object_data=None):
+        super().__init__(name)
+        self.data = object_data
+        self.type = 'MESH' if isinstance(object_data, Mesh) else 'EMPTY'
+        self.active_material_index = 0
+        self.location = Vector((0.0, 0.0, 0.0))
+        self._selected = False
+
+    @property
+    def material_slots(self):
+        if self.data is None:
+            return []
+        return [MaterialSlot(self, index) for index in range(len(self.data.materials))]
+
+    @property
+    def active_material(self):
+        slots = self.material_slots
+        return slots[self.active_material_index].material if slots else None
+
+    def select_get(self):
+        return self._selected
+
+    def select_set(self, state):
+        self._selected = state
+
+
+class BlendData:
+    def __init__(self):
+        self.images = IDCollection(Image)
+        self.materials = IDCollection(Material)
+        self.meshes = IDCollection(Mesh)
+        self.node_groups = IDCollection(NodeTree)
+        self.objects = IDCollection(Object)
+        self.filepath = ""
+        self.is_dirty = False
+
+
+# ============================================================================
+# Context
+# ============================================================================
+class Scene(ID):
+    pass
+
+
+class Area(bpy_struct):
+    def __init__(self, type):
+        self.type = type
+        self.redraws = 0
+
+    def tag_redraw(self):
+        self.redraws += 1
+
+
+class WindowManager(bpy_struct):
+    def __init__(self):
+        self.timers = []
+        self.modal_handlers = []
+
+    def event_timer_add(self, time_step, window=None):
+        timer = SimpleNamespace(time_step=time_step, window=window)
+        self.timers.append(timer)
+        return timer
+
+    def event_timer_remove(self, timer):
+        self.timers.remove(timer)
+
+    def modal_handler_add(self, operator):
+        self.modal_handlers.append(operator)
+        return True
+
+    def progress_begin(self, min, max):
+        pass
+
+    def progress_update(self, value):
+        pass
+
+    def progress_end(self):
+        pass
+
+
+class Context(bpy_struct):
+    def __init__(self):
+        self.scene = Scene("Scene")
+        self.window_manager = WindowManager()
+        self.window = None
+        self.workspace = SimpleNamespace(status_text_set=lambda text: None)
+        self.screen = SimpleNamespace(areas=[Area('VIEW_3D'), Area('NODE_EDITOR')])
+        self.area = self.screen.areas[0]
+        self.object = None
+        self.selected_objects = []
+
+    @property
+    def active_object(self):
+        return self.object
+
+
+class Event(bpy_struct):
+    """Stand-in for the events Blender passes to modal operators."""
+
+    def __init__(self, type='TIMER', value='NOTHING'):
+        self.type = type
+        self.value = value
@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+from . import previews
+
+registered_classes = []
+
+
+def register_class(cls):
+    registered_classes.append(cls)
+
+
+def unregister_class(cls):
+    registered_classes.remove(cls)
+
+
+def user_resource(resource_type, path="", create=False):
+    """A per-user folder under the temp dir instead of Blender's config/datafiles."""
+    folder = os.path.join(tempfile.gettempdir(), "fake_bpy", resource_type.lower(), path)
+    if create:
+        os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+__all__ = ["previews", "register_class", "unregister_class", "user_resource"]
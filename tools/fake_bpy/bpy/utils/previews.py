@@ -0,0 +1,19 @@
+from types import SimpleNamespace
+
+
+class ImagePreviewCollection(dict):
+    def load(self, name, filepath, filetype, force_reload=False):
+        preview = SimpleNamespace(icon_id=len(self) + 1, filepath=filepath)
+        self[name] = preview
+        return preview
+
+    def close(self):
+        self.clear()
+
+
+def new():
+    return ImagePreviewCollection()
+
+
+def remove(pcoll):
+    pcoll.close()
@@ -0,0 +1,263 @@
+"""Load test for the texture backend: N concurrent simulated Blender clients.
+
+Start the backend in load test mode (tiny model on CPU, no tunnel, served
+on 127.0.0.1:5000). The backend is a notebook script whose first cell is a
+"!pip install" line, so run it through IPython under an .ipy name, which
+executes that line as a shell command (pip install ipython first):
+
+    cp CLOUD_MODE/googlecolabobackend.py /tmp/aitex_backend.ipy
+    AITEX_LOAD_TEST=1 ipython /tmp/aitex_backend.ipy
+
+Once it prints "Server is running!", in another terminal, for example:
+
+    python tools/loadtest.py --clients 8 --duration 300
+    python tools/loadtest.py --replay path/to/library/traces.jsonl --speed 4
+
+Synthetic clients send the addon's preset prompts in a mix of resolutions,
+tiling and priorities, back to back, and honour 429 Retry-After like the
+addon does. Replay mode re-sends requests recorded in the addon's
+traces.jsonl at their original pace (divided by --speed).
+
+Reports throughput, p50/p95/p99 latency, error/507/429 rates and the
+server's memory over time (sampled from /health).
+"""
+import argparse
+import ast
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ADDON_PATH = os.path.join(os.path.dirname(__file__), "..", "CLOUD_MODE", "blender_ai_textures.py")
+
+# Request mix of the synthetic clients
+RESOLUTION_WEIGHTS = {512: 2, 1024: 6, 2048: 2}
+TILEABLE_SHARE = 0.3
+BATCH_SHARE = 0.25     # requests sent as batch work instead of interactive
+MAX_RETRY_WAIT = 60.0  # seconds; cap on a 429's Retry-After
+REQUEST_TIMEOUT = 600  # same as the addon
+
+
+def load_preset_prompts(path=ADDON_PATH):
+    """Read PRESET_PROMPTS from the addon source (it imports bpy, so it can't be imported here)."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "PRESET_PROMPTS" for target in node.targets
+        ):
+            return list(ast.literal_eval(node.value).values())
+    raise RuntimeError(f"PRESET_PROMPTS not found in {path}")
+
+
+def synthetic_request(rng, prompts):
+    """Request parameters the way build_request_params makes them."""
+    resolutions, weights = zip(*RESOLUTION_WEIGHTS.items())
+    params = {
+        "prompt": rng.choice(prompts),
+        "resolution": rng.choices(resolutions, weights)[0],
+        "tileable": rng.random() < TILEABLE_SHARE,
+    }
+    priority = "batch" if rng.random() < BATCH_SHARE else "interactive"
+    return params, priority
+
+
+def load_replay(path):
+    """Return [(offset seconds, params)] from an addon traces.jsonl, oldest first."""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            trace = json.loads(line)
+            # Only backend requests are worth replaying
+            if trace.get("params") and trace.get("source") == "backend":
+                records.append((trace["started"], trace["params"]))
+    records.sort(key=lambda record: record[0])
+    if not records:
+        return []
+    first = records[0][0]
+    return [(started - first, params) for started, params in records]
+
+
+class LoadTest:
+    def __init__(self, url, model=None):
+        self.url = url.rstrip("/")
+        self.model = model
+        self.samples = []  # (start offset, latency s, status or None, error text)
+        self.memory = []   # (offset, rss MB, GPU MB, queue depth)
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+        self.started = time.monotonic()
+
+    def send(self, params, priority="interactive"):
+        """Send one request, retrying after a 429 as the addon does; returns the final status."""
+        payload = dict(params, job_id=uuid.uuid4().hex, trace_id=uuid.uuid4().hex, priority=priority)
+        if self.model:
+            payload["model"] = self.model
+        while True:
+            start = time.monotonic()
+            status, error = None, ""
+            retry_after = None
+            try:
+                response = self.session.post(f"{self.url}/generate", json=payload, timeout=REQUEST_TIMEOUT)
+                response.content  # the transfer is part of the latency
+                status = response.status_code
+                if status == 429:
+                    retry_after = float(response.headers.get("Retry-After") or 5.0)
+                elif status != 200:
+                    error = response.text[:200]
+            except requests.RequestException as e:
+                error = str(e)
+            with self.lock:
+                self.samples.append((start - self.started, time.monotonic() - start, status, error))
+            if retry_after is None:
+                return status
+            time.sleep(min(retry_after, MAX_RETRY_WAIT) * random.uniform(1.0, 1.2))
+
+    def monitor(self, stop, interval):
+        while not stop.is_set():
+            try:
+                data = self.session.get(f"{self.url}/health", timeout=10).json()
+                memory = data.get("memory", {})
+                with self.lock:
+                    self.memory.append((
+                        time.monotonic() - self.started, memory.get("rss_mb"), memory.get("gpu_mb"),
+                        data.get("queue_depth"),
+                    ))
+            except (requests.RequestException, ValueError):
+                pass
+            stop.wait(interval)
+
+    def run_clients(self, clients, duration, seed):
+        """Closed loop: each client sends its next request as soon as the last one returns."""
+        prompts = load_preset_prompts()
+        deadline = self.started + duration
+
+        def client(index):
+            rng = random.Random(seed + index)
+            while time.monotonic() < deadline:
+                self.send(*synthetic_request(rng, prompts))
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_replay(self, records, speed, max_concurrency):
+        """Open loop: requests go out at their recorded times, whether or not earlier ones finished."""
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            for offset, params in records:
+                delay = self.started + offset / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.send, params)
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = min(max(1, math.ceil(p / 100.0 * len(ordered))), len(ordered))
+    return ordered[rank - 1]
+
+
+def summarize(test, elapsed):
+    """Return the report as a dict (also printed by main)."""
+    samples = test.samples
+    # A 429 is not a finished request; the client retries it later
+    finished = [s for s in samples if s[2] != 429]
+    ok = [s for s in finished if s[2] == 200]
+    latencies = [s[1] for s in ok]
+    report = {
+        "elapsed_s": round(elapsed, 1),
+        "requests": len(finished),
+        "succeeded": len(ok),
+        "throughput_per_min": round(len(ok) / elapsed * 60.0, 2) if elapsed else 0.0,
+        "error_rate": round(1 - len(ok) / len(finished), 4) if finished else 0.0,
+        "oom_507_rate": round(sum(s[2] == 507 for s in finished) / len(finished), 4) if finished else 0.0,
+        "rejected_429": sum(s[2] == 429 for s in samples),
+        "latency_s": {
+            f"p{p}": round(percentile(latencies, p), 2) for p in (50, 95, 99)
+        } if latencies else {},
+        "errors": sorted({s[3] for s in finished if s[3]})[:10],
+    }
+    rss = [m[1] for m in test.memory if m[1] is not None]
+    gpu = [m[2] for m in test.memory if m[2] is not None]
+    report["server_memory_mb"] = {
+        "rss_start": rss[0] if rss else None,
+        "rss_peak": max(rss) if rss else None,
+        "rss_end": rss[-1] if rss else None,
+        "gpu_peak": max(gpu) if gpu else None,
+    }
+    return report
+
+
+def print_report(report, memory):
+    print(f"\n{'=' * 60}\n📊 Load test: {report['elapsed_s']}s\n{'=' * 60}")
+    print(f"Requests:   {report['requests']} finished, {report['succeeded']} succeeded, "
+          f"{report['rejected_429']} rejected with 429 (retried)")
+    print(f"Throughput: {report['throughput_per_min']} textures/min")
+    if report["latency_s"]:
+        print("Latency:    " + ", ".join(f"{name} {value}s" for name, value in report["latency_s"].items()))
+    print(f"Errors:     {report['error_rate'] * 100:.1f}% (507 out of memory: {report['oom_507_rate'] * 100:.1f}%)")
+    for error in report["errors"]:
+        print(f"  - {error}")
+    mem = report["server_memory_mb"]
+    if mem["rss_start"] is not None:
+        print(f"Server RSS: {mem['rss_start']} -> {mem['rss_end']} MB (peak {mem['rss_peak']} MB)")
+    if mem["gpu_peak"] is not None:
+        print(f"Server GPU: peak {mem['gpu_peak']} MB")
+    # Coarse memory timeline, about ten rows
+    step = max(1, len(memory) // 10)
+    for offset, rss, gpu, queue in memory[::step]:
+        print(f"  t={offset:7.1f}s  rss {rss} MB  gpu {gpu} MB  queue {queue}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="backend URL")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent clients (replay: max in flight)")
+    parser.add_argument("--duration", type=float, default=120.0, help="seconds to run the synthetic clients")
+    parser.add_argument("--replay", help="traces.jsonl from the addon's library folder to replay")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay time compression factor")
+    parser.add_argument("--model", help="model to request (e.g. 'tiny'); replays keep the recorded one otherwise")
+    parser.add_argument("--health-interval", type=float, default=2.0, help="seconds between memory samples")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic request mix")
+    parser.add_argument("--out", help="write the report, samples and memory timeline to this JSON file")
+    args = parser.parse_args()
+
+    test = LoadTest(args.url, args.model)
+    stop = threading.Event()
+    monitor = threading.Thread(target=test.monitor, args=(stop, args.health_interval), daemon=True)
+    monitor.start()
+    try:
+        if args.replay:
+            records = load_replay(args.replay)
+            print(f"🔁 Replaying {len(records)} request(s) at {args.speed}x")
+            test.run_replay(records, args.speed, args.clients)
+        else:
+            print(f"🚀 {args.clients} client(s) for {args.duration:.0f}s against {test.url}")
+            test.run_clients(args.clients, args.duration, args.seed)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped early")
+    stop.set()
+    monitor.join()
+
+    report = summarize(test, time.monotonic() - test.started)
+    print_report(report, test.memory)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"report": report, "samples": test.samples, "memory": test.memory}, f, indent=1)
+        print(f"💾 Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()